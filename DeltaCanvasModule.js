@@ -0,0 +1,74 @@
+/*
+Canvas for FarmCanvasGrid frames.
+
+A frame is {full, palette, cells}. palette maps indices to portrayals the
+browser has not seen yet, and cells lists [x, y, [palette indices]] for
+every cell that changed. A full frame starts from a blank canvas; any other
+frame only redraws the listed cells, so the cost per step follows what
+moved instead of the size of the farm.
+*/
+const DeltaCanvasModule = function (
+  canvas_width,
+  canvas_height,
+  grid_width,
+  grid_height
+) {
+  const parent = document.createElement("div");
+  parent.style = `height:${canvas_height}px;`;
+  parent.className = "world-grid-parent";
+
+  const canvas = document.createElement("canvas");
+  Object.assign(canvas, {
+    width: canvas_width,
+    height: canvas_height,
+    className: "world-grid",
+  });
+  parent.appendChild(canvas);
+  document.getElementById("elements").appendChild(parent);
+
+  const context = canvas.getContext("2d");
+  // No interaction handler: its lookup table assumes the whole grid is redrawn every frame
+  const canvasDraw = new GridVisualization(
+    canvas_width,
+    canvas_height,
+    grid_width,
+    grid_height,
+    context,
+    null
+  );
+
+  const cellWidth = Math.floor(canvas_width / grid_width);
+  const cellHeight = Math.floor(canvas_height / grid_height);
+  const drawLines = cellWidth > 3 && cellHeight > 3;
+  let palette = {};
+
+  const drawCell = (x, y, indices) => {
+    const left = x * cellWidth;
+    const top = (grid_height - y - 1) * cellHeight;
+    context.clearRect(left, top, cellWidth, cellHeight);
+    if (drawLines) {
+      context.strokeStyle = "#eee";
+      context.strokeRect(left + 0.5, top + 0.5, cellWidth, cellHeight);
+    }
+    // GridDraw modifies what it draws, so draw copies of the shared portrayals
+    const portrayals = indices.map((index) =>
+      Object.assign({}, palette[index], { x: x, y: y })
+    );
+    portrayals.sort((a, b) => a.Layer - b.Layer);
+    canvasDraw.drawLayer(portrayals);
+  };
+
+  this.render = (data) => {
+    if (data.full) {
+      palette = {};
+      canvasDraw.resetCanvas();
+      if (drawLines) canvasDraw.drawGridLines();
+    }
+    Object.assign(palette, data.palette);
+    for (const [x, y, indices] of data.cells) drawCell(x, y, indices);
+  };
+
+  this.reset = () => {
+    canvasDraw.resetCanvas();
+  };
+};
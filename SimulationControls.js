@@ -0,0 +1,40 @@
+/*
+Controls for FastForwardServer: how many steps the simulation may run per
+frame, skipping to a step, and pausing. Talks to the server through the
+websocket helper `send` from runcontrol.js.
+*/
+const SimulationControls = function () {
+  const parent = document.createElement("div");
+  parent.className = "simulation-controls";
+  parent.innerHTML = `
+    <label>Steps per frame <input type="number" min="1" value="1" style="width:6em"></label>
+    <label>Skip to step <input type="number" min="0" value="10000" style="width:7em"></label>
+    <button type="button" class="btn btn-default btn-sm">Go</button>
+    <button type="button" class="btn btn-default btn-sm">Pause</button>
+    <span class="simulation-status"></span>`;
+  document.getElementById("elements").appendChild(parent);
+
+  const [stepsPerFrameInput, skipInput] = parent.querySelectorAll("input");
+  const [skipButton, pauseButton] = parent.querySelectorAll("button");
+  const status = parent.querySelector(".simulation-status");
+  let paused = false;
+
+  stepsPerFrameInput.onchange = () =>
+    send({ type: "sim_control", steps_per_frame: Number(stepsPerFrameInput.value) });
+  skipButton.onclick = () =>
+    send({ type: "sim_control", skip_to: Number(skipInput.value) });
+  pauseButton.onclick = () =>
+    send({ type: "sim_control", pause: !paused, resume: paused });
+
+  this.render = (data) => {
+    paused = data.paused;
+    pauseButton.innerText = paused ? "Resume" : "Pause";
+    if (document.activeElement !== stepsPerFrameInput) stepsPerFrameInput.value = data.steps_per_frame;
+    const holding = data.stop_at !== null ? ` (skipping to ${data.stop_at})` : "";
+    status.innerText = ` Step ${data.step}${holding}, ${Math.round(data.steps_per_sec)} steps/s`;
+  };
+
+  this.reset = () => {
+    status.innerText = "";
+  };
+};
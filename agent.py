@@ -1,6 +1,5 @@
 from mesa import Agent
-import random
-# Constants
+# Constants shared by the model, the visualization and the server
 GRID_WIDTH = 20
 GRID_HEIGHT = 20
 BATTERY_CAPACITY = 100
@@ -12,6 +11,7 @@ class BaseDroneAgent(Agent):
         super().__init__(unique_id, model)
         self.battery = BATTERY_CAPACITY
         self.state = "Exploring"  # Possible states: Exploring, Waiting, Returning
+        self.station = (1, 0)  # Landing pad next to the base station; set by the model
 
     def step(self):
         if self.battery <= 0:
@@ -29,8 +29,7 @@ class BaseDroneAgent(Agent):
         Check if the strawberry cluster at the current location has been picked.
         If it has, transition back to 'Exploring'.
         """
-        cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        strawberry_present = any(isinstance(obj, BaseStrawberryCluster) for obj in cell_contents)
+        strawberry_present = self.model.crop_at(self.pos) is not None
         if not strawberry_present:
             self.state = "Exploring"  # Resume exploring once the strawberry is gone
 
@@ -40,22 +39,27 @@ class BaseDroneAgent(Agent):
         Transition to 'Waiting' if a cluster is found.
         """
         self.move_randomly()
-        cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        for obj in cell_contents:
-            if isinstance(obj, BaseStrawberryCluster):
-                self.target_location = self.pos
-                self.state = "Waiting"  # Switch to waiting when a cluster is found
-                return  
+        if self.model.crop_at(self.pos) is not None:
+            if self.model.tracer.info:
+                self.model.tracer.found(self, self.pos)
+            self.model.kpis.found()
+            self.target_location = self.pos
+            self.state = "Waiting"  # Switch to waiting when a cluster is found
+            return
 
         # Decrease battery while exploring
         self.battery -= 1
+        self.model.kpis.drone_energy_used()
 
     def return_to_base(self):
         # Move towards the base station or charging point
-        charging_station_pos = (1, 0)
+        charging_station_pos = self.station
         self.move_towards(charging_station_pos)
         if self.pos == charging_station_pos:
+            self.model.kpis.recharged(self.battery, BATTERY_CAPACITY)
             self.battery = BATTERY_CAPACITY  # Recharge battery
+            if self.model.tracer.info:
+                self.model.tracer.recharged(self, self.pos)
             self.state = "Exploring"
 
     def move_randomly(self):
@@ -63,18 +67,23 @@ class BaseDroneAgent(Agent):
         Move to a random adjacent cell.
         """
         possible_steps = self.model.grid.get_neighborhood(self.pos, moore=True, include_center=False)
-        new_position = random.choice(possible_steps)
+        new_position = self.random.choice(possible_steps)
         self.model.grid.move_agent(self, new_position)
+        if self.model.tracer.debug:
+            self.model.tracer.moved(self, new_position)
 
     def move_towards(self, target):
         """
         Move one step closer to the target position.
+        Drones fly over trees and the river, so the straight diagonal step is already the shortest path.
         """
         x, y = self.pos
         tx, ty = target
         new_position = (x + (1 if x < tx else -1 if x > tx else 0),
                         y + (1 if y < ty else -1 if y > ty else 0))
         self.model.grid.move_agent(self, new_position)
+        if self.model.tracer.debug:
+            self.model.tracer.moved(self, new_position)
 
 class BasePickerRobotAgent(Agent):
     def __init__(self, unique_id, model):
@@ -84,8 +93,19 @@ class BasePickerRobotAgent(Agent):
         self.state = "Idle"  # Possible states: Idle, Moving, Picking, Returning
         self.target_location = None
 
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        old_state = getattr(self, "_state", None)
+        self._state = value
+        if value != old_state:
+            self.model.picker_state_changed(self, old_state, value)  # Keep the model's idle pool in sync
+
     def step(self):
-        if self.battery <= 0 or self.storage >= STORAGE_CAPACITY:
+        if not self.model.navigation.can_reach(self.pos, "home", self.battery) or self.storage >= STORAGE_CAPACITY:
             self.state = "Returning"
 
         if self.state == "Idle":
@@ -110,49 +130,65 @@ class BasePickerRobotAgent(Agent):
             self.target_location = location
             self.state = "Moving"
 
+    def receive_messages(self, messages):
+        """Handle the batch of messages the model's message bus delivered this tick."""
+        self.model.schedule.wake(self)  # Idle pickers sleep until they hear from a drone or the dispatcher
+        for message in messages:
+            if message.topic == "assign":
+                self.receive_location(message.payload)
+
     def move_randomly(self):
         """Move to a random adjacent cell."""
         possible_steps = self.model.grid.get_neighborhood(self.pos, moore=True, include_center=False)
-        new_position = random.choice(possible_steps)
+        new_position = self.random.choice(possible_steps)
         self.model.grid.move_agent(self, new_position)
+        if self.model.tracer.debug:
+            self.model.tracer.moved(self, new_position)
         self.battery -= 1
+        self.model.kpis.picker_energy_used()
 
     def pick_strawberries(self):
         """Pick strawberries at the current location."""
-        cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        for obj in cell_contents:
-            if isinstance(obj, BaseStrawberryCluster) and obj.is_grown:
-                self.storage += 1
-                obj.is_grown = False  # Mark as picked
-                obj.picked = True  # Update the picked flag
-                obj.age = 0  # Reset age if using regrowth
-
-                if self.storage >= STORAGE_CAPACITY:
-                    self.state = "Returning"
-                else:
-                    self.state = "Idle"  # Ready to pick again
-                break  # Pick only one strawberry per step
+        obj = self.model.crop_at(self.pos)
+        if obj is not None and obj.is_grown:
+            self.storage += 1
+            self.model.kpis.picked()
+            if self.model.tracer.info:
+                self.model.tracer.picked(self, self.pos)
+            obj.is_grown = False  # Mark as picked
+            obj.picked = True  # Update the picked flag
+            obj.age = 0  # Reset age if using regrowth
+
+            if self.storage >= STORAGE_CAPACITY:
+                self.state = "Returning"
+            else:
+                self.state = "Idle"  # Ready to pick again
 
         # Decrease battery for the action
         self.battery -= 1
+        self.model.kpis.picker_energy_used()
 
 
     def return_to_base(self):
-        """Move towards the base station or charging point."""
-        charging_station_pos = (0, 0)
-        self.move_towards(charging_station_pos)
-        if self.pos == charging_station_pos:
+        """Move towards the nearest charging station along the precomputed home field."""
+        self.move_towards("home")
+        if self.model.navigation.moves(self.pos, "home") == 0:
+            self.model.kpis.recharged(self.battery, BATTERY_CAPACITY)
             self.battery = BATTERY_CAPACITY
             self.storage = 0
+            if self.model.tracer.info:
+                self.model.tracer.recharged(self, self.pos)
             self.state = "Idle"
 
     def move_towards(self, target):
-        """Move one step closer to the target position."""
-        x, y = self.pos
-        tx, ty = target
-        new_position = (x + (1 if x < tx else -1 if x > tx else 0),
-                        y + (1 if y < ty else -1 if y > ty else 0))
+        """
+        Move one step closer to the target position, or to a named goal such as "home".
+        Pickers drive on the ground, so they follow the terrain-aware distance field.
+        """
+        new_position = self.model.navigation.next_step(self.pos, target)
         self.model.grid.move_agent(self, new_position)
+        if self.model.tracer.debug:
+            self.model.tracer.moved(self, new_position)
 
 class BaseStrawberryCluster(Agent):
     def __init__(self, unique_id, model):
@@ -162,6 +198,16 @@ class BaseStrawberryCluster(Agent):
         self.is_grown = True
         self.picked = False  # To track if the strawberry has been picked
 
+    @property
+    def is_grown(self):
+        return self._is_grown
+
+    @is_grown.setter
+    def is_grown(self, value):
+        self._is_grown = value
+        if self.pos is not None:
+            self.model.update_crop_index(self.pos, value)  # Keep the model's grown-crop index in sync
+
 def step(self):
     pass
 
@@ -185,23 +231,24 @@ class BasicDroneAgent(BaseDroneAgent):
         Transition to 'Waiting' if a cluster is found.
         """
         self.move_randomly()
-        cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        for obj in cell_contents:
-            if isinstance(obj, BasicStrawberryCluster) and obj.is_grown:
-                self.target_location = self.pos
-                self.state = "Waiting"  # Switch to waiting when a cluster is found
-                return  # Stop further actions in this step
+        if self.model.has_grown_crop(self.pos):
+            if self.model.tracer.info:
+                self.model.tracer.found(self, self.pos)
+            self.model.kpis.found()
+            self.target_location = self.pos
+            self.state = "Waiting"  # Switch to waiting when a cluster is found
+            return  # Stop further actions in this step
 
         # Decrease battery while exploring
         self.battery -= 1
+        self.model.kpis.drone_energy_used()
 
     def check_strawberry_status(self):
         """
         Check if the strawberry cluster at the current location has been picked.
         If it has, transition back to 'Exploring'.
         """
-        cell_contents = self.model.grid.get_cell_list_contents([self.target_location])
-        strawberry_present = any(isinstance(obj, BasicStrawberryCluster) and obj.is_grown for obj in cell_contents)
+        strawberry_present = self.model.has_grown_crop(self.target_location)
 
         if not strawberry_present:
             self.state = "Exploring"  # Resume exploring once the strawberry is gone
@@ -209,7 +256,7 @@ class BasicDroneAgent(BaseDroneAgent):
 
 class BasicPickerRobotAgent(BasePickerRobotAgent):
     def step(self):
-        if self.battery <= 0 or self.storage >= STORAGE_CAPACITY:
+        if not self.model.navigation.can_reach(self.pos, "home", self.battery) or self.storage >= STORAGE_CAPACITY:
             self.state = "Returning"
 
         if self.state == "Idle":
@@ -219,16 +266,17 @@ class BasicPickerRobotAgent(BasePickerRobotAgent):
             self.return_to_base()
 
         # Check for strawberries to pick when idle or after moving
-        cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        for obj in cell_contents:
-            if isinstance(obj, BasicStrawberryCluster) and obj.is_grown:
-                self.pick_strawberries(obj)
-                break  # Pick only one strawberry per step
+        strawberry = self.model.crop_at(self.pos)
+        if strawberry is not None and strawberry.is_grown:
+            self.pick_strawberries(strawberry)  # Pick only one strawberry per step
 
     def pick_strawberries(self, strawberry):
         """Pick a strawberry at the current location."""
         if strawberry.is_grown:
             self.storage += 1
+            self.model.kpis.picked()
+            if self.model.tracer.info:
+                self.model.tracer.picked(self, self.pos)
             strawberry.is_grown = False  # Mark the strawberry as picked
             strawberry.picked = True  # Update picked status
             strawberry.age = 0  # Reset age if regrowth is enabled
@@ -241,11 +289,13 @@ class BasicPickerRobotAgent(BasePickerRobotAgent):
 
         # Decrease battery after picking
         self.battery -= 1
+        self.model.kpis.picker_energy_used()
 
 class BasicStrawberryCluster(BaseStrawberryCluster):
     def step(self):
         if self.picked:
             self.is_grown = False  # Ensure it doesn't grow in basic mode
+        self.model.schedule.sleep(self)  # Nothing changes until it is picked
 class ExtendedDroneAgent(BaseDroneAgent):
         
 
@@ -266,16 +316,18 @@ class ExtendedDroneAgent(BaseDroneAgent):
         Transition to 'Waiting' if a cluster is found.
         """
         self.move_randomly()
-        cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        for obj in cell_contents:
-            if isinstance(obj, ExtendedStrawberryCluster) and obj.is_grown:
-                self.model.broadcast_location(self.pos)
-                self.target_location = self.pos
-                self.state = "Waiting"  # Switch to waiting when a cluster is found
-                return  # Stop further actions in this step
+        if self.model.has_grown_crop(self.pos):
+            if self.model.tracer.info:
+                self.model.tracer.found(self, self.pos)
+            self.model.kpis.found()
+            self.model.bus.publish(self, "crop_found", self.pos)  # The dispatcher picks one idle picker
+            self.target_location = self.pos
+            self.state = "Waiting"  # Switch to waiting when a cluster is found
+            return  # Stop further actions in this step
 
         # Decrease battery while exploring
         self.battery -= 1
+        self.model.kpis.drone_energy_used()
         
     def check_strawberry_status(self):
         """
@@ -286,8 +338,7 @@ class ExtendedDroneAgent(BaseDroneAgent):
             self.state = "Exploring"  # No target, go back to exploring
             
 
-        cell_contents = self.model.grid.get_cell_list_contents([self.target_location])
-        strawberry_present = any(isinstance(obj, ExtendedStrawberryCluster) and obj.is_grown for obj in cell_contents)
+        strawberry_present = self.model.has_grown_crop(self.target_location)
 
         if not strawberry_present:
             self.state = "Exploring"  # Resume exploring once the strawberry is gone
@@ -295,11 +346,11 @@ class ExtendedDroneAgent(BaseDroneAgent):
 
 class ExtendedPickerRobotAgent(BasePickerRobotAgent):
     def step(self):
-        if self.battery <= 0 or self.storage >= STORAGE_CAPACITY:
+        if not self.model.navigation.can_reach(self.pos, "home", self.battery) or self.storage >= STORAGE_CAPACITY:
             self.state = "Returning"
 
         if self.state == "Idle":
-            pass  # Wait for a signal from the drone
+            self.model.schedule.sleep(self)  # Wait for a signal from the drone
 
         elif self.state == "Moving" and self.target_location:
             self.move_towards(self.target_location)
@@ -314,36 +365,37 @@ class ExtendedPickerRobotAgent(BasePickerRobotAgent):
 
     def pick_strawberries(self):
         """Pick strawberries at the current location."""
-        cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        for obj in cell_contents:
-            if isinstance(obj, ExtendedStrawberryCluster) and obj.is_grown:
-                self.storage += 1
-                obj.is_grown = False  # Mark as picked
-                obj.age = 0  # Reset age
-                obj.picked = True  # Mark as picked
-
-                if self.storage >= STORAGE_CAPACITY:
-                    self.state = "Returning"
-                else:
-                    self.move_outside_tree()  # Move away from the tree to wait
-                break  # Pick only one cluster per step
+        obj = self.model.crop_at(self.pos)
+        if obj is not None and obj.is_grown:  # Pick only one cluster per step
+            self.storage += 1
+            self.model.kpis.picked()
+            if self.model.tracer.info:
+                self.model.tracer.picked(self, self.pos)
+            obj.is_grown = False  # Mark as picked
+            obj.age = 0  # Reset age
+            obj.picked = True  # Mark as picked
+
+            if self.storage >= STORAGE_CAPACITY:
+                self.state = "Returning"
+            else:
+                self.move_outside_tree()  # Move away from the tree to wait
 
         self.battery -= 1
+        self.model.kpis.picker_energy_used()
 
     def move_outside_tree(self):
         """Move to a random adjacent cell away from the tree and wait for the drone signal."""
         # Get all neighboring cells
         possible_steps = self.model.grid.get_neighborhood(self.pos, moore=True, include_center=False)
         
-        # Filter out any cells that contain a tree (assuming Tree is the class for trees)
-        valid_steps = [
-            step for step in possible_steps
-            if not any(isinstance(obj, Tree) for obj in self.model.grid.get_cell_list_contents([step]))
-        ]
+        # Filter out any cells that contain a tree
+        valid_steps = [step for step in possible_steps if not self.model.has_tree(step)]
         
         if valid_steps:  # If there are valid steps, choose one randomly
-            new_position = random.choice(valid_steps)
+            new_position = self.random.choice(valid_steps)
             self.model.grid.move_agent(self, new_position)
+            if self.model.tracer.debug:
+                self.model.tracer.moved(self, new_position)
             self.state = "Idle"  # Change to idle state after moving
 
 
@@ -356,11 +408,12 @@ class ExtendedStrawberryCluster(BaseStrawberryCluster):
         self.regrowth_timer = 0  # Timer to track regrowth after being picked
         self.max_age = max_age
     def step(self):
-        print(f"Strawberry at {self.pos}: is_grown={self.is_grown}, picked={self.picked}, regrowth_timer={self.regrowth_timer}")
         if not self.is_grown:
-            self.age += 1
+            self.age += self.model.schedule.elapsed(self)  # Catch up on the ticks spent asleep
             if self.age >= self.max_age:
                 self.is_grown = True
+                if self.model.tracer.debug:
+                    self.model.tracer.regrown(self, self.pos)
                 self.picked = False  # Reset picked status when regrown
                 self.regrowth_timer = 0  # Reset regrowth timer once it regrows
         else:
@@ -369,14 +422,29 @@ class ExtendedStrawberryCluster(BaseStrawberryCluster):
                 self.regrowth_timer += 1
                 if self.regrowth_timer >= 50:  # After 10 steps, it regrows
                     self.is_grown = True  # Regrow the strawberry
+                    if self.model.tracer.debug:
+                        self.model.tracer.regrown(self, self.pos)
                     self.picked = False  # Mark it as not picked
                     self.regrowth_timer = 0  # Reset the timer
             # Ensure the strawberry is marked as ready to be picked again
         if self.is_grown and not self.picked:
             self.picked = False  # Ensure it's marked as not picked
+        self.sleep()
+
+    def sleep(self):
+        """A grown cluster waits to be picked, a growing one only needs waking when it is ripe."""
+        if self.is_grown:
+            self.model.schedule.sleep(self)
+        else:
+            self.model.schedule.sleep(self, self.max_age - self.age)
 
             
 class SystematicDroneAgent(BaseDroneAgent):
+    def __init__(self, unique_id, model):
+        super().__init__(unique_id, model)
+        self.exploration_path = None
+        self.path_index = 0  # Position along the shared coverage path, kept across recharge detours
+
     def step(self):
         if self.battery <= 0:
             self.state = "Returning"
@@ -393,59 +461,44 @@ class SystematicDroneAgent(BaseDroneAgent):
         Systematically explore the grid and look for strawberry clusters.
         Transition to 'Waiting' if a cluster is found.
         """
-        if not hasattr(self, 'exploration_path'):
+        if self.exploration_path is None:
             self.initialize_exploration_path()
 
-        # Move to the next position in the exploration path
-        if self.exploration_path:
-            next_position = self.exploration_path.pop(0)
-            self.model.grid.move_agent(self, next_position)
-            print(f"Drone moving to {next_position}")  # Debug print
+        # Move to the next position in the exploration path, restarting the sweep once it is done
+        if len(self.exploration_path):
+            next_position = self.exploration_path[self.path_index % len(self.exploration_path)]
+            if max(abs(self.pos[0] - next_position[0]), abs(self.pos[1] - next_position[1])) > 1:
+                self.move_towards(next_position)  # Fly back to where the sweep was left, e.g. after recharging
+            else:
+                self.path_index += 1
+                self.model.grid.move_agent(self, next_position)
+                if self.model.tracer.debug:
+                    self.model.tracer.moved(self, next_position)
 
         # Check the current cell for strawberry clusters
-        cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        print(f"Drone at {self.pos}, cell contents: {cell_contents}")  # Debug print
-        for obj in cell_contents:
-            if isinstance(obj, SystematicStrawberryCluster) and obj.is_grown:
-                print(f"Strawberry cluster found at {self.pos}")  # Debug print
-                self.model.broadcast_location(self.pos)
-                self.target_location = self.pos
-                self.state = "Waiting"  # Switch to waiting when a cluster is found
-                return  # Stop further actions in this step
+        if self.model.has_grown_crop(self.pos):
+            if self.model.tracer.info:
+                self.model.tracer.found(self, self.pos)
+            self.model.kpis.found()
+            self.model.bus.publish(self, "crop_found", self.pos)  # The dispatcher picks one idle picker
+            self.target_location = self.pos
+            self.state = "Waiting"  # Switch to waiting when a cluster is found
+            return  # Stop further actions in this step
 
         # Decrease battery while exploring
         self.battery -= 1
+        self.model.kpis.drone_energy_used()
 
     def initialize_exploration_path(self):
         """
         Initialize a systematic exploration path for the drone.
         Ensure that no column or row is revisited unnecessarily.
+        The path is shared with the other drones flying the same sweep and
+        generates its cells on demand instead of listing the whole grid.
         """
-        self.exploration_path = []
-
-        grid_width = self.model.grid.width
-        grid_height = self.model.grid.height
-
-        if self.unique_id % 2 == 0:  # Alternate drones
-            # Row-by-row traversal
-            for y in range(grid_height):
-                if y % 2 == 0:  # Even rows (left to right)
-                    for x in range(grid_width):
-                        self.exploration_path.append((x, y))
-                else:  # Odd rows (right to left)
-                    for x in reversed(range(grid_width)):
-                        self.exploration_path.append((x, y))
-        else:
-            # Column-by-column traversal
-            for x in range(grid_width):
-                if x % 2 == 0:  # Even columns (top to bottom)
-                    for y in range(grid_height):
-                        self.exploration_path.append((x, y))
-                else:  # Odd columns (bottom to top)
-                    for y in reversed(range(grid_height)):
-                        self.exploration_path.append((x, y))
-
-        print(f"Exploration path initialized: {self.exploration_path}")  # Debug print
+        self.exploration_path = self.model.coverage_path(self)
+        self.path_index = 0
+
     def check_strawberry_status(self):
         """
         Check if the strawberry cluster at the current location has been picked.
@@ -456,26 +509,17 @@ class SystematicDroneAgent(BaseDroneAgent):
             self.state = "Exploring"  # No target, go back to exploring
             return
 
-        cell_contents = self.model.grid.get_cell_list_contents([self.target_location])
-        strawberry_present = any(isinstance(obj, SystematicStrawberryCluster) and obj.is_grown for obj in cell_contents)
+        strawberry_present = self.model.has_grown_crop(self.target_location)
 
         if not strawberry_present:
             self.state = "Exploring"  # Resume exploring once the strawberry is gone.
         else:
             # Share the location with the nearest picker
-            nearest_picker = None
-            min_distance = float('inf')
-
-            for agent in self.model.schedule.agents:
-                if isinstance(agent, SystematicPickerRobotAgent):  # Assuming PickerAgent class exists
-                    distance = self.calculate_distance(self.target_location, agent.pos)
-                    if distance < min_distance:
-                        min_distance = distance
-                        nearest_picker = agent
-
+            nearest_picker = self.model.nearest_picker(self.target_location)
             if nearest_picker:
-                nearest_picker.receive_target_location(self.target_location)  # Share location
-                print(f"Shared strawberry location {self.target_location} with Picker {nearest_picker.unique_id}")
+                self.model.bus.send(self, nearest_picker, "target", self.target_location)  # Share location
+                if self.model.tracer.info:
+                    self.model.tracer.dispatched(self, self.target_location, nearest_picker)
 
     def calculate_distance(self, pos1, pos2):
         return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
@@ -491,14 +535,15 @@ class SystematicPickerRobotAgent(BasePickerRobotAgent):
         Define the behavior of the picker agent at each simulation step.
         """
         # Check battery and storage status
-        if self.battery <= 0 or self.storage >= STORAGE_CAPACITY:
+        if not self.model.navigation.can_reach(self.pos, "home", self.battery) or self.storage >= STORAGE_CAPACITY:
             self.state = "Returning"
 
         if self.state == "Idle":
             # Respond to a drone signal if a target location is provided
             if self.target_location:
                 self.state = "Moving"  # Transition to moving state
-                print(f"Picker {self.unique_id} received a signal to move to {self.target_location}")
+            else:
+                self.model.schedule.sleep(self)  # Wait for a drone to share a target
 
         elif self.state == "Moving" and self.target_location:
             # Move towards the target location
@@ -518,44 +563,48 @@ class SystematicPickerRobotAgent(BasePickerRobotAgent):
             # Return to the base and handle necessary actions (e.g., offloading)
             self.return_to_base()
 
-        # Debug information
-        print(f"Picker {self.unique_id} is in state: {self.state}")
-
     def receive_target_location(self, location):
         self.target_location = location
 
+    def receive_messages(self, messages):
+        for message in messages:
+            if message.topic == "target":
+                self.receive_target_location(message.payload)
+        super().receive_messages(messages)
+
     def pick_strawberries(self):
         """Pick strawberries at the current location."""
-        cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        for obj in cell_contents:
-            if isinstance(obj, SystematicStrawberryCluster) and obj.is_grown:
-                self.storage += 1
-                obj.is_grown = False  # Mark as picked
-                obj.age = 0  # Reset age
-                obj.picked = True  # Mark as picked
-
-                if self.storage >= STORAGE_CAPACITY:
-                    self.state = "Returning"
-                else:
-                    self.move_outside_tree()  # Move away from the tree to wait
-                break  # Pick only one cluster per step
+        obj = self.model.crop_at(self.pos)
+        if obj is not None and obj.is_grown:  # Pick only one cluster per step
+            self.storage += 1
+            self.model.kpis.picked()
+            if self.model.tracer.info:
+                self.model.tracer.picked(self, self.pos)
+            obj.is_grown = False  # Mark as picked
+            obj.age = 0  # Reset age
+            obj.picked = True  # Mark as picked
+
+            if self.storage >= STORAGE_CAPACITY:
+                self.state = "Returning"
+            else:
+                self.move_outside_tree()  # Move away from the tree to wait
 
         self.battery -= 1
+        self.model.kpis.picker_energy_used()
 
     def move_outside_tree(self):
         """Move to a random adjacent cell away from the tree and wait for the drone signal."""
         # Get all neighboring cells
         possible_steps = self.model.grid.get_neighborhood(self.pos, moore=True, include_center=False)
         
-        # Filter out any cells that contain a tree (assuming Tree is the class for trees)
-        valid_steps = [
-            step for step in possible_steps
-            if not any(isinstance(obj, Tree) for obj in self.model.grid.get_cell_list_contents([step]))
-        ]
+        # Filter out any cells that contain a tree
+        valid_steps = [step for step in possible_steps if not self.model.has_tree(step)]
         
         if valid_steps:  # If there are valid steps, choose one randomly
-            new_position = random.choice(valid_steps)
+            new_position = self.random.choice(valid_steps)
             self.model.grid.move_agent(self, new_position)
+            if self.model.tracer.debug:
+                self.model.tracer.moved(self, new_position)
             self.state = "Idle"  # Change to idle state after moving
 
 
@@ -565,11 +614,12 @@ class SystematicStrawberryCluster(BaseStrawberryCluster):
         self.regrowth_timer = 0  # Timer to track regrowth after being picked
         self.max_age = max_age
     def step(self):
-        print(f"Strawberry at {self.pos}: is_grown={self.is_grown}, picked={self.picked}, regrowth_timer={self.regrowth_timer}")
         if not self.is_grown:
-            self.age += 1
+            self.age += self.model.schedule.elapsed(self)  # Catch up on the ticks spent asleep
             if self.age >= self.max_age:
                 self.is_grown = True
+                if self.model.tracer.debug:
+                    self.model.tracer.regrown(self, self.pos)
                 self.picked = False  # Reset picked status when regrown
                 self.regrowth_timer = 0  # Reset regrowth timer once it regrows
         else:
@@ -578,21 +628,18 @@ class SystematicStrawberryCluster(BaseStrawberryCluster):
                 self.regrowth_timer += 1
                 if self.regrowth_timer >= 50:  # After 50 steps, it regrows
                     self.is_grown = True  # Regrow the strawberry
+                    if self.model.tracer.debug:
+                        self.model.tracer.regrown(self, self.pos)
                     self.picked = False  # Mark it as not picked
                     self.regrowth_timer = 0  # Reset the timer
             # Ensure the strawberry is marked as ready to be picked again
         if self.is_grown and not self.picked:
             self.picked = False  # Ensure it's marked as not picked
+        self.sleep()
 
-class Tree(Agent):
-    def __init__(self, unique_id, model, picked=False):
-        super().__init__(unique_id, model)
-        self.picked = picked  # If true, the tree turns green after strawberry is picked
-
-class River(Agent):
-    def __init__(self, unique_id, model):
-        super().__init__(unique_id, model)
-
-class ChargingStation(Agent):
-    def __init__(self, unique_id, model):
-        super().__init__(unique_id, model)
\ No newline at end of file
+    def sleep(self):
+        """A grown cluster waits to be picked, a growing one only needs waking when it is ripe."""
+        if self.is_grown:
+            self.model.schedule.sleep(self)
+        else:
+            self.model.schedule.sleep(self, self.max_age - self.age)
@@ -0,0 +1,218 @@
+"""
+Headless parameter sweeps for FarmModel.
+
+Every combination of the parameter grid is run once per seed on a process
+pool, and one KPI row per run is written to CSV (or Parquet) as soon as the
+run finishes. Run from the parent directory of the package, e.g.
+
+    python -m AutounomousAgents.batch_run --modes Extended Systematic --seeds 100 --steps 500 --out kpis.csv
+"""
+import argparse
+import csv
+import itertools
+from multiprocessing import Pool
+
+from .model import FarmModel
+from .resultcache import ResultCache
+from .vectorized import VectorizedBasicModel
+
+DEFAULT_STEPS = 500
+PARQUET_BATCH_ROWS = 256  # Rows buffered before a Parquet row group is written
+
+ENGINES = {"mesa": FarmModel, "vectorized": VectorizedBasicModel}
+
+PARAM_NAMES = ["num_drones", "num_pickers", "num_clusters", "extended_mode"]
+KPI_FIELDS = PARAM_NAMES + ["seed", "steps", "total_picked", "total_energy", "avg_picked_per_agent", "avg_battery", "exploration_efficiency"]
+
+
+def expand_grid(param_grid, seeds):
+    """
+    Turn {"num_drones": [1, 2], ...} and a list of seeds into one dict per run.
+    Parameters missing from the grid keep the FarmModel defaults.
+    """
+    names = [name for name in PARAM_NAMES if name in param_grid]
+    runs = []
+    for values in itertools.product(*(param_grid[name] for name in names)):
+        for seed in seeds:
+            run = dict(zip(names, values))
+            run["seed"] = seed
+            runs.append(run)
+    return runs
+
+
+_caches = {}  # cache directory -> ResultCache, one per worker process
+
+
+def open_cache(directory):
+    if directory not in _caches:
+        _caches[directory] = ResultCache(directory)
+    return _caches[directory]
+
+
+def run_one(run, max_steps=DEFAULT_STEPS, engine="mesa", cache_dir=None):
+    """
+    Build and step one model on the given engine, returning its KPI row.
+    With a cache_dir, a run that was simulated before is read back instead.
+    """
+    params = {name: run[name] for name in PARAM_NAMES if name in run}
+    row = dict(run)
+    row["steps"] = max_steps
+
+    cache = open_cache(cache_dir) if cache_dir and max_steps else None
+    if cache is not None:
+        key = cache.key(dict(params, engine=engine), run["seed"], max_steps)
+        series = cache.get(key)
+        if series is not None:
+            row.update({field: values[-1].item() for field, values in series.items() if field != "step"})
+            return row
+
+    model = ENGINES[engine](**params, seed=run["seed"])
+    for _ in range(max_steps):
+        model.step()
+
+    if cache is not None:
+        cache.put(key, model.kpis.series())
+    row.update(model.kpis.snapshot())
+    return row
+
+
+def run_branch(state, seed, max_steps=DEFAULT_STEPS):
+    """Resume a serialized model under a new seed, step it further and return its KPI row."""
+    model = FarmModel.from_bytes(state)
+    model.reseed(seed)
+    for _ in range(max_steps):
+        model.step()
+
+    row = {"seed": seed, "steps": model.schedule.steps}
+    row.update(model.kpis.snapshot())  # KPIs include the shared warmup
+    return row
+
+
+def _run_star(args):
+    return run_one(*args)
+
+
+def _branch_star(args):
+    return run_branch(*args)
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=KPI_FIELDS, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.file.flush()  # Rows are visible while the sweep is still running
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Writing Parquet needs pyarrow (pip install pyarrow); use a .csv output instead")
+        self.pa = pyarrow
+        self.writer = None
+        self.path = path
+        self.pending = []
+
+    def write(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= PARQUET_BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        table = self.pa.Table.from_pylist([{field: row.get(field) for field in KPI_FIELDS} for row in self.pending])
+        if self.writer is None:
+            self.writer = self.pa.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_sink(path):
+    if path.endswith(".parquet"):
+        return ParquetSink(path)
+    return CsvSink(path)
+
+
+def run_sweep(param_grid, seeds, max_steps=DEFAULT_STEPS, out_path=None, processes=None, engine="mesa", cache_dir=None):
+    """
+    Run every configuration of param_grid for every seed across a process pool
+    (all cores by default). Rows are yielded, and written to out_path if given,
+    in completion order. engine="vectorized" runs Basic mode on
+    VectorizedBasicModel. With a cache_dir only runs missing from the
+    result cache are simulated.
+    """
+    runs = expand_grid(param_grid, seeds)
+    yield from _pool_rows(_run_star, [(run, max_steps, engine, cache_dir) for run in runs], out_path, processes)
+
+
+def run_branches(model, seeds, max_steps=DEFAULT_STEPS, out_path=None, processes=None):
+    """
+    Branch what-if runs off a warmed-up model: the model is serialized once,
+    and every seed resumes a copy of it on the process pool instead of
+    re-simulating the warmup.
+    """
+    state = model.to_bytes()
+    yield from _pool_rows(_branch_star, [(state, seed, max_steps) for seed in seeds], out_path, processes)
+
+
+def _pool_rows(worker, tasks, out_path, processes):
+    sink = open_sink(out_path) if out_path else None
+    try:
+        with Pool(processes=processes) as pool:
+            for row in pool.imap_unordered(worker, tasks):
+                if sink is not None:
+                    sink.write(row)
+                yield row
+    finally:
+        if sink is not None:
+            sink.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a headless FarmModel parameter sweep.")
+    parser.add_argument("--drones", type=int, nargs="+", default=[2])
+    parser.add_argument("--pickers", type=int, nargs="+", default=[3])
+    parser.add_argument("--clusters", type=int, nargs="+", default=[5])
+    parser.add_argument("--modes", nargs="+", default=None, choices=["Basic", "Extended", "Systematic"],
+                        help="default: Extended and Systematic, or Basic with --engine vectorized")
+    parser.add_argument("--seeds", type=int, default=10, help="number of seeds per configuration")
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="step budget per run")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", default="sweep.csv", help="output file, .csv or .parquet")
+    parser.add_argument("--engine", default="mesa", choices=sorted(ENGINES), help="vectorized only runs Basic mode")
+    parser.add_argument("--cache", default=None, help="result cache directory; cached runs are not simulated again")
+    args = parser.parse_args(argv)
+    if args.modes is None:
+        args.modes = ["Basic"] if args.engine == "vectorized" else ["Extended", "Systematic"]
+    elif args.engine == "vectorized" and set(args.modes) != {"Basic"}:
+        parser.error("--engine vectorized only runs Basic mode; use --modes Basic or --engine mesa")
+
+    param_grid = {
+        "num_drones": args.drones,
+        "num_pickers": args.pickers,
+        "num_clusters": args.clusters,
+        "extended_mode": args.modes,
+    }
+    done = 0
+    for row in run_sweep(param_grid, range(args.seeds), args.steps, args.out, args.processes, args.engine, args.cache):
+        done += 1
+        print(f"[{done}] {row['extended_mode']} seed={row['seed']}: picked={row['total_picked']} energy={row['total_energy']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Performance benchmarks for FarmModel.
+
+Every mode is built on a ladder of farm sizes, each with a fleet scaled to
+the farm, and measured for construction time, steady-state steps/sec,
+per-step latency percentiles and peak memory. Results are written as JSON
+and can be checked against a stored baseline, e.g.
+
+    python -m AutounomousAgents.benchmark --out bench.json
+    python -m AutounomousAgents.benchmark --baseline bench.json --threshold 0.2
+
+The second form exits with status 1 if any case regressed by more than the threshold.
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from .model import FarmModel
+
+MODES = ["Basic", "Extended", "Systematic"]
+
+# (grid size, drones, pickers): the fleet grows with the farm
+LADDERS = {
+    "quick": [(20, 2, 3), (50, 5, 8)],
+    "full": [(20, 2, 3), (50, 5, 8), (100, 10, 15), (200, 20, 30)],
+}
+
+DEFAULT_WARMUP_STEPS = 50  # Untimed steps so navigation fields and the crop cycle settle
+DEFAULT_STEPS = 200
+DEFAULT_SEED = 0
+DEFAULT_THRESHOLD = 0.2  # Allowed relative slowdown before a case counts as a regression
+
+# Metric -> True if higher is better
+METRICS = {
+    "construct_s": False,
+    "steps_per_sec": True,
+    "p50_ms": False,
+    "p90_ms": False,
+    "p99_ms": False,
+    "peak_mem_mb": False,
+}
+
+CASE_FIELDS = ["mode", "size", "num_drones", "num_pickers"]
+
+
+def build_model(mode, size, num_drones, num_pickers, seed=DEFAULT_SEED):
+    return FarmModel(num_drones, num_pickers, 0, mode, seed=seed, width=size, height=size)
+
+
+def run_case(mode, size, num_drones, num_pickers, steps=DEFAULT_STEPS, warmup=DEFAULT_WARMUP_STEPS, seed=DEFAULT_SEED):
+    """Benchmark one configuration and return its result row."""
+    gc.collect()
+    start = time.perf_counter()
+    model = build_model(mode, size, num_drones, num_pickers, seed)
+    construct_s = time.perf_counter() - start
+
+    for _ in range(warmup):
+        model.step()
+
+    latencies = np.empty(steps)
+    for i in range(steps):
+        start = time.perf_counter_ns()
+        model.step()
+        latencies[i] = time.perf_counter_ns() - start
+    latencies /= 1e6  # ms
+
+    row = {
+        "mode": mode,
+        "size": size,
+        "num_drones": num_drones,
+        "num_pickers": num_pickers,
+        "steps": steps,
+        "construct_s": construct_s,
+        "steps_per_sec": steps / (latencies.sum() / 1e3),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+    row["peak_mem_mb"] = measure_peak_memory(mode, size, num_drones, num_pickers, warmup + steps, seed)
+    return row
+
+
+def measure_peak_memory(mode, size, num_drones, num_pickers, steps, seed=DEFAULT_SEED):
+    """
+    Peak Python heap (MB) while building and running the model. Measured in
+    a separate pass because tracemalloc would distort the timings.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        model = build_model(mode, size, num_drones, num_pickers, seed)
+        for _ in range(steps):
+            model.step()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def run_suite(modes=MODES, ladder=LADDERS["quick"], steps=DEFAULT_STEPS, warmup=DEFAULT_WARMUP_STEPS, seed=DEFAULT_SEED, progress=None):
+    results = []
+    for size, num_drones, num_pickers in ladder:
+        for mode in modes:
+            row = run_case(mode, size, num_drones, num_pickers, steps, warmup, seed)
+            results.append(row)
+            if progress is not None:
+                progress(row)
+    return {"meta": environment(), "results": results}
+
+
+def environment():
+    import mesa
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mesa": mesa.__version__,
+        "numpy": np.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def case_key(row):
+    return tuple(row[field] for field in CASE_FIELDS)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two result documents case by case. Returns a list of
+    (case, metric, baseline value, current value, relative change) for every
+    metric that got worse by more than threshold. Cases missing from either
+    side are skipped.
+    """
+    reference = {case_key(row): row for row in baseline["results"]}
+    regressions = []
+    for row in results["results"]:
+        base = reference.get(case_key(row))
+        if base is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append((case_key(row), metric, old, new, change))
+    return regressions
+
+
+def format_row(row):
+    return (f"{row['mode']:<10} {row['size']:>4}x{row['size']:<4} d={row['num_drones']:<3} p={row['num_pickers']:<3} "
+            f"build={row['construct_s'] * 1e3:8.1f}ms  {row['steps_per_sec']:9.1f} steps/s  "
+            f"p50={row['p50_ms']:7.3f}ms p99={row['p99_ms']:7.3f}ms  mem={row['peak_mem_mb']:7.2f}MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark FarmModel across modes and farm sizes.")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--ladder", default="quick", choices=sorted(LADDERS))
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="timed steps per case")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP_STEPS, help="untimed steps before timing")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--out", default=None, help="write the results as JSON")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.modes, LADDERS[args.ladder], args.steps, args.warmup, args.seed,
+                        progress=lambda row: print(format_row(row)))
+    if args.out:
+        with open(args.out, "w") as out_file:
+            json.dump(results, out_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.threshold)
+        for case, metric, old, new, change in regressions:
+            print(f"REGRESSION {case}: {metric} {old:.4g} -> {new:.4g} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
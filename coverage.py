@@ -0,0 +1,68 @@
+# Sweep orientations
+ROWS = "rows"  # Row by row, alternating left-to-right and right-to-left
+COLUMNS = "columns"  # Column by column, alternating bottom-to-top and top-to-bottom
+
+
+class CoveragePath:
+    """
+    Boustrophedon sweep over a band of the field, computed by index arithmetic.
+    The i-th cell is derived on demand, so a path costs O(1) memory whatever
+    the grid size and can be shared by every drone that flies it.
+    """
+
+    def __init__(self, width, height, orientation, start, stop):
+        self.width = width
+        self.height = height
+        self.orientation = orientation
+        self.start = start  # First row (ROWS) or column (COLUMNS) of the band
+        self.stop = stop  # One past the last row or column of the band
+        self.lane_length = width if orientation == ROWS else height
+
+    def __len__(self):
+        return (self.stop - self.start) * self.lane_length
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError("coverage path index out of range")
+        lane, offset = divmod(index, self.lane_length)
+        if lane % 2:
+            offset = self.lane_length - 1 - offset  # Odd lanes are swept backwards
+        if self.orientation == ROWS:
+            return (offset, self.start + lane)
+        return (self.start + lane, offset)
+
+    def index(self, pos):
+        """Position of a cell along the path; ValueError if the path does not visit it."""
+        x, y = pos
+        lane, offset = (y - self.start, x) if self.orientation == ROWS else (x - self.start, y)
+        if not (0 <= lane < self.stop - self.start and 0 <= offset < self.lane_length):
+            raise ValueError(f"{pos} is not on the coverage path")
+        if lane % 2:
+            offset = self.lane_length - 1 - offset
+        return lane * self.lane_length + offset
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class CoveragePlanner:
+    """Hands out coverage paths, sharing one instance per orientation and strip."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.paths = {}
+
+    def path(self, orientation, strip=0, strips=1):
+        """
+        Return the sweep of one of `strips` disjoint bands of the field.
+        Bands split the rows for ROWS and the columns for COLUMNS as evenly as possible.
+        """
+        key = (orientation, strip, strips)
+        if key not in self.paths:
+            lanes = self.height if orientation == ROWS else self.width
+            start = strip * lanes // strips
+            stop = (strip + 1) * lanes // strips
+            self.paths[key] = CoveragePath(self.width, self.height, orientation, start, stop)
+        return self.paths[key]
@@ -0,0 +1,133 @@
+import numpy as np
+
+# Constants
+REGROWTH_STEPS = 50  # Steps a picked-but-grown cluster waits before it can be picked again
+DEFAULT_MAX_AGE = 50  # Age at which a picked cluster is fully grown again
+
+
+class CropCell:
+    """
+    Lightweight view of one cell of a CropField.
+    Exposes the same attributes as a strawberry cluster agent so drones and
+    pickers can query and pick it without knowing where the state lives.
+    """
+    __slots__ = ("field", "pos")
+
+    def __init__(self, field, pos):
+        self.field = field
+        self.pos = pos
+
+    @property
+    def is_grown(self):
+        return bool(self.field.is_grown[self.pos])
+
+    @is_grown.setter
+    def is_grown(self, value):
+        self.field.is_grown[self.pos] = value
+
+    @property
+    def picked(self):
+        return bool(self.field.picked[self.pos])
+
+    @picked.setter
+    def picked(self, value):
+        self.field.picked[self.pos] = value
+
+    @property
+    def age(self):
+        return int(self.field.age[self.pos])
+
+    @age.setter
+    def age(self, value):
+        self.field.age[self.pos] = value
+
+    @property
+    def regrowth_timer(self):
+        return int(self.field.regrowth_timer[self.pos])
+
+    @regrowth_timer.setter
+    def regrowth_timer(self, value):
+        self.field.regrowth_timer[self.pos] = value
+
+    def __str__(self):
+        return f"CropCell(pos={self.pos}, age={self.age}, is_grown={self.is_grown}, picked={self.picked})"
+
+
+class CropField:
+    """
+    Keeps the state of every strawberry cluster in NumPy arrays indexed by cell
+    instead of one Mesa agent per cluster. The whole field is aged with one
+    vectorized update per model step.
+    """
+
+    def __init__(self, width, height, max_age=DEFAULT_MAX_AGE, regrows=True):
+        shape = (width, height)
+        self.width = width
+        self.height = height
+        self.max_age = max_age
+        self.regrows = regrows  # Basic mode clusters never grow back once picked
+        self.has_crop = np.zeros(shape, dtype=bool)
+        self.is_grown = np.zeros(shape, dtype=bool)
+        self.picked = np.zeros(shape, dtype=bool)
+        self.age = np.zeros(shape, dtype=np.int32)
+        self.regrowth_timer = np.zeros(shape, dtype=np.int32)
+
+    def add(self, pos):
+        """Plant a fully grown cluster at the given cell, or at every cell of a boolean mask."""
+        self.has_crop[pos] = True
+        self.is_grown[pos] = True
+        self.picked[pos] = False
+        self.age[pos] = 0
+        self.regrowth_timer[pos] = 0
+
+    def __len__(self):
+        return int(self.has_crop.sum())
+
+    def positions(self):
+        """Return the cells that hold a cluster as a list of (x, y) tuples."""
+        return [(int(x), int(y)) for x, y in zip(*np.nonzero(self.has_crop))]
+
+    def has_grown_crop(self, pos):
+        return bool(self.is_grown[pos])
+
+    def cell(self, pos):
+        """Return a view of the cluster at pos, or None if the cell has no cluster."""
+        if not self.has_crop[pos]:
+            return None
+        return CropCell(self, pos)
+
+    def pick(self, pos):
+        """
+        Pick the cluster at pos if it is grown.
+        Returns True if something was picked.
+        """
+        if not self.is_grown[pos]:
+            return False
+        self.is_grown[pos] = False
+        self.picked[pos] = True
+        self.age[pos] = 0
+        return True
+
+    def step(self):
+        """
+        Age every cluster at once. Mirrors ExtendedStrawberryCluster.step:
+        clusters that are not grown age until max_age, grown clusters that are
+        still flagged as picked wait REGROWTH_STEPS before they are ready again.
+        """
+        if not self.regrows:
+            return
+
+        was_grown = self.has_crop & self.is_grown
+        growing = self.has_crop & ~self.is_grown
+
+        self.age += growing
+        ripe = growing & (self.age >= self.max_age)
+        self.is_grown |= ripe
+        self.picked &= ~ripe
+        self.regrowth_timer[ripe] = 0
+
+        waiting = was_grown & self.picked
+        self.regrowth_timer += waiting
+        regrown = waiting & (self.regrowth_timer >= REGROWTH_STEPS)
+        self.picked &= ~regrown
+        self.regrowth_timer[regrown] = 0
@@ -0,0 +1,68 @@
+from collections import OrderedDict, deque
+
+# Dispatch policies
+FIFO = "fifo"  # The picker that has been idle the longest
+NEAREST = "nearest"  # The idle picker closest to the discovery
+LEAST_LOADED = "least_loaded"  # The idle picker with the emptiest storage
+
+POLICIES = (FIFO, NEAREST, LEAST_LOADED)
+
+
+class PickerPool:
+    """
+    Pool of idle picker robots.
+
+    Pickers join when they become Idle and leave on any other state, so
+    dispatching a discovery no longer scans the schedule. Discoveries that
+    arrive while every picker is busy are queued instead of dropped.
+    """
+
+    def __init__(self, policy=FIFO, index=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown dispatch policy {policy!r}, expected one of {POLICIES}")
+        if policy == NEAREST and index is None:
+            raise ValueError("The nearest policy needs a picker position index")
+        self.policy = policy
+        self.index = index
+        self.idle = OrderedDict()  # picker -> None, in the order they became idle
+        self.pending = deque()  # locations waiting for a free picker
+        self.pending_set = set()
+
+    def __len__(self):
+        return len(self.idle)
+
+    def __contains__(self, picker):
+        return picker in self.idle
+
+    def join(self, picker):
+        self.idle[picker] = None
+
+    def leave(self, picker):
+        self.idle.pop(picker, None)
+
+    def acquire(self, location):
+        """Take an idle picker out of the pool according to the policy, or return None."""
+        if not self.idle:
+            return None
+        if self.policy == FIFO:
+            picker, _ = self.idle.popitem(last=False)
+            return picker
+        if self.policy == NEAREST:
+            nearest = self.index.nearest(location, 1, self.idle.__contains__)
+            picker = nearest[0] if nearest else None
+        else:
+            picker = min(self.idle, key=lambda candidate: (candidate.storage, candidate.unique_id))
+        if picker is not None:
+            del self.idle[picker]
+        return picker
+
+    def defer(self, location):
+        """Queue a discovery until a picker is free. Duplicate locations are queued once."""
+        if location not in self.pending_set:
+            self.pending.append(location)
+            self.pending_set.add(location)
+
+    def next_pending(self):
+        location = self.pending.popleft()
+        self.pending_set.discard(location)
+        return location
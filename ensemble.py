@@ -0,0 +1,174 @@
+"""
+Monte Carlo ensembles of FarmModel runs.
+
+An ensemble runs K independent replicas of one configuration and reports a
+KPI trajectory per replica plus the mean and a confidence interval of every
+KPI, e.g.
+
+    python -m AutounomousAgents.ensemble --mode Basic --replicas 1000 --steps 500
+    python -m AutounomousAgents.ensemble --mode Extended --replicas 50 --steps 500
+
+Basic mode advances all replicas together on one BasicFleet, with a leading
+replica axis on every state array, so the Python work per tick is shared by
+the whole batch. Extended and Systematic agents are not vectorized, so their
+replicas are ordinary FarmModels stepped in lockstep.
+"""
+import argparse
+import csv
+from statistics import NormalDist
+
+import numpy as np
+
+from .kpi import KPICounters, SERIES_FIELDS, COUNTER_FIELDS
+from .model import FarmModel, BATTERY_CAPACITY
+from .vectorized import BasicFleet
+
+KPI_SERIES = SERIES_FIELDS[1:]  # Everything but the step column
+DEFAULT_CONFIDENCE = 0.95
+
+
+class EnsembleKPIs(KPICounters):
+    """KPICounters for a batch of replicas: every counter is an array with one entry per replica."""
+
+    def __init__(self, replicas, num_drones, num_pickers, battery_capacity):
+        super().__init__(num_drones, num_pickers, battery_capacity)
+        for field in COUNTER_FIELDS[2:]:  # Everything but the fleet size, which all replicas share
+            setattr(self, field, np.full(replicas, getattr(self, field)))
+
+    def add(self, counts):
+        """Add one tick of BasicFleet counts."""
+        self.total_picked += counts["picked"]
+        self.drone_energy += counts["drone_energy"]
+        self.picker_energy += counts["picker_energy"]
+        self.discoveries += counts["found"]
+        self.recharges += counts["recharges"]
+        self.battery_sum += counts["battery_after"] - counts["battery_before"]
+        self.battery_sum -= counts["drone_energy"] + counts["picker_energy"]
+
+
+class EnsembleResult:
+    """
+    KPI trajectories of every replica: trajectories[field] has one row per
+    step and one column per replica, like KPICounters.series() side by side.
+    """
+
+    def __init__(self, params, seed, steps, trajectories):
+        self.params = params
+        self.seed = seed
+        self.steps = steps  # Step number of each row
+        self.trajectories = trajectories
+
+    @property
+    def replicas(self):
+        return self.trajectories[KPI_SERIES[0]].shape[1]
+
+    def final(self):
+        """KPIs of every replica after the last step."""
+        return {field: values[-1] for field, values in self.trajectories.items()}
+
+    def interval(self, values, confidence=DEFAULT_CONFIDENCE):
+        """Mean, standard deviation and normal-approximation confidence interval over the last axis."""
+        values = np.asarray(values, dtype=float)
+        mean = values.mean(axis=-1)
+        std = values.std(axis=-1, ddof=1) if values.shape[-1] > 1 else np.zeros_like(mean)
+        half_width = NormalDist().inv_cdf(0.5 + confidence / 2) * std / np.sqrt(values.shape[-1])
+        return mean, std, mean - half_width, mean + half_width
+
+    def summary(self, confidence=DEFAULT_CONFIDENCE):
+        """Mean, std and confidence interval of every final KPI across the replicas."""
+        summary = {}
+        for field, values in self.final().items():
+            mean, std, low, high = self.interval(values, confidence)
+            summary[field] = {"mean": float(mean), "std": float(std), "ci_low": float(low), "ci_high": float(high)}
+        return summary
+
+    def series_summary(self, field, confidence=DEFAULT_CONFIDENCE):
+        """Per-step mean and confidence bounds of one KPI, e.g. for plotting a band."""
+        mean, std, low, high = self.interval(self.trajectories[field], confidence)
+        return {"step": self.steps, "mean": mean, "ci_low": low, "ci_high": high}
+
+    def to_csv(self, path):
+        """Write one row per replica and step."""
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["replica"] + SERIES_FIELDS)
+            for replica in range(self.replicas):
+                for row, step in enumerate(self.steps):
+                    writer.writerow([replica, int(step)] + [self.trajectories[field][row, replica].item()
+                                                            for field in KPI_SERIES])
+
+
+def replica_seeds(seed, replicas):
+    """One FarmModel seed per replica, derived from the ensemble seed."""
+    return [int(value) for value in np.random.SeedSequence(seed).generate_state(replicas)]
+
+
+def build_farms(seeds, extended_mode, num_drones, num_pickers, num_clusters, **kwargs):
+    return [FarmModel(num_drones, num_pickers, num_clusters, extended_mode, seed=seed, **kwargs)
+            for seed in seeds]
+
+
+def run_basic(replicas, steps, num_drones, num_pickers, num_clusters, seed=None, **kwargs):
+    """Run a Basic-mode ensemble on one BasicFleet. Each replica has its own seeded farm layout."""
+    kwargs["crop_field"] = True
+    farms = build_farms(replica_seeds(seed, replicas), "Basic", 0, 0, num_clusters, **kwargs)
+    fleet = BasicFleet(farms, num_drones, num_pickers, np.random.default_rng(np.random.SeedSequence(seed)))
+    kpis = EnsembleKPIs(replicas, num_drones, num_pickers, BATTERY_CAPACITY)
+
+    trajectories = {field: np.empty((steps, replicas)) for field in KPI_SERIES}
+    for row in range(steps):
+        kpis.add(fleet.step())
+        for field, values in kpis.snapshot().items():
+            trajectories[field][row] = values
+    return trajectories
+
+
+def run_lockstep(replicas, steps, extended_mode, num_drones, num_pickers, num_clusters, seed=None, **kwargs):
+    """Run an ensemble of ordinary FarmModels, stepping every replica once per tick."""
+    models = build_farms(replica_seeds(seed, replicas), extended_mode, num_drones, num_pickers, num_clusters, **kwargs)
+    trajectories = {field: np.empty((steps, replicas)) for field in KPI_SERIES}
+    for row in range(steps):
+        for replica, model in enumerate(models):
+            model.step()
+            for field, value in model.kpis.snapshot().items():
+                trajectories[field][row, replica] = value
+    return trajectories
+
+
+def run_ensemble(replicas, steps, num_drones, num_pickers, num_clusters, extended_mode="Basic", seed=None, **kwargs):
+    """
+    Run replicas independent copies of one configuration for the given
+    number of steps and return an EnsembleResult. Extra keyword arguments go
+    to FarmModel.
+    """
+    params = dict(num_drones=num_drones, num_pickers=num_pickers, num_clusters=num_clusters, extended_mode=extended_mode)
+    if extended_mode == "Basic":
+        trajectories = run_basic(replicas, steps, num_drones, num_pickers, num_clusters, seed, **kwargs)
+    else:
+        trajectories = run_lockstep(replicas, steps, extended_mode, num_drones, num_pickers, num_clusters, seed, **kwargs)
+    return EnsembleResult(params, seed, np.arange(1, steps + 1), trajectories)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Monte Carlo ensemble of FarmModel replicas.")
+    parser.add_argument("--drones", type=int, default=2)
+    parser.add_argument("--pickers", type=int, default=3)
+    parser.add_argument("--clusters", type=int, default=5)
+    parser.add_argument("--mode", default="Basic", choices=["Basic", "Extended", "Systematic"])
+    parser.add_argument("--replicas", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE)
+    parser.add_argument("--out", default=None, help="write every replica's trajectory as CSV")
+    args = parser.parse_args(argv)
+
+    result = run_ensemble(args.replicas, args.steps, args.drones, args.pickers, args.clusters, args.mode, args.seed)
+    print(f"{args.mode}: {result.replicas} replicas, {args.steps} steps, {args.confidence:.0%} intervals")
+    for field, stats in result.summary(args.confidence).items():
+        print(f"  {field:24} {stats['mean']:10.4g}  [{stats['ci_low']:.4g}, {stats['ci_high']:.4g}]  sd={stats['std']:.4g}")
+    if args.out:
+        result.to_csv(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Interactive server whose simulation runs on its own thread.
+
+ModularServer steps the model inside the frame request, so the model can
+never run faster than the browser draws. FastForwardServer moves stepping
+to a SimulationRunner thread: each frame request allows the model to run
+a configurable number of steps ahead and renders whatever state it has
+reached, and the browser controls can pause it or let it run flat out to
+a given step.
+"""
+import contextlib
+import os
+import threading
+import time
+
+import tornado.escape
+from mesa.visualization.ModularVisualization import ModularServer, SocketHandler, VisualizationElement
+
+DEFAULT_STEPS_PER_FRAME = 1
+
+
+class SimulationRunner:
+    """
+    Steps a model on a background thread up to a target step.
+
+    Frames are rendered inside frame(), which waits for the step in progress
+    to finish and holds the worker until the frame is drawn, so a frame
+    always shows the state between two steps.
+    """
+
+    def __init__(self, model, steps_per_frame=DEFAULT_STEPS_PER_FRAME):
+        self.model = model
+        self.steps_per_frame = steps_per_frame
+        self.target = model.schedule.steps
+        self.stop_at = None  # Step a skip should hold at
+        self.paused = False
+        self.stopped = False
+        self.condition = threading.Condition()
+        self.frame_requested = threading.Event()
+        self.rate_mark = (time.perf_counter(), self.target)
+        self.steps_per_sec = 0.0
+        self.thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self.thread.start()
+
+    @property
+    def steps(self):
+        return self.model.schedule.steps
+
+    def _has_work(self):
+        return (not self.paused and not self.frame_requested.is_set()
+                and self.model.running and self.steps < self.target)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and not self._has_work():
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                self.model.step()
+
+    def _set_target(self, target):
+        self.target = target
+        self.condition.notify_all()
+
+    def advance(self):
+        """Called once per frame: let the model get up to steps_per_frame ahead of where it is."""
+        with self.condition:
+            if self.paused:
+                return
+            target = max(self.target, self.steps + self.steps_per_frame)
+            if self.stop_at is not None:
+                target = min(target, self.stop_at)
+            self._set_target(target)
+
+    def skip_to(self, step):
+        """Run at full speed to the given step and hold there until resumed."""
+        with self.condition:
+            self.paused = False
+            self.stop_at = step
+            self._set_target(step)
+
+    def set_steps_per_frame(self, steps):
+        with self.condition:
+            self.steps_per_frame = max(1, int(steps))
+
+    def pause(self):
+        with self.condition:
+            self.paused = True
+            self.target = self.steps
+
+    def resume(self):
+        with self.condition:
+            self.paused = False
+            self.stop_at = None
+            self.condition.notify_all()
+
+    def wait_until_idle(self, timeout=None):
+        """Block until the worker has reached its target, or is paused. Returns False on timeout."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            with self.condition:
+                if self.paused or self.steps >= self.target or not self.model.running:
+                    return True
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            time.sleep(0.001)
+
+    @contextlib.contextmanager
+    def frame(self):
+        """Hold the model still while a frame is rendered from it."""
+        self.frame_requested.set()
+        try:
+            with self.condition:
+                yield self.model
+        finally:
+            self.frame_requested.clear()
+            with self.condition:
+                self.condition.notify_all()
+
+    def status(self):
+        now, steps = time.perf_counter(), self.steps
+        then, steps_then = self.rate_mark
+        if now - then >= 0.5:
+            self.steps_per_sec = (steps - steps_then) / (now - then)
+            self.rate_mark = (now, steps)
+        return {
+            "step": steps,
+            "target": self.target,
+            "stop_at": self.stop_at,
+            "steps_per_frame": self.steps_per_frame,
+            "paused": self.paused,
+            "steps_per_sec": self.steps_per_sec,
+        }
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.thread.join(timeout=1)
+
+
+class SimulationControls(VisualizationElement):
+    """Browser controls for the runner: steps per frame, skip to step, pause and resume."""
+
+    local_includes = ["SimulationControls.js"]
+    local_dir = os.path.dirname(os.path.abspath(__file__))
+    js_code = "elements.push(new SimulationControls());"
+
+    def __init__(self):
+        super().__init__()
+        self.server = None  # Set by FastForwardServer
+
+    def render(self, model):
+        return self.server.runner.status()
+
+
+class FastForwardSocketHandler(SocketHandler):
+    def on_message(self, message):
+        msg = tornado.escape.json_decode(message)
+        if msg["type"] == "get_step":
+            if not self.application.model.running:
+                self.write_message({"type": "end"})
+            else:
+                self.application.runner.advance()
+                self.write_message(self.viz_state_message)
+        elif msg["type"] == "sim_control":
+            self.application.control(msg)
+            self.write_message(self.viz_state_message)
+        else:
+            super().on_message(message)
+
+
+class FastForwardServer(ModularServer):
+    """ModularServer that steps the model on a SimulationRunner thread instead of in the frame request."""
+
+    def __init__(self, model_cls, visualization_elements, name="Mesa Model", model_params=None, port=None,
+                 steps_per_frame=DEFAULT_STEPS_PER_FRAME):
+        self.runner = None
+        self.steps_per_frame = steps_per_frame
+        self.controls = SimulationControls()
+        self.controls.server = self
+        super().__init__(model_cls, [self.controls] + list(visualization_elements), name, model_params, port)
+        self.verbose = False  # Control messages arrive many times a second
+        # Added rules are matched before the ones ModularServer registered
+        self.add_handlers(r".*$", [(r"/ws", FastForwardSocketHandler)])
+
+    def reset_model(self):
+        if self.runner is not None:
+            self.steps_per_frame = self.runner.steps_per_frame
+            self.runner.stop()
+        super().reset_model()
+        self.runner = SimulationRunner(self.model, self.steps_per_frame)
+
+    def render_model(self):
+        with self.runner.frame():
+            return super().render_model()
+
+    def control(self, msg):
+        if "steps_per_frame" in msg:
+            self.runner.set_steps_per_frame(msg["steps_per_frame"])
+        if "skip_to" in msg:
+            self.runner.skip_to(int(msg["skip_to"]))
+        if msg.get("pause"):
+            self.runner.pause()
+        if msg.get("resume"):
+            self.runner.resume()
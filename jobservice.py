@@ -0,0 +1,350 @@
+"""
+Local job service for FarmModel runs.
+
+The service listens on localhost and speaks newline-delimited JSON, so any
+TCP client will do, even `nc localhost 8765`. A request is one object per
+line:
+
+    {"op": "submit", "config": {"mode": "Extended", "drones": 3, "pickers": 5, "clusters": 5, "steps": 500, "seed": 1}}
+    {"op": "cancel", "job": 4}
+    {"op": "status"}
+
+Submitted runs wait in a bounded queue and execute on a fixed pool of
+worker processes. When the queue is full a submit is rejected straight
+away with "queue full" instead of piling up. The connection that
+submitted a job is sent its events as they happen: queued, started,
+progress every few hundred steps, then done with the final KPIs,
+cancelled or failed. Cancelling a queued job drops it; a running job
+stops within a few steps and its worker takes the next job. A job whose
+worker process dies fails, and a fresh worker takes its place.
+
+    python -m AutounomousAgents.jobservice serve --workers 4
+    python -m AutounomousAgents.jobservice submit --mode Extended --drones 3 --steps 1000
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+
+from .model import FarmModel
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_PROGRESS_EVERY = 100  # Steps between progress events
+CANCEL_CHECK_EVERY = 10  # Steps between checks for a cancel request
+
+# Job config key -> (FarmModel argument, type, default)
+CONFIG_FIELDS = {
+    "mode": ("extended_mode", str, "Basic"),
+    "drones": ("num_drones", int, 2),
+    "pickers": ("num_pickers", int, 3),
+    "clusters": ("num_clusters", int, 5),
+    "steps": (None, int, 500),
+    "seed": ("seed", int, None),
+}
+MODES = ["Basic", "Extended", "Systematic"]
+MAX_STEPS = 1_000_000
+
+
+def parse_config(config):
+    """Validate a job config and fill in defaults. Raises ValueError with a message for the client."""
+    if not isinstance(config, dict):
+        raise ValueError("config must be a JSON object")
+    unknown = set(config) - set(CONFIG_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown config keys: {', '.join(sorted(unknown))}")
+    parsed = {}
+    for key, (_, kind, default) in CONFIG_FIELDS.items():
+        value = config.get(key, default)
+        if value is not None and (not isinstance(value, kind) or isinstance(value, bool)):
+            raise ValueError(f"{key} must be {kind.__name__}")
+        parsed[key] = value
+    if parsed["mode"] not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    if min(parsed["drones"], parsed["pickers"], parsed["clusters"]) < 0:
+        raise ValueError("drones, pickers and clusters cannot be negative")
+    if not 0 < parsed["steps"] <= MAX_STEPS:
+        raise ValueError(f"steps must be between 1 and {MAX_STEPS}")
+    return parsed
+
+
+def run_job(connection, config, progress_every):
+    """Step one model, reporting progress, and stop early if the server asks to cancel."""
+    params = {argument: config[key] for key, (argument, _, _) in CONFIG_FIELDS.items() if argument}
+    model = FarmModel(**params)
+    for step in range(1, config["steps"] + 1):
+        model.step()
+        if step == config["steps"]:
+            break
+        if step % CANCEL_CHECK_EVERY == 0 and connection.poll() and connection.recv() == "cancel":
+            return ("cancelled", {"step": step})
+        if step % progress_every == 0:
+            connection.send(("progress", {"step": step, "kpis": model.kpis.snapshot()}))
+    return ("done", {"step": config["steps"], "kpis": model.kpis.snapshot()})
+
+
+def worker_loop(connection, progress_every):
+    """Process loop of one pool worker: run jobs until told to stop."""
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+        if message == "cancel":
+            continue  # Arrived after the job it was meant for had finished
+        try:
+            connection.send(run_job(connection, message, progress_every))
+        except Exception as error:
+            connection.send(("failed", {"error": f"{type(error).__name__}: {error}"}))
+
+
+class Job:
+    def __init__(self, job_id, config, listener):
+        self.id = job_id
+        self.config = config
+        self.state = "queued"
+        self.listener = listener  # Called with every event of this job
+        self.connection = None  # Pipe to the worker running it
+        self.result = None
+
+    def emit(self, event, **fields):
+        self.listener({"event": event, "job": self.id, **fields})
+
+
+class JobService:
+    """
+    Bounded queue of jobs in front of a fixed pool of worker processes.
+    Each worker is driven by one asyncio task that hands it the next job
+    and relays its messages as events.
+    """
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE_SIZE, progress_every=DEFAULT_PROGRESS_EVERY):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.progress_every = progress_every
+        self.jobs = {}
+        self.ids = itertools.count(1)
+        self.queue = None
+        self.tasks = []
+        self.processes = []
+
+    async def start(self):
+        self.queue = asyncio.Queue(self.queue_size)
+        for index in range(self.workers):
+            self.processes.append(None)
+            self.tasks.append(asyncio.create_task(self.drive(index)))
+
+    def spawn_worker(self, index):
+        """Start worker process index, replacing a dead one, and return the service's end of its pipe."""
+        old = self.processes[index]
+        if old is not None:
+            old.terminate()
+            old.join(timeout=5)
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=worker_loop, args=(child, self.progress_every),
+                                          name=f"job-worker-{index}", daemon=True)
+        process.start()
+        child.close()
+        self.processes[index] = process
+        return parent
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for process in self.processes:
+            if process is not None:
+                process.terminate()
+                process.join(timeout=5)
+
+    def submit(self, config, listener):
+        """Queue a job and return it. Raises ValueError for a bad config and asyncio.QueueFull when the queue is full."""
+        config = parse_config(config)
+        job = Job(next(self.ids), config, listener)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        job.emit("queued", position=self.queue.qsize())
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.state not in ("queued", "running"):
+            return False
+        if job.state == "queued":
+            job.state = "cancelled"  # The worker task skips it when it comes up
+            job.emit("cancelled", step=0)
+        else:
+            # The worker checks for it every few steps; if it has died, drive() fails the job instead
+            with contextlib.suppress(BrokenPipeError, OSError):
+                job.connection.send("cancel")
+        return True
+
+    def status(self):
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.state] = counts.get(job.state, 0) + 1
+        return {"workers": self.workers, "queued": self.queue.qsize(), "queue_size": self.queue_size, "jobs": counts}
+
+    async def drive(self, index):
+        """
+        Feed worker process index jobs from the queue for as long as the
+        service runs. If the worker dies mid-job, the job fails and a new
+        worker process takes over.
+        """
+        connection = self.spawn_worker(index)
+        while True:
+            job = await self.queue.get()
+            if job.state == "cancelled":
+                continue
+            job.state = "running"
+            job.connection = connection
+            job.emit("started")
+            try:
+                connection.send(job.config)
+                while True:
+                    kind, fields = await asyncio.to_thread(connection.recv)
+                    if kind != "progress":
+                        break
+                    job.emit("progress", **fields)
+            except (EOFError, BrokenPipeError, ConnectionResetError):
+                kind, fields = "failed", {"error": "worker process exited"}
+                connection.close()
+                connection = self.spawn_worker(index)
+            job.state = kind
+            job.connection = None
+            job.result = fields
+            job.emit(kind, **fields)
+
+    async def handle_client(self, reader, writer):
+        def send(message):
+            if not writer.is_closing():
+                writer.write(json.dumps(message).encode() + b"\n")
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    op = request["op"]
+                except (ValueError, KeyError, TypeError):
+                    send({"event": "error", "reason": "expected a JSON object with an op"})
+                    continue
+                if op == "submit":
+                    try:
+                        self.submit(request.get("config", {}), send)
+                    except ValueError as error:
+                        send({"event": "rejected", "reason": str(error)})
+                    except asyncio.QueueFull:
+                        send({"event": "rejected", "reason": "queue full"})
+                elif op == "cancel":
+                    if not self.cancel(request.get("job")):
+                        send({"event": "error", "reason": "no such queued or running job", "job": request.get("job")})
+                elif op == "status":
+                    send({"event": "status", **self.status()})
+                else:
+                    send({"event": "error", "reason": f"unknown op {op!r}"})
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        await self.start()
+        server = await asyncio.start_server(self.handle_client, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+
+class JobClient:
+    """Minimal client: submit configs and iterate over the events the service sends back."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def request(self, **request):
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+
+    async def submit(self, **config):
+        await self.request(op="submit", config=config)
+
+    async def cancel(self, job_id):
+        await self.request(op="cancel", job=job_id)
+
+    async def events(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            yield json.loads(line)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def submit_and_follow(host, port, configs):
+    """Submit every config and print events until all of them have finished."""
+    client = await JobClient(host, port).connect()
+    for config in configs:
+        await client.submit(**config)
+    pending = len(configs)
+    async for event in client.events():
+        print(json.dumps(event))
+        if event["event"] in ("done", "cancelled", "failed", "rejected"):
+            pending -= 1
+            if not pending:
+                break
+    await client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Queue FarmModel runs on a local worker pool.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the service")
+    serve.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    serve.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    serve.add_argument("--progress-every", type=int, default=DEFAULT_PROGRESS_EVERY)
+
+    submit = commands.add_parser("submit", help="submit runs and stream their events")
+    submit.add_argument("--mode", default="Basic", choices=MODES)
+    submit.add_argument("--drones", type=int, nargs="+", default=[2])
+    submit.add_argument("--pickers", type=int, nargs="+", default=[3])
+    submit.add_argument("--clusters", type=int, default=5)
+    submit.add_argument("--steps", type=int, default=500)
+    submit.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        service = JobService(args.workers, args.queue_size, args.progress_every)
+        print(f"Serving FarmModel jobs on {args.host}:{args.port} with {service.workers} workers")
+        with contextlib.suppress(KeyboardInterrupt):
+            asyncio.run(service.serve(args.host, args.port))
+    else:
+        configs = [
+            {"mode": args.mode, "drones": drones, "pickers": pickers, "clusters": args.clusters,
+             "steps": args.steps, "seed": args.seed}
+            for drones in args.drones for pickers in args.pickers
+        ]
+        asyncio.run(submit_and_follow(args.host, args.port, configs))
+
+
+if __name__ == "__main__":
+    main()
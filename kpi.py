@@ -0,0 +1,100 @@
+import csv
+
+# Per-step columns exported by KPICounters.series()
+SERIES_FIELDS = ["step", "total_picked", "total_energy", "avg_picked_per_agent", "avg_battery", "exploration_efficiency"]
+
+# Raw counters behind the KPIs, enough to add up the KPIs of several models
+COUNTER_FIELDS = ["num_drones", "num_pickers", "total_picked", "drone_energy", "picker_energy", "discoveries", "recharges", "battery_sum"]
+
+
+class KPICounters:
+    """
+    Running totals for the farm KPIs: total picked, total energy consumed,
+    average picked per picker, average battery level and exploration efficiency.
+
+    Agents update the counters at the points where they pick, spend battery or
+    recharge, so every KPI can be read in O(1) instead of rescanning the agents.
+    """
+
+    def __init__(self, num_drones, num_pickers, battery_capacity):
+        self.num_drones = num_drones
+        self.num_pickers = num_pickers
+        self.total_picked = 0
+        self.drone_energy = 0
+        self.picker_energy = 0
+        self.discoveries = 0  # Grown clusters found by drones
+        self.recharges = 0
+        self.battery_sum = battery_capacity * (num_drones + num_pickers)
+        self.history = {field: [] for field in SERIES_FIELDS}
+
+    def picked(self, count=1):
+        self.total_picked += count
+
+    def drone_energy_used(self, amount=1):
+        self.drone_energy += amount
+        self.battery_sum -= amount
+
+    def picker_energy_used(self, amount=1):
+        self.picker_energy += amount
+        self.battery_sum -= amount
+
+    def found(self, count=1):
+        self.discoveries += count
+
+    def recharged(self, battery_before, battery_after, count=1):
+        """Battery levels are summed over the robots when count recharges are reported at once."""
+        self.recharges += count
+        self.battery_sum += battery_after - battery_before
+
+    @property
+    def total_energy(self):
+        return self.drone_energy + self.picker_energy
+
+    @property
+    def avg_picked_per_agent(self):
+        return self.total_picked / self.num_pickers if self.num_pickers else 0.0
+
+    @property
+    def avg_battery(self):
+        robots = self.num_drones + self.num_pickers
+        return self.battery_sum / robots if robots else 0.0
+
+    @property
+    def exploration_efficiency(self):
+        """Clusters found per exploration step (a drone spends battery on every step that finds nothing)."""
+        exploration_steps = self.discoveries + self.drone_energy
+        # 0 rather than 0/0 before any exploration, written so it also works on arrays of counters
+        return self.discoveries / (exploration_steps + (exploration_steps == 0))
+
+    def snapshot(self):
+        return {
+            "total_picked": self.total_picked,
+            "total_energy": self.total_energy,
+            "avg_picked_per_agent": self.avg_picked_per_agent,
+            "avg_battery": self.avg_battery,
+            "exploration_efficiency": self.exploration_efficiency,
+        }
+
+    def counters(self):
+        return {field: getattr(self, field) for field in COUNTER_FIELDS}
+
+    def set_totals(self, counters):
+        """Replace the counters with the sums of several counters() dicts, e.g. one per farm tile."""
+        for field in COUNTER_FIELDS:
+            setattr(self, field, sum(entry[field] for entry in counters))
+
+    def record(self, step):
+        """Append the current values to the per-step time series."""
+        self.history["step"].append(step)
+        for field, value in self.snapshot().items():
+            self.history[field].append(value)
+
+    def series(self):
+        """Return the time series as one list per column."""
+        return {field: list(values) for field, values in self.history.items()}
+
+    def to_csv(self, path):
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(SERIES_FIELDS)
+            writer.writerows(zip(*(self.history[field] for field in SERIES_FIELDS)))
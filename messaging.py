@@ -0,0 +1,113 @@
+import heapq
+import itertools
+from collections import defaultdict, namedtuple
+
+Message = namedtuple("Message", ["sender", "recipient", "topic", "payload", "sent_at"])
+
+
+class MessageBus:
+    """
+    Batched message bus between drones, pickers and the dispatcher.
+
+    Senders only enqueue. Once per tick the model calls deliver(), which
+    hands every due message to its recipient in one batch through
+    receive_messages(messages). Messages support unicast, broadcast to every
+    registered agent, and topic addressing, plus an optional delivery
+    latency (in ticks) and loss probability to model radio constraints.
+    """
+
+    def __init__(self, latency=0, loss=0.0, rng=None, on_drop=None):
+        if loss and rng is None:
+            raise ValueError("A lossy bus needs a random generator")
+        self.latency = latency
+        self.loss = loss
+        self.rng = rng
+        self.on_drop = on_drop  # Called with each lost message, e.g. to simulate an ack timeout
+        self.now = 0
+        self.members = []  # Agents reachable by broadcast
+        self.subscribers = defaultdict(list)  # topic -> subscribers
+        self.in_flight = []  # heap of (deliver_at, sequence, message)
+        self.sequence = itertools.count()
+        # Metrics
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.max_queue_depth = 0
+        self.throughput = []  # messages delivered per tick
+
+    def register(self, agent):
+        self.members.append(agent)
+
+    def unregister(self, agent):
+        """Remove an agent that is leaving; messages still on their way to it are dropped."""
+        self.members.remove(agent)
+        lost = [entry for entry in self.in_flight if entry[2].recipient is agent]
+        if lost:
+            self.in_flight = [entry for entry in self.in_flight if entry[2].recipient is not agent]
+            heapq.heapify(self.in_flight)
+            for _, _, message in sorted(lost):
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(message)
+
+    def subscribe(self, subscriber, topic):
+        self.subscribers[topic].append(subscriber)
+
+    def _enqueue(self, sender, recipient, topic, payload, latency):
+        delay = self.latency if latency is None else latency
+        message = Message(sender, recipient, topic, payload, self.now)
+        heapq.heappush(self.in_flight, (self.now + delay, next(self.sequence), message))
+        self.sent += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self.in_flight))
+
+    def send(self, sender, recipient, topic, payload, latency=None):
+        """Unicast a message to one recipient."""
+        self._enqueue(sender, recipient, topic, payload, latency)
+
+    def broadcast(self, sender, topic, payload, latency=None):
+        """Send a copy of the message to every registered agent except the sender."""
+        for member in self.members:
+            if member is not sender:
+                self._enqueue(sender, member, topic, payload, latency)
+
+    def publish(self, sender, topic, payload, latency=None):
+        """Send a copy of the message to every subscriber of the topic."""
+        for subscriber in self.subscribers[topic]:
+            self._enqueue(sender, subscriber, topic, payload, latency)
+
+    @property
+    def queue_depth(self):
+        return len(self.in_flight)
+
+    def deliver(self, tick):
+        """
+        Deliver every message due at tick, grouped per recipient.
+        Messages sent with no latency while delivering are delivered in the same call.
+        """
+        self.now = tick
+        delivered = 0
+        while self.in_flight and self.in_flight[0][0] <= tick:
+            mailboxes = defaultdict(list)
+            while self.in_flight and self.in_flight[0][0] <= tick:
+                _, _, message = heapq.heappop(self.in_flight)
+                if self.loss and self.rng.random() < self.loss:
+                    self.dropped += 1
+                    if self.on_drop is not None:
+                        self.on_drop(message)
+                    continue
+                mailboxes[message.recipient].append(message)
+            for recipient, messages in mailboxes.items():
+                recipient.receive_messages(messages)
+                delivered += len(messages)
+        self.delivered += delivered
+        self.throughput.append(delivered)
+        return delivered
+
+    def metrics(self):
+        return {
+            "sent": self.sent,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+        }
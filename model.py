@@ -1,109 +1,364 @@
 from mesa import Model
-from mesa.space import MultiGrid
-from mesa.time import RandomActivation
-import random
+import logging
+import numpy as np
+import pickle
+import zlib
+
+CHECKPOINT_MAGIC = b"FARMCKPT"  # Header of checkpoint files, followed by the format version in ASCII digits
+# Bump when a change to FarmModel or the objects it holds stops older pickles
+# from stepping; opt-in attributes with a default go in CHECKPOINT_DEFAULTS instead
+CHECKPOINT_VERSION = 3
+CHECKPOINT_DEFAULTS = {"recorder": None, "profiler": None}
+from .agent import GRID_WIDTH, GRID_HEIGHT, BATTERY_CAPACITY
+from .agent import BaseDroneAgent, BasicDroneAgent,BasicPickerRobotAgent, BasicStrawberryCluster,ExtendedDroneAgent,ExtendedPickerRobotAgent,ExtendedStrawberryCluster,SystematicDroneAgent,SystematicPickerRobotAgent,SystematicStrawberryCluster
+from .cropfield import CropField
+from .terrain import Terrain, FarmLayout, CHARGING_STATION
+from .navigation import Navigator
+from .coverage import CoveragePlanner, ROWS, COLUMNS
+from .tracing import Tracer
+from .kpi import KPICounters
+from .spatial import BucketIndex, IndexedMultiGrid
+from .dispatch import PickerPool, FIFO
+from .messaging import MessageBus
+from .scheduler import DormantActivation
+from .profiling import StepProfiler
+
+logger = logging.getLogger(__name__)
 
-# Constants
-GRID_WIDTH = 20
-GRID_HEIGHT = 20
-BATTERY_CAPACITY = 100
-STORAGE_CAPACITY = 5
-from .agent import Tree,BasicDroneAgent,BasicPickerRobotAgent, BasicStrawberryCluster, River, BasicStrawberryCluster,ExtendedDroneAgent,ExtendedPickerRobotAgent,ExtendedStrawberryCluster,ChargingStation,SystematicDroneAgent,SystematicPickerRobotAgent,SystematicStrawberryCluster
 
 class FarmModel(Model):
-    def __init__(self, num_drones, num_pickers, num_clusters,extended_mode= "Extended"):
-        self.grid = MultiGrid(GRID_WIDTH, GRID_HEIGHT, torus=False)
-        self.schedule = RandomActivation(self)
+    def __init__(self, num_drones, num_pickers, num_clusters,extended_mode= "Extended", crop_field=False, tracer=None, dispatch_policy=FIFO, message_latency=0, message_loss=0.0, partition_coverage=False, seed=None, width=GRID_WIDTH, height=GRID_HEIGHT, profiler=None, base_station=(0, 0), river_columns=None, x_origin=0, recorder=None, layout=None, first_id=0):
+        # Every random draw goes through self.random, which Mesa seeds from `seed`,
+        # so models in one process are independent and a seeded run is reproducible
+        super().__init__(seed=seed)
+
+        # Static layout: loaded from a .npy or text map if given, else the standard orchard generated for this size
+        if layout is None:
+            layout = FarmLayout.generate(width, height, self.random, base_station, river_columns, x_origin)
+        elif not isinstance(layout, FarmLayout):
+            layout = FarmLayout.load(layout)
+        width, height = layout.width, layout.height
+        self.width = width
+        self.height = height
+
+        # Picker positions are indexed in buckets so drones can find the nearest one without a full scan
+        self.picker_index = BucketIndex(width, height)
+        self.grid = IndexedMultiGrid(width, height, torus=False, index=self.picker_index)
+
+        # Idle pickers join this pool on state transitions, so dispatch never scans the schedule
+        self.picker_pool = PickerPool(dispatch_policy, self.picker_index)
+
+        # Drones, pickers and the dispatcher talk over a bus that delivers in bulk once per tick
+        self.bus = MessageBus(message_latency, message_loss, self.random, on_drop=self.message_dropped)
+        self.bus.subscribe(self, "crop_found")
+        # Only agents with pending work are stepped; idle pickers and waiting crops sleep
+        self.schedule = DormantActivation(self)
         self.systematic_mode = extended_mode == 'Systematic'
         self.extended_mode = extended_mode == 'Extended'
+
+        # Structured event tracing, disabled unless a configured Tracer is passed in
+        self.tracer = tracer if tracer is not None else Tracer()
+
+        # Running KPI counters, updated by the agents as they pick, spend battery and recharge
+        self.kpis = KPICounters(num_drones, num_pickers, BATTERY_CAPACITY)
+
+        # Optional array-backed crop field replacing one agent per strawberry cluster
+        self.crop_field = CropField(width, height, regrows=self.extended_mode or self.systematic_mode) if crop_field else None
         
         self.drones = []
-       
-            
-        # Base station location
-        self.base_station = (0, 0)
+        self.pickers = []
+
+        # Base station location; drones land on the pad next to it
+        self.base_station = layout.charging_station or base_station
+        self.drone_station = (self.base_station[0] + 1, self.base_station[1])
 
         # Create agents
         DroneAgent = ExtendedDroneAgent if self.extended_mode else (SystematicDroneAgent if self.systematic_mode else BasicDroneAgent)
         PickerRobotAgent = ExtendedPickerRobotAgent if self.extended_mode else SystematicPickerRobotAgent if self.systematic_mode else BasicPickerRobotAgent
         StrawberryCluster = ExtendedStrawberryCluster if self.extended_mode else SystematicStrawberryCluster if self.systematic_mode else BasicStrawberryCluster
-        print(f"Using DroneAgent: {DroneAgent.__name__}")
-        print(f"Using PickerRobotAgent: {PickerRobotAgent.__name__}")
-        print(f"Using StrawberryCluster: {StrawberryCluster.__name__}")
+        self.cluster_class = StrawberryCluster
+
+        # Spatial indexes so agents can answer "is there a ripe crop / tree here?" in O(1)
+        self.crops = {}  # pos -> strawberry cluster agent
+        self.grown_crops = set()  # positions of clusters that are ready to pick
+        logger.debug("Using %s, %s and %s", DroneAgent.__name__, PickerRobotAgent.__name__, StrawberryCluster.__name__)
 
-        for i in range(num_drones):
+        # Robot ids start at first_id, e.g. so they stay unique across the tiles of one orchard
+        for i in range(first_id, first_id + num_drones):
             drone = DroneAgent(i, self)
+            drone.station = self.drone_station
             self.grid.place_agent(drone, self.base_station)
-            
+            self.drones.append(drone)
+            self.bus.register(drone)
             self.schedule.add(drone)
 
-        for i in range(num_drones, num_drones + num_pickers):
+        for i in range(first_id + num_drones, first_id + num_drones + num_pickers):
             picker = PickerRobotAgent(i, self)
             self.grid.place_agent(picker, self.base_station)
+            self.picker_index.add(picker, self.base_station)
+            self.pickers.append(picker)
+            self.bus.register(picker)
             self.schedule.add(picker)
 
-        # Place the charging station near the base station
-        charging_station = ChargingStation(num_drones + num_pickers + num_clusters, self)
-        self.grid.place_agent(charging_station, (0, 0))
-
-        # Place trees and strawberries together in rows
-        tree_id = num_drones + num_pickers
-        river_x2 = tree_id
-
-        bottom_row = GRID_HEIGHT - 1 # Leave space at the top and bottom
-
-        for x in range(2, GRID_WIDTH, 3):  
-            for y in range(bottom_row, 1, -1):  # Start from the bottom row and go upwards
-                if y == bottom_row or y == 1:  # Add extra space at the top and bottom
-                    continue
-
-                tree = Tree(tree_id, self)
-                self.grid.place_agent(tree, (x, y))
-                tree_id += 1
-
-                if random.random() < 0.5:  # 50% chance to place a strawberry
-                    cluster = StrawberryCluster(tree_id, self)
-                    self.grid.place_agent(cluster, (x, y))
-                    self.schedule.add(cluster)
-                    tree_id += 1
-
-            # Adjust the column position for the next set of trees to create a gap between columns
-            # Move the x-coordinate for the next set of trees to create the gap between columns
-            x += 4
-
-        # Place river in the middle of the grid
-        river_id = tree_id
-        river_x1 = GRID_WIDTH // 2  # First column of the river
-        river_x2 = river_x1 + 1     # Second column of the river
-    
-
-        for y in range(GRID_HEIGHT):
-            river1 = River(river_id, self)
-            self.grid.place_agent(river1, (river_x1, y))
-            river_id += 1
-
-            river2 = River(river_id, self)
-            self.grid.place_agent(river2, (river_x2, y))
-            river_id += 1
-            
-        
+        # Static terrain: charging station, orchard rows and river live in one small-int grid
+        self.terrain = Terrain(width, height)
+        self.terrain.cells[:] = layout.cells
+        if layout.charging_station is None:
+            self.terrain.cells[self.base_station] = CHARGING_STATION
+
+        # Strawberries on the trees, in bulk for the crop field, else one agent per cluster
+        # placed column by column from the bottom row upwards
+        if self.crop_field is not None:
+            self.crop_field.add(layout.crops)
+        else:
+            cluster_id = first_id + num_drones + num_pickers
+            xs, ys = np.nonzero(layout.crops[:, ::-1])
+            for x, y in zip(xs.tolist(), (height - 1 - ys).tolist()):
+                cluster = StrawberryCluster(cluster_id, self)
+                self.grid.place_agent(cluster, (x, y))
+                self.crops[(x, y)] = cluster
+                self.update_crop_index((x, y), cluster.is_grown)
+                self.schedule.add(cluster)
+                cluster_id += 1
+
+        # Distance fields over the terrain for the pickers, built lazily and cached per goal
+        self.navigation = Navigator(self.terrain.move_costs())
+        self.navigation.add_goal("home", self.terrain.positions(CHARGING_STATION))
 
+        # Lazily generated sweep paths for Systematic drones, optionally one disjoint strip per drone
+        self.coverage = CoveragePlanner(width, height)
+        self.partition_coverage = partition_coverage
+
+        # Opt-in per-agent-class timing; pass profiler=True or a StepProfiler to collect it
+        self.profiler = None
+        if profiler:
+            self.profiler = profiler if isinstance(profiler, StepProfiler) else StepProfiler()
+            self.profiler.attach(self)
+
+        # Opt-in trajectory recording to memory-mapped files; see trajectory.py
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.start(self)
+
+    def add_robot(self, agent, pos):
+        """
+        Take in a drone or picker robot built by another model, e.g. one
+        flying in from a neighbouring tile, with its battery, storage and state.
+        """
+        agent.model = self
+        self.register_agent(agent)
+        self.grid.place_agent(agent, pos)
+        if isinstance(agent, BaseDroneAgent):
+            agent.station = self.drone_station
+            self.drones.append(agent)
+            self.kpis.num_drones += 1
+        else:
+            self.picker_index.add(agent, pos)
+            self.pickers.append(agent)
+            self.kpis.num_pickers += 1
+            if agent.state == "Idle":
+                self.picker_pool.join(agent)
+        self.kpis.battery_sum += agent.battery
+        self.bus.register(agent)
+        self.schedule.add(agent)
+
+    def remove_robot(self, agent):
+        """Take a drone or picker robot out of the model; undelivered messages to it count as lost."""
+        self.bus.unregister(agent)
+        self.schedule.remove(agent)
+        self.grid.remove_agent(agent)
+        if isinstance(agent, BaseDroneAgent):
+            self.drones.remove(agent)
+            self.kpis.num_drones -= 1
+        else:
+            self.picker_index.remove(agent)
+            self.picker_pool.leave(agent)
+            self.pickers.remove(agent)
+            self.kpis.num_pickers -= 1
+        self.kpis.battery_sum -= agent.battery
+        self.deregister_agent(agent)
 
     def broadcast_location(self, location):
         """
-        Send location to only one picker robot in extended mode.
+        Send location to only one idle picker robot, chosen by the dispatch policy.
+        If every picker is busy the location is queued until one becomes idle.
+        """
+        picker = self.picker_pool.acquire(location)
+        if picker is None:
+            self.picker_pool.defer(location)
+            return
+        self.assign_location(picker, location)
+
+    def assign_location(self, picker, location):
+        self.bus.send(self, picker, "assign", location)
+        if self.tracer.info:
+            self.tracer.dispatched(None, location, picker)
+
+    def receive_messages(self, messages):
+        """The model acts as dispatcher for the crop locations drones publish."""
+        for message in messages:
+            if message.topic == "crop_found":
+                self.broadcast_location(message.payload)
+
+    def message_dropped(self, message):
+        """
+        A lost assignment times out: the picker is free again and the location
+        is queued. A lost discovery is queued too, as the drone that found it
+        waits at the crop until it is picked.
+        """
+        if message.topic == "assign":
+            if message.recipient.state == "Idle":
+                self.picker_pool.join(message.recipient)
+            self.picker_pool.defer(message.payload)
+        elif message.topic == "crop_found":
+            self.picker_pool.defer(message.payload)
+
+    def dispatch_pending(self):
+        """Hand queued discoveries to pickers that became idle, skipping crops that are gone."""
+        pool = self.picker_pool
+        while pool.pending and len(pool):
+            location = pool.next_pending()
+            if not self.has_grown_crop(location):
+                continue
+            self.assign_location(pool.acquire(location), location)
+
+    def picker_state_changed(self, picker, old_state, new_state):
+        """Called by picker robots on every state transition to keep the idle pool current."""
+        if new_state == "Idle":
+            self.picker_pool.join(picker)
+        elif old_state == "Idle":
+            self.picker_pool.leave(picker)
+
+
+    def crop_at(self, pos):
+        """
+        Return the strawberry cluster at pos, or None if there is none.
+        With the crop field enabled this is a CropCell view with the same attributes.
+        """
+        if self.crop_field is not None:
+            return self.crop_field.cell(pos)
+        return self.crops.get(pos)
+
+    def has_grown_crop(self, pos):
+        """Check whether a grown strawberry cluster is waiting at pos."""
+        if self.crop_field is not None:
+            return self.crop_field.has_grown_crop(pos)
+        return pos in self.grown_crops
+
+    def update_crop_index(self, pos, is_grown):
+        """Called by strawberry clusters whenever they are picked or regrow."""
+        if is_grown:
+            self.grown_crops.add(pos)
+        else:
+            self.grown_crops.discard(pos)
+            cluster = self.crops.get(pos)
+            if cluster is not None:
+                self.schedule.wake(cluster)  # A picked cluster starts growing again
+        self.terrain.tree_picked[pos] = not is_grown  # The tree turns light green once it is picked
+
+    def nearest_pickers(self, pos, k=1, idle_only=False):
+        """Return up to k picker robots closest to pos, nearest first."""
+        predicate = (lambda picker: picker.state == "Idle") if idle_only else None
+        return self.picker_index.nearest(pos, k, predicate)
+
+    def nearest_picker(self, pos, idle_only=False):
+        pickers = self.nearest_pickers(pos, 1, idle_only)
+        return pickers[0] if pickers else None
+
+    def coverage_path(self, drone):
+        """
+        Coverage path for a Systematic drone. Drones alternate between row and
+        column sweeps of the whole field, or each sweeps its own band of columns
+        when partition_coverage is set.
         """
-        for agent in self.schedule.agents:
-            if isinstance(agent, ExtendedPickerRobotAgent) and agent.state == "Idle":
-                agent.receive_location(location)
-                break  # Only send to one robot
-            elif self.systematic_mode and isinstance(agent, SystematicPickerRobotAgent) and agent.state == "Idle":
-                agent.receive_location(location)
-                break  # Only send to one robot
-            
-    
+        if self.partition_coverage:
+            return self.coverage.path(COLUMNS, self.drones.index(drone), len(self.drones))
+        return self.coverage.path(ROWS if drone.unique_id % 2 == 0 else COLUMNS)
+
+    def terrain_changed(self):
+        """Call after editing self.terrain so the cached navigation fields are rebuilt."""
+        self.navigation.set_cost(self.terrain.move_costs())
+        self.navigation.add_goal("home", self.terrain.positions(CHARGING_STATION))
+
+    def has_tree(self, pos):
+        return self.terrain.is_tree(pos)
+
+    def tree_picked(self, pos):
+        if self.crop_field is not None:
+            return bool(self.crop_field.picked[pos])
+        return bool(self.terrain.tree_picked[pos])
+
+    def to_bytes(self):
+        """
+        Serialize the full model state: agents with their states, batteries,
+        storage and targets, exploration progress, crop timers, queued
+        messages and dispatches, KPIs and the random generator.
+        """
+        header = CHECKPOINT_MAGIC + str(CHECKPOINT_VERSION).encode()
+        return header + zlib.compress(pickle.dumps(self, pickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Restore a model from to_bytes() output. This unpickles the data,
+        which can run arbitrary code, so only load checkpoints you trust.
+        """
+        if not data.startswith(CHECKPOINT_MAGIC):
+            raise ValueError("Not a FarmModel checkpoint")
+        body = data[len(CHECKPOINT_MAGIC):]
+        digits = len(body) - len(body.lstrip(b"0123456789"))
+        version = int(body[:digits]) if digits else None
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"Checkpoint format version {version}, this FarmModel reads version {CHECKPOINT_VERSION}")
+        model = pickle.loads(zlib.decompress(body[digits:]))
+        if not isinstance(model, cls):
+            raise TypeError(f"Checkpoint holds a {type(model).__name__}, not a {cls.__name__}")
+        return model
+
+    def save_checkpoint(self, path):
+        """Write a compressed snapshot that load_checkpoint() resumes exactly where this run is."""
+        with open(path, "wb") as checkpoint_file:
+            checkpoint_file.write(self.to_bytes())
+
+    @classmethod
+    def load_checkpoint(cls, path):
+        """Resume a run from save_checkpoint(). Checkpoints are pickles: only load files you trust."""
+        with open(path, "rb") as checkpoint_file:
+            return cls.from_bytes(checkpoint_file.read())
+
+    def __setstate__(self, state):
+        for name, default in CHECKPOINT_DEFAULTS.items():
+            state.setdefault(name, default)
+        self.__dict__.update(state)
+
+    def fork(self, seed=None):
+        """
+        Return an independent copy of the running model. Without a seed the
+        fork continues exactly like this model would; with one its random
+        generator is reseeded so branches explore different futures.
+        A trace file is not shared with the fork, only the in-memory events.
+        """
+        clone = pickle.loads(pickle.dumps(self, pickle.HIGHEST_PROTOCOL))
+        if seed is not None:
+            clone.reseed(seed)
+        return clone
+
+    def reseed(self, seed):
+        self._seed = seed
+        self.random.seed(seed)  # The message bus shares this generator
 
     def step(self):
+        now = self.schedule.steps
+        self.tracer.step = now
+        self.bus.now = now
         self.schedule.step()
+        self.bus.deliver(now)
+        if self.picker_pool.pending:
+            self.dispatch_pending()
+        if self.crop_field is not None:
+            self.crop_field.step()  # Age the whole field in one vectorized update
+        self.kpis.record(self.schedule.steps)
+        if self.recorder is not None:
+            self.recorder.record(self)
 
 
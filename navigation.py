@@ -0,0 +1,251 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Moore neighbourhood, diagonals first so ties prefer the diagonal step like move_towards did
+OFFSETS = [(1, 1), (1, -1), (-1, 1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1)]
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024  # Budget for the fields of ad-hoc targets such as crop locations
+DEFAULT_WINDOW_MARGIN = 10  # Cells around start and target in the window an ad-hoc field covers
+IMPASSABLE = 1e9  # Stand-in cost for np.inf cells while sweeping; prefix sums of inf would give nan
+
+
+class DistanceField:
+    """
+    Cost-to-goal of every cell plus the precomputed next step towards the goal,
+    so following the field is one array read per move. A field may cover only
+    a window of the terrain whose corner is at origin.
+    """
+
+    def __init__(self, cost, goals, origin=(0, 0)):
+        self.origin = origin
+        x0, y0 = origin
+        self.distance = _distance_field(cost, [(x - x0, y - y0) for x, y in goals])
+        self.next_offset = _descent_offsets(self.distance, cost)
+        self.moves = _count_moves(self.distance, self.next_offset)
+
+    @property
+    def nbytes(self):
+        return self.distance.nbytes + self.next_offset.nbytes + self.moves.nbytes
+
+    def covers(self, pos):
+        x, y = pos[0] - self.origin[0], pos[1] - self.origin[1]
+        width, height = self.distance.shape
+        return 0 <= x < width and 0 <= y < height
+
+    def local(self, pos):
+        return (pos[0] - self.origin[0], pos[1] - self.origin[1])
+
+    def distance_at(self, pos):
+        return float(self.distance[self.local(pos)])
+
+    def moves_at(self, pos):
+        return int(self.moves[self.local(pos)])
+
+    def next_step(self, pos):
+        k = self.next_offset[self.local(pos)]
+        if k < 0:
+            return pos  # Already at the goal, or the goal is unreachable
+        dx, dy = OFFSETS[k]
+        return (pos[0] + dx, pos[1] + dy)
+
+
+class Navigator:
+    """
+    Precomputed navigation over the terrain for ground robots.
+
+    Named goals like "home" for the charging stations get a field over the
+    whole terrain, built when the goal is added and kept until the terrain
+    changes. A single target cell gets a field over a window around the
+    robot and the target, grown only if the target cannot be reached inside
+    it; those fields are cached least recently used first within
+    cache_bytes. Costs are per cell entered; np.inf marks impassable cells.
+    """
+
+    def __init__(self, cost, cache_bytes=DEFAULT_CACHE_BYTES, margin=DEFAULT_WINDOW_MARGIN):
+        self.cost = cost
+        self.cache_bytes = cache_bytes
+        self.margin = margin
+        self.named_goals = {}  # name -> list of goal cells
+        self.named_fields = {}  # name -> DistanceField over the whole terrain
+        self.fields = OrderedDict()  # target cell -> windowed DistanceField, least recently used first
+        self.cached_bytes = 0
+
+    def add_goal(self, name, cells):
+        self.named_goals[name] = list(cells)
+        self.named_fields[name] = DistanceField(self.cost, self.named_goals[name])
+
+    def set_cost(self, cost):
+        """Replace the terrain costs and drop every field; named ones are rebuilt on next use."""
+        self.cost = cost
+        self.named_fields.clear()
+        self.fields.clear()
+        self.cached_bytes = 0
+
+    def field(self, goal, pos=None):
+        """
+        Return the DistanceField for a named goal, or for a single target cell
+        covering pos (the whole terrain if pos is None).
+        """
+        if goal in self.named_goals:
+            field = self.named_fields.get(goal)
+            if field is None:
+                field = self.named_fields[goal] = DistanceField(self.cost, self.named_goals[goal])
+            return field
+        field = self.fields.get(goal)
+        if field is not None:
+            if pos is None or field.covers(pos):
+                self.fields.move_to_end(goal)
+                return field
+            self.drop(goal)
+        field = self.window_field(goal, pos)
+        self.fields[goal] = field
+        self.cached_bytes += field.nbytes
+        while self.cached_bytes > self.cache_bytes and len(self.fields) > 1:
+            self.drop(next(iter(self.fields)))
+        return field
+
+    def drop(self, goal):
+        self.cached_bytes -= self.fields.pop(goal).nbytes
+
+    def __getstate__(self):
+        # Fields are derived from the costs and can run to megabytes each; copies rebuild them on first use
+        state = self.__dict__.copy()
+        state["named_fields"] = {}
+        state["fields"] = OrderedDict()
+        state["cached_bytes"] = 0
+        return state
+
+    def window_field(self, goal, pos):
+        """Field towards goal over a window around pos and goal, widened until pos can reach it."""
+        width, height = self.cost.shape
+        if pos is None:
+            return DistanceField(self.cost, [goal])
+        margin = self.margin
+        while True:
+            x0 = max(0, min(pos[0], goal[0]) - margin)
+            y0 = max(0, min(pos[1], goal[1]) - margin)
+            x1 = min(width, max(pos[0], goal[0]) + margin + 1)
+            y1 = min(height, max(pos[1], goal[1]) + margin + 1)
+            field = DistanceField(self.cost[x0:x1, y0:y1], [goal], origin=(x0, y0))
+            whole = (x0, y0, x1, y1) == (0, 0, width, height)
+            if whole or field.moves_at(pos) >= 0:
+                return field
+            margin *= 2
+
+    def next_step(self, pos, goal):
+        return self.field(goal, pos).next_step(pos)
+
+    def distance(self, pos, goal):
+        return self.field(goal, pos).distance_at(pos)
+
+    def moves(self, pos, goal):
+        """Number of moves needed to reach the goal from pos, -1 if it cannot be reached."""
+        return self.field(goal, pos).moves_at(pos)
+
+    def can_reach(self, pos, goal, battery):
+        """True if the goal can be reached from pos with charge left over."""
+        return 0 <= self.field(goal, pos).moves_at(pos) < battery
+
+
+def _sweep_lines(width, height):
+    """
+    Flat cell indexes of every straight line through the grid, one family per
+    direction: columns, rows, diagonals and anti-diagonals. Lines shorter than
+    the longest of their family are padded with the sentinel index width * height.
+    """
+    cells = np.arange(width * height).reshape(width, height)
+    sentinel = width * height
+    xs, ys = np.indices((width, height))
+    diagonals = np.full((width, width + height - 1), sentinel)
+    diagonals[xs, ys + width - 1 - xs] = cells  # Column j holds the cells with y - x = j - width + 1
+    anti_diagonals = np.full((width, width + height - 1), sentinel)
+    anti_diagonals[xs, xs + ys] = cells  # Column j holds the cells with x + y = j
+    return [cells, cells.T, diagonals.T, anti_diagonals.T]
+
+
+def _distance_field(cost, goals):
+    """
+    Cost to reach the nearest goal from every cell, moving to any of the 8
+    neighbours and paying the cost of each cell entered.
+
+    Along one line the recurrence d[i] = min(d[i], d[i - 1] + cost[i - 1]) is a
+    running minimum of d - S shifted back by S, the prefix sums of the costs,
+    so a whole family of lines relaxes in a few array operations. Sweeping
+    all 8 directions until nothing changes converges in a handful of rounds,
+    one per turn in the longest shortest path.
+    """
+    width, height = cost.shape
+    # The sentinel cell at the end pads the lines: unreachable and free to enter
+    flat_cost = np.append(np.where(np.isinf(cost), IMPASSABLE, cost).ravel(), 0.0)
+    distance = np.full(width * height + 1, np.inf)
+    for x, y in goals:
+        distance[x * height + y] = 0.0
+
+    sweeps = []
+    for lines in _sweep_lines(width, height):
+        for ordered in (lines, lines[:, ::-1]):
+            line_cost = flat_cost[ordered]
+            prefix = np.cumsum(line_cost, axis=1) - line_cost
+            sweeps.append((ordered, prefix, ordered == width * height))
+    changed = True
+    while changed:
+        changed = False
+        for ordered, prefix, padding in sweeps:
+            line_distance = distance[ordered]
+            relaxed = prefix + np.minimum.accumulate(line_distance - prefix, axis=1)
+            relaxed[padding] = np.inf
+            if (relaxed < line_distance).any():
+                changed = True
+                distance[ordered] = relaxed
+
+    distance = distance[:-1].reshape(width, height)
+    # Settle rounding in the prefix sums so every step strictly lowers the distance by exactly the cost entered
+    entering = distance + np.where(np.isinf(cost), IMPASSABLE, cost)
+    while True:
+        padded = np.pad(entering, 1, constant_values=np.inf)
+        best = np.min([padded[1 + dx:1 + dx + width, 1 + dy:1 + dy + height] for dx, dy in OFFSETS], axis=0)
+        lower = best < distance
+        if not lower.any():
+            break
+        distance = np.where(lower, best, distance)
+        entering = distance + np.where(np.isinf(cost), IMPASSABLE, cost)
+    # Robots never stand on impassable cells, so descending the field must not lead into one
+    distance[(distance >= IMPASSABLE) | np.isinf(cost)] = np.inf
+    return distance
+
+
+def _descent_offsets(distance, cost):
+    """
+    Index into OFFSETS of the neighbour on a cheapest path, the one whose
+    distance plus the cost of entering it is lowest, or -1 at a goal or an
+    unreachable cell.
+    """
+    width, height = distance.shape
+    padded = np.pad(distance + cost, 1, constant_values=np.inf)
+    candidates = np.stack([padded[1 + dx:1 + dx + width, 1 + dy:1 + dy + height] for dx, dy in OFFSETS])
+    best = candidates.argmin(axis=0)
+    moving = (distance > 0) & np.isfinite(distance)
+    return np.where(moving, best, -1).astype(np.int8)
+
+
+def _count_moves(distance, next_offset):
+    """
+    Moves along the descent path to the goal, -1 for unreachable cells.
+    Pointer doubling: each round adds the count of the cell a jump lands on
+    and doubles the jump, so paths of length L take log2(L) rounds.
+    """
+    width, height = distance.shape
+    cells = np.arange(width * height)
+    flat_offset = next_offset.ravel().astype(np.intp)
+    steps = np.array(OFFSETS)[flat_offset] @ np.array([height, 1])
+    jump = np.where(flat_offset >= 0, cells + steps, cells)
+    moves = (flat_offset >= 0).astype(np.int32)
+    while True:
+        landing = jump[jump]
+        if np.array_equal(landing, jump):
+            break
+        moves = moves + moves[jump]
+        jump = landing
+    moves[np.isinf(distance.ravel())] = -1
+    return moves.reshape(width, height)
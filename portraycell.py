@@ -1,34 +1,149 @@
+import json
+import os
 
+import numpy as np
+from mesa.visualization.modules import CanvasGrid
 
-from .agent import Tree,BaseDroneAgent,BasePickerRobotAgent, BaseStrawberryCluster, River,ChargingStation
+from .agent import BaseDroneAgent,BasePickerRobotAgent, BaseStrawberryCluster, STORAGE_CAPACITY
 from .model import FarmModel
+from .terrain import EMPTY, TREE, RIVER, CHARGING_STATION
 
-GRID_WIDTH = 20
-GRID_HEIGHT = 20
-BATTERY_CAPACITY = 100
-STORAGE_CAPACITY = 5
+# Portrayals are shared between every entity that looks the same, so they
+# must not be modified; FarmCanvasGrid sends the coordinates separately.
+DRONE_PORTRAYAL = {"Shape": "circle", "Color": "blue", "Filled": True, "Layer": 1, "r": 0.5}
+PICKER_PORTRAYALS = {
+    color: {"Shape": "circle", "Color": color, "Filled": True, "Layer": 1, "r": 0.5}
+    for color in ("yellow", "grey")
+}
+CROP_PORTRAYALS = {
+    color: {"Shape": "rect", "Color": color, "Filled": True, "Layer": 0, "w": 1, "h": 1}
+    for color in ("lightgreen", "pink")
+}
+TREE_PORTRAYALS = {
+    color: {"Shape": "rect", "Color": color, "Filled": True, "Layer": 0, "w": 1, "h": 1}
+    for color in ("lightgreen", "green")
+}
+RIVER_PORTRAYAL = {"Shape": "rect", "Color": "blue", "Filled": True, "Layer": 0, "w": 1.0, "h": 1.0}
+STATION_PORTRAYAL = {"Shape": "rect", "Color": "black", "Filled": True, "Layer": 0, "w": 1.0, "h": 1.0}
 
+BLANK_CELL = EMPTY * 4  # FarmCanvasGrid.static_state of empty ground without a crop
 
 
 def agent_portrayal(agent):
     if isinstance(agent, BaseDroneAgent):
-        color = "green" if agent.state == "Exploring" else "orange"
-        return {"Shape": "circle", "Color": "blue", "Filled": True, "Layer": 1, "r": 0.5}
+        return DRONE_PORTRAYAL
     elif isinstance(agent, BasePickerRobotAgent):
         color = "yellow" if agent.storage >= STORAGE_CAPACITY else "grey"
-        return {"Shape": "circle", "Color": color, "Filled": True, "Layer": 1, "r": 0.5}
+        return PICKER_PORTRAYALS[color]
     elif isinstance(agent, BaseStrawberryCluster,):
-        color = "lightgreen" if agent.picked else "pink"
-        return {"Shape": "rect", "Color": color, "Filled": True, "Layer": 0, "w": 1, "h": 1}
-    elif isinstance(agent, Tree):
-        color = "lightgreen" if agent.picked else "green"
-        return {"Shape": "rect", "Color": color, "Filled": True, "Layer": 0, "w": 1, "h": 1}
-    elif isinstance(agent, River):
-        return {"Shape": "rect", "Color": "blue", "Filled": True, "Layer": 0, "w": 1.0, "h": 1.0}
-    elif isinstance(agent, ChargingStation):
-        return {"Shape": "rect", "Color": "black", "Filled": True, "Layer": 0, "w": 1.0, "h": 1.0}
-    
+        return crop_portrayal(agent)
 
 
+def crop_portrayal(crop):
+    """Portrayal of a strawberry cluster agent or a CropCell from the crop field."""
+    color = "lightgreen" if crop.picked else "pink"
+    return CROP_PORTRAYALS[color]
 
 
+def terrain_portrayal(model, pos):
+    """Portrayal of the static terrain at pos, or None for an empty cell."""
+    kind = model.terrain.kind_at(pos)
+    if kind == TREE:
+        color = "lightgreen" if model.tree_picked(pos) else "green"
+        return TREE_PORTRAYALS[color]
+    elif kind == RIVER:
+        return RIVER_PORTRAYAL
+    elif kind == CHARGING_STATION:
+        return STATION_PORTRAYAL
+
+
+class FarmCanvasGrid(CanvasGrid):
+    """
+    CanvasGrid that also draws the terrain layer and the array-backed crop
+    field, neither of which are agents on the MultiGrid.
+
+    The first frame of a model carries every non-empty cell; after that only
+    cells whose terrain or crop changed, or that a drone or picker entered
+    or left, are sent. Each cell is a list of indices into a palette of
+    portrayals that the browser keeps, so a portrayal crosses the socket
+    once however many cells use it.
+    """
+
+    package_includes = ["GridDraw.js"]
+    local_includes = ["DeltaCanvasModule.js"]
+    local_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def __init__(self, portrayal_method, grid_width, grid_height, canvas_width=500, canvas_height=500):
+        super().__init__(portrayal_method, grid_width, grid_height, canvas_width, canvas_height)
+        self.js_code = "elements.push(new DeltaCanvasModule({}, {}, {}, {}));".format(
+            self.canvas_width, self.canvas_height, self.grid_width, self.grid_height
+        )
+        self.model = None
+
+    def start(self, model):
+        """Forget the previous frame, e.g. after the model was reset."""
+        self.model = model
+        self.palette = {}  # id(portrayal) -> (portrayal, index)
+        self.palette_keys = {}  # serialized portrayal -> index, for portrayals built per call
+        self.new_entries = {}
+        self.cell_state = self.static_state(model)
+        self.agent_cells = {}  # agent -> (pos, palette index)
+
+    def static_state(self, model):
+        """Everything about a cell that is not a moving agent, packed into one array."""
+        picked = model.crop_field.picked if model.crop_field is not None else model.terrain.tree_picked
+        state = model.terrain.cells.astype(np.int16) * 4 + picked * 2  # Keep BLANK_CELL in step with this packing
+        if model.crop_field is not None:
+            state += model.crop_field.has_crop
+        return state
+
+    def palette_index(self, portrayal):
+        entry = self.palette.get(id(portrayal))
+        if entry is not None and entry[0] is portrayal:
+            return entry[1]
+        key = json.dumps(portrayal, sort_keys=True)
+        index = self.palette_keys.get(key)
+        if index is None:
+            index = self.palette_keys[key] = len(self.palette_keys)
+            self.new_entries[index] = portrayal
+        self.palette[id(portrayal)] = (portrayal, index)  # Holding the portrayal keeps its id unique
+        return index
+
+    def cell_portrayals(self, model, pos):
+        portrayals = [terrain_portrayal(model, pos)]
+        if model.crop_field is not None:
+            crop = model.crop_field.cell(pos)
+            if crop is not None:
+                portrayals.append(crop_portrayal(crop))
+        portrayals.extend(self.portrayal_method(obj) for obj in model.grid.get_cell_list_contents([pos]))
+        return [self.palette_index(portrayal) for portrayal in portrayals if portrayal]
+
+    def moved_agents(self, model):
+        """Cells drones and pickers left or entered, or where one changed its look."""
+        dirty = set()
+        for agent in model.drones + model.pickers:
+            state = (agent.pos, self.palette_index(self.portrayal_method(agent)))
+            last = self.agent_cells.get(agent)
+            if state != last:
+                dirty.add(agent.pos)
+                if last is not None:
+                    dirty.add(last[0])
+                self.agent_cells[agent] = state
+        return dirty
+
+    def render(self, model):
+        full = model is not self.model
+        if full:
+            self.start(model)
+            xs, ys = np.nonzero(self.cell_state != BLANK_CELL)
+        else:
+            state = self.static_state(model)
+            xs, ys = np.nonzero(state != self.cell_state)
+            self.cell_state = state
+        dirty = set(zip(xs.tolist(), ys.tolist()))
+        dirty |= self.moved_agents(model)
+
+        cells = [[x, y, self.cell_portrayals(model, (x, y))] for x, y in dirty]
+        frame = {"full": full, "palette": self.new_entries, "cells": cells}
+        self.new_entries = {}
+        return frame
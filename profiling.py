@@ -0,0 +1,152 @@
+import json
+import time
+
+# State handlers timed on every agent that has them; step times include the handler it calls
+AGENT_HANDLERS = ["step", "explore", "check_strawberry_status", "pick_strawberries", "return_to_base", "move_outside_tree"]
+
+# Grid and spatial queries, counted and timed per call
+GRID_QUERIES = ["get_neighborhood", "get_cell_list_contents", "move_agent", "place_agent"]
+MODEL_QUERIES = ["crop_at", "has_grown_crop", "has_tree", "nearest_pickers"]
+
+# Phases of FarmModel.step besides the scheduler
+MODEL_PHASES = ["step", "dispatch_pending"]
+
+HISTOGRAM_BUCKETS = 64  # Bucket b holds durations of [2**(b-1), 2**b) nanoseconds
+
+
+class SectionStats:
+    """Call count, total time and a log2 latency histogram of one instrumented section."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, elapsed_ns):
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.histogram[min(elapsed_ns.bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, q):
+        """Upper bound (ns) of the histogram bucket holding the q-th percentile."""
+        if not self.calls:
+            return 0
+        rank = q / 100 * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= rank:
+                return 2 ** bucket
+        return self.max_ns
+
+    def summary(self):
+        return {
+            "calls": self.calls,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": self.total_ns / self.calls / 1e3 if self.calls else 0.0,
+            "p50_us": self.percentile(50) / 1e3,
+            "p99_us": self.percentile(99) / 1e3,
+            "max_us": self.max_ns / 1e3,
+            "histogram": self.histogram,
+        }
+
+
+class _Timed:
+    """
+    Stand-in for a method on one instance that times every call. It pickles
+    as the method name and looks the class function up again on load, so
+    instrumented models can still be checkpointed and forked.
+    """
+
+    def __init__(self, stats, name, owner):
+        self.stats = stats
+        self.name = name
+        self.owner = owner
+        self.function = getattr(type(owner), name)
+
+    def __getstate__(self):
+        return self.stats, self.name, self.owner
+
+    def __setstate__(self, state):
+        self.stats, self.name, self.owner = state
+        self.function = getattr(type(self.owner), self.name)
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return self.function(self.owner, *args, **kwargs)
+        finally:
+            self.stats.add(time.perf_counter_ns() - start)
+
+
+class StepProfiler:
+    """
+    Opt-in profiler for FarmModel.
+
+    attach() replaces the step and state handlers of every scheduled agent,
+    the model's step phases and its grid queries with timed stand-ins on
+    those instances only, aggregating per agent class. Nothing is wrapped
+    until a profiler is attached, so an unprofiled model runs the plain
+    methods with no extra cost. Stats can be read live with snapshot() or
+    dumped with report() / save() at the end of a run.
+    """
+
+    def __init__(self):
+        self.sections = {}  # "Class.method" -> SectionStats
+        self.wrapped = []  # (instance, method name) pairs to restore on detach
+
+    def section(self, name):
+        stats = self.sections.get(name)
+        if stats is None:
+            stats = self.sections[name] = SectionStats()
+        return stats
+
+    def instrument(self, owner, names, prefix=None):
+        """Time the given methods of one object, under "<prefix>.<method>" (the class name by default)."""
+        prefix = prefix or type(owner).__name__
+        for name in names:
+            if not hasattr(type(owner), name) or name in vars(owner):
+                continue  # Missing, or already instrumented
+            setattr(owner, name, _Timed(self.section(f"{prefix}.{name}"), name, owner))
+            self.wrapped.append((owner, name))
+
+    def attach(self, model):
+        for agent in model.schedule.agents:
+            self.instrument(agent, AGENT_HANDLERS)
+        self.instrument(model, MODEL_PHASES, "FarmModel")
+        self.instrument(model, MODEL_QUERIES, "FarmModel")
+        self.instrument(model.grid, GRID_QUERIES, "grid")
+        self.instrument(model.bus, ["deliver"], "bus")
+        if model.crop_field is not None:
+            self.instrument(model.crop_field, ["step"], "crop_field")
+
+    def detach(self):
+        """Put the plain methods back on every instrumented object."""
+        for owner, name in self.wrapped:
+            vars(owner).pop(name, None)
+        self.wrapped = []
+
+    def reset(self):
+        for stats in self.sections.values():
+            stats.__init__()
+
+    def snapshot(self):
+        return {name: stats.summary() for name, stats in self.sections.items()}
+
+    def report(self):
+        """Sections as a text table, most expensive first."""
+        lines = [f"{'section':<48} {'calls':>9} {'total ms':>10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}"]
+        for name, stats in sorted(self.sections.items(), key=lambda item: -item[1].total_ns):
+            if not stats.calls:
+                continue
+            summary = stats.summary()
+            lines.append(f"{name:<48} {summary['calls']:>9} {summary['total_ms']:>10.2f} "
+                         f"{summary['mean_us']:>9.2f} {summary['p50_us']:>9.2f} {summary['p99_us']:>9.2f}")
+        return "\n".join(lines)
+
+    def save(self, path):
+        with open(path, "w") as out_file:
+            json.dump(self.snapshot(), out_file, indent=2)
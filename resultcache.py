@@ -0,0 +1,133 @@
+"""
+Content-addressed on-disk cache of simulation results.
+
+A run is keyed by a hash of its parameters, its seed and the source code
+of the simulation modules, so editing an agent or the model invalidates
+every entry it could have changed. Each entry is the run's KPI time series
+stored column by column in a compressed .npz file.
+
+Entries are written to a temporary file and renamed into place, so sweep
+workers in separate processes can share one cache directory: a reader sees
+a whole entry or none, and two workers finishing the same run write the
+same bytes. Reading an entry marks it as recently used; once the directory
+grows past max_bytes the least recently used entries are deleted.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+LOW_WATER = 0.9  # Eviction frees space down to this fraction of max_bytes
+
+# Modules whose source decides what a run produces
+SOURCE_MODULES = [
+    "agent.py", "model.py", "cropfield.py", "terrain.py", "navigation.py", "coverage.py", "kpi.py",
+    "spatial.py", "dispatch.py", "messaging.py", "scheduler.py", "vectorized.py",
+]
+
+
+def source_version(directory=None, modules=SOURCE_MODULES):
+    """Hash of the simulation source files, part of every cache key."""
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in modules:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            digest.update(name.encode())
+            with open(path, "rb") as source:
+                digest.update(source.read())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, version=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version if version is not None else source_version()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.size = self.disk_usage()  # Estimate; other processes write too, so eviction rescans
+
+    def key(self, params, seed, steps):
+        """Cache key of one run. Seedless runs are not reproducible and must not be cached."""
+        if seed is None:
+            raise ValueError("Only seeded runs can be cached")
+        record = {"params": params, "seed": seed, "steps": steps, "version": self.version}
+        return hashlib.sha256(json.dumps(record, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".npz")
+
+    def get(self, key):
+        """Return the cached series as {column: array}, or None."""
+        path = self.path(key)
+        try:
+            with np.load(path) as entry:
+                series = {name: entry[name] for name in entry.files}
+            os.utime(path)  # Mark as recently used
+        except (FileNotFoundError, ValueError, OSError):
+            # Missing, evicted by another worker in between, or unreadable
+            self.misses += 1
+            return None
+        self.hits += 1
+        return series
+
+    def put(self, key, series):
+        """Store a series given as {column: list or array}."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as entry:
+                np.savez_compressed(entry, **{name: np.asarray(values) for name, values in series.items()})
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.size += os.path.getsize(path)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def entries(self):
+        """(last used, size, path) of every entry."""
+        found = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".npz"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # Evicted by another worker while scanning
+                    found.append((stat.st_mtime, stat.st_size, entry.path))
+        return found
+
+    def disk_usage(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache is below the low-water mark."""
+        entries = sorted(self.entries())
+        self.size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * LOW_WATER
+        for _, size, path in entries:
+            if self.size <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass  # Another worker evicted it first
+            self.size -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.unlink(path)
+        self.size = 0
@@ -0,0 +1,90 @@
+from collections import defaultdict
+
+from mesa.time import RandomActivation
+
+
+class DormantActivation(RandomActivation):
+    """
+    RandomActivation that only steps agents with pending work.
+
+    Agents put themselves to sleep when they have nothing to do, either until
+    something wakes them (a message, a dispatch, a pick) or for a number of
+    ticks on a timer wheel. Awake agents are still stepped once per tick in a
+    freshly shuffled order, so the per-tick cost follows the number of awake
+    agents instead of the whole population.
+    """
+
+    def __init__(self, model, agents=None):
+        self.awake = {}  # agent -> None, awake agents in insertion order
+        self.asleep = set()
+        self.wheel = defaultdict(list)  # tick -> agents whose timer fires then
+        self.wake_at = {}  # agent -> tick of its pending timer
+        self.slept_at = {}  # agent -> tick it went to sleep on a timer
+        super().__init__(model, agents)
+        for agent in self._agents:
+            self.awake[agent] = None
+
+    def add(self, agent):
+        super().add(agent)
+        self.awake[agent] = None
+
+    def remove(self, agent):
+        super().remove(agent)
+        self.awake.pop(agent, None)
+        self.asleep.discard(agent)
+        self.wake_at.pop(agent, None)
+        self.slept_at.pop(agent, None)
+
+    @property
+    def awake_count(self):
+        return len(self.awake)
+
+    def is_asleep(self, agent):
+        return agent in self.asleep
+
+    def sleep(self, agent, ticks=None):
+        """
+        Stop stepping the agent. With ticks it is woken again that many ticks
+        from now, otherwise it sleeps until wake() is called.
+        """
+        if agent not in self.awake:
+            return
+        del self.awake[agent]
+        self.asleep.add(agent)
+        if ticks is not None:
+            tick = self.steps + max(1, ticks)
+            self.wheel[tick].append(agent)
+            self.wake_at[agent] = tick
+            self.slept_at[agent] = self.steps
+
+    def wake(self, agent):
+        """Wake a sleeping agent early; it is stepped again from the next tick."""
+        self.wake_at.pop(agent, None)
+        self.slept_at.pop(agent, None)
+        if agent in self.asleep:
+            self.asleep.discard(agent)
+            self.awake[agent] = None
+
+    def elapsed(self, agent):
+        """Ticks since the agent's last step: more than 1 right after its timer fired."""
+        slept_at = self.slept_at.pop(agent, None)
+        return 1 if slept_at is None else self.steps - slept_at
+
+    def _fire_timers(self):
+        for agent in self.wheel.pop(self.steps, ()):
+            # Timers cancelled by an early wake, or replaced by a later sleep, are skipped
+            if self.wake_at.get(agent) == self.steps and agent in self.asleep:
+                del self.wake_at[agent]
+                self.asleep.discard(agent)
+                self.awake[agent] = None
+
+    def step(self):
+        """Step every awake agent once, in random order."""
+        self._fire_timers()
+        agents = list(self.awake)
+        self.model.random.shuffle(agents)
+        for agent in agents:
+            if agent in self.awake:  # Skip agents put to sleep or removed earlier this tick
+                agent.step()
+        self.steps += 1
+        self.time += 1
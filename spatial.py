@@ -0,0 +1,95 @@
+from mesa.space import MultiGrid
+
+DEFAULT_BUCKET_SIZE = 8  # Cells per side of one bucket
+
+
+def manhattan(pos1, pos2):
+    return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+
+
+class BucketIndex:
+    """
+    Uniform bucket grid over agent positions.
+    Nearest-k queries search rings of buckets outwards from the query cell and
+    stop as soon as no unvisited bucket can hold a closer agent, so the cost
+    depends on the local density rather than on the number of agents.
+    """
+
+    def __init__(self, width, height, bucket_size=DEFAULT_BUCKET_SIZE):
+        self.bucket_size = bucket_size
+        self.cols = -(-width // bucket_size)
+        self.rows = -(-height // bucket_size)
+        self.buckets = {}  # (bx, by) -> set of agents
+        self.positions = {}  # agent -> pos
+
+    def __contains__(self, agent):
+        return agent in self.positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _bucket(self, pos):
+        return (pos[0] // self.bucket_size, pos[1] // self.bucket_size)
+
+    def add(self, agent, pos):
+        self.positions[agent] = pos
+        self.buckets.setdefault(self._bucket(pos), set()).add(agent)
+
+    def remove(self, agent):
+        pos = self.positions.pop(agent)
+        self.buckets[self._bucket(pos)].discard(agent)
+
+    def move(self, agent, pos):
+        old_bucket = self._bucket(self.positions[agent])
+        new_bucket = self._bucket(pos)
+        self.positions[agent] = pos
+        if old_bucket != new_bucket:
+            self.buckets[old_bucket].discard(agent)
+            self.buckets.setdefault(new_bucket, set()).add(agent)
+
+    def _ring(self, center, radius):
+        """Yield the buckets at Chebyshev distance radius from center that exist on the grid."""
+        cx, cy = center
+        for bx in range(max(cx - radius, 0), min(cx + radius, self.cols - 1) + 1):
+            for by in range(max(cy - radius, 0), min(cy + radius, self.rows - 1) + 1):
+                if max(abs(bx - cx), abs(by - cy)) == radius:
+                    bucket = self.buckets.get((bx, by))
+                    if bucket:
+                        yield bucket
+
+    def nearest(self, pos, k=1, predicate=None):
+        """
+        Return up to k agents closest to pos by Manhattan distance, nearest first.
+        Ties are broken by unique_id. predicate filters candidates, e.g. idle pickers only.
+        """
+        center = self._bucket(pos)
+        max_radius = max(center[0], self.cols - 1 - center[0], center[1], self.rows - 1 - center[1])
+        found = []
+        for radius in range(max_radius + 1):
+            for bucket in self._ring(center, radius):
+                for agent in bucket:
+                    if predicate is None or predicate(agent):
+                        found.append((manhattan(pos, self.positions[agent]), agent.unique_id, agent))
+            # Anything in the next ring is at least radius * bucket_size + 1 cells away
+            if len(found) >= k:
+                found.sort(key=lambda entry: entry[:2])
+                if found[k - 1][0] <= radius * self.bucket_size:
+                    break
+        found.sort(key=lambda entry: entry[:2])
+        return [agent for _, _, agent in found[:k]]
+
+
+class IndexedMultiGrid(MultiGrid):
+    """MultiGrid that keeps a BucketIndex of selected agents up to date on every move."""
+
+    # Mesa fills every cell with one default_val() call; the builtin skips a Python frame per cell
+    default_val = staticmethod(list)
+
+    def __init__(self, width, height, torus, index):
+        super().__init__(width, height, torus)
+        self.index = index
+
+    def move_agent(self, agent, pos):
+        super().move_agent(agent, pos)
+        if agent in self.index:
+            self.index.move(agent, agent.pos)
@@ -0,0 +1,151 @@
+import numpy as np
+
+# Cell types of the static terrain layer
+EMPTY = 0
+TREE = 1
+RIVER = 2
+CHARGING_STATION = 3
+
+# Cost for a ground robot to enter a cell, indexed by cell type.
+# Pickers squeeze between trees and have to wade through the river.
+PICKER_MOVE_COST = np.array([1.0, 2.0, 8.0, 1.0])
+
+
+class Terrain:
+    """
+    Static farm layout stored as a small-int grid of cell types plus a flag
+    layer that marks trees whose strawberries have been picked.
+    Trees, the river and the charging station never act, so they are kept
+    here instead of as Mesa agents on the MultiGrid.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = np.zeros((width, height), dtype=np.uint8)
+        self.tree_picked = np.zeros((width, height), dtype=bool)
+
+    def kind_at(self, pos):
+        return int(self.cells[pos])
+
+    def is_tree(self, pos):
+        return self.cells[pos] == TREE
+
+    def is_river(self, pos):
+        return self.cells[pos] == RIVER
+
+    def move_costs(self, cost_table=PICKER_MOVE_COST):
+        """Per-cell movement cost grid for the navigation fields."""
+        return cost_table[self.cells]
+
+    def positions(self, kind):
+        """Return every cell of the given type as a list of (x, y) tuples."""
+        return [(int(x), int(y)) for x, y in zip(*np.nonzero(self.cells == kind))]
+
+
+# Layout files: one small int per cell, the cell type with CROP_BIT set where strawberries grow.
+# Text maps use one character per cell, top row first.
+CROP_BIT = 0x80
+TEXT_SYMBOLS = {".": EMPTY, "T": TREE, "~": RIVER, "C": CHARGING_STATION, "S": TREE | CROP_BIT}
+TREE_SPACING = 3  # Trees grow in every 3rd column
+CROP_CHANCE = 0.5
+
+
+class FarmLayout:
+    """
+    Everything FarmModel builds before the first step: the terrain cell types
+    and the cells that start with a strawberry cluster. Layouts come from a
+    .npy file, a text map, or generate() for the standard orchard of any size.
+    """
+
+    def __init__(self, cells, crops):
+        if cells.shape != crops.shape:
+            raise ValueError("Cell and crop grids must have the same shape")
+        self.cells = cells
+        self.crops = crops
+
+    @property
+    def width(self):
+        return self.cells.shape[0]
+
+    @property
+    def height(self):
+        return self.cells.shape[1]
+
+    @property
+    def charging_station(self):
+        """First charging station cell, or None if the layout has none."""
+        stations = np.argwhere(self.cells == CHARGING_STATION)
+        return tuple(int(v) for v in stations[0]) if len(stations) else None
+
+    @classmethod
+    def from_codes(cls, codes):
+        codes = np.asarray(codes, dtype=np.uint8)
+        if codes.ndim != 2:
+            raise ValueError("A layout is a 2D grid indexed [x, y]")
+        cells = codes & ~np.uint8(CROP_BIT)
+        if cells.max(initial=0) > CHARGING_STATION:
+            raise ValueError(f"Unknown cell type {int(cells.max())} in layout")
+        return cls(cells, (codes & CROP_BIT) != 0)
+
+    def to_codes(self):
+        return self.cells | np.where(self.crops, np.uint8(CROP_BIT), np.uint8(0))
+
+    @classmethod
+    def from_text(cls, text):
+        rows = [line.strip() for line in text.splitlines() if line.strip()]
+        if not rows or len({len(row) for row in rows}) != 1:
+            raise ValueError("A text map needs rows of equal length")
+        text = "".join(rows)
+        unknown = set(text) - set(TEXT_SYMBOLS)
+        if unknown:
+            raise ValueError(f"Unknown symbols in text map: {''.join(sorted(unknown))}")
+        lookup = np.zeros(128, dtype=np.uint8)
+        for symbol, code in TEXT_SYMBOLS.items():
+            lookup[ord(symbol)] = code
+        codes = lookup[np.frombuffer(text.encode("ascii"), dtype=np.uint8)]
+        # Rows run top to bottom; the grid is indexed [x, y] with y = 0 at the bottom
+        return cls.from_codes(codes.reshape(len(rows), -1)[::-1].T)
+
+    @classmethod
+    def load(cls, path):
+        """Read a .npy code grid, or a text map from any other file."""
+        if str(path).endswith(".npy"):
+            return cls.from_codes(np.load(path))
+        with open(path) as layout_file:
+            return cls.from_text(layout_file.read())
+
+    def save(self, path):
+        np.save(path, self.to_codes())
+
+    @classmethod
+    def generate(cls, width, height, random, base_station=(0, 0), river_columns=None, x_origin=0,
+                 crop_chance=CROP_CHANCE):
+        """
+        The standard orchard: trees every 3rd column leaving space at the top
+        and bottom, each tree cell bearing strawberries with crop_chance,
+        the charging station at base_station and a two-column river in the
+        middle unless river_columns is given. random is anything with a
+        random() method, such as the model's generator.
+        """
+        cells = np.zeros((width, height), dtype=np.uint8)
+        crops = np.zeros((width, height), dtype=bool)
+        cells[base_station] = CHARGING_STATION
+
+        # x_origin is this farm's first column within a larger orchard, so tiles keep the rows aligned
+        bottom_row = height - 1
+        first_tree = (2 - x_origin) % TREE_SPACING
+        cells[first_tree::TREE_SPACING, 2:bottom_row] = TREE
+
+        # One draw per tree cell, column by column from the bottom row upwards
+        tree_columns = range(first_tree, width, TREE_SPACING)
+        tree_rows = bottom_row - 2
+        if len(tree_columns) and tree_rows > 0:
+            draws = np.array([random.random() for _ in range(len(tree_columns) * tree_rows)])
+            bearing = draws.reshape(len(tree_columns), tree_rows) < crop_chance
+            crops[first_tree::TREE_SPACING, bottom_row - 1:1:-1] = bearing
+
+        if river_columns is None:
+            river_columns = [width // 2, width // 2 + 1]
+        cells[list(river_columns), :] = RIVER
+        return cls(cells, crops)
@@ -0,0 +1,392 @@
+"""
+One large orchard split into tiles that step in parallel processes.
+
+The orchard is cut into vertical strips of tile_width columns. The seam
+between two tiles is a two-column river, one column owned by each side,
+the same river FarmModel puts in the middle of a single farm. Every tile
+is an ordinary FarmModel with its own charging station and fleet, plus one
+ghost column on each side that borders another tile: a copy of the
+neighbour's river column.
+
+After every tick the tiles exchange their halos. Exploring drones and idle
+pickers that ended the tick on a ghost column have crossed the seam: they
+are taken out of their tile, with battery, storage and state, and placed
+on the neighbour's own column at the same spot. Nothing grows in the river,
+so the ghost columns never need crop state from the neighbour. A drone
+sweeping a coverage path carries on from the same cell of the new tile's
+path.
+
+Each tile dispatches the crops its drones find to its own pickers first.
+When a tile has discoveries queued and no idle picker, it forwards them as
+dispatch requests to a neighbour that had idle pickers after the last
+tick. The neighbour sends one of them to the seam, from where it crosses
+and heads for the crop; a request nobody can serve goes back to its tile.
+Bus messages never cross a seam: messages still on their way to a robot
+that leaves its tile are treated as lost, which re-queues a dispatch.
+
+    python -m AutounomousAgents.tiles --tiles 8 --tile-width 60 --height 200 --steps 500
+"""
+import argparse
+import contextlib
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from .agent import BaseDroneAgent
+from .kpi import KPICounters, COUNTER_FIELDS
+from .model import FarmModel
+from .terrain import RIVER
+
+MIN_TILE_WIDTH = 6  # Room for both river columns, the station and its landing pad
+TILE_ID_STRIDE = 1_000_000  # Robot ids of tile i start at i * TILE_ID_STRIDE so they stay unique across tiles
+
+
+class TileGeometry:
+    """Where tile index sits in the orchard, in the local coordinates of its FarmModel."""
+
+    def __init__(self, index, tiles, tile_width):
+        self.index = index
+        self.left_ghost = 1 if index > 0 else 0
+        self.right_ghost = 1 if index < tiles - 1 else 0
+        self.width = tile_width + self.left_ghost + self.right_ghost
+        self.x_origin = index * tile_width - self.left_ghost  # Orchard column of local column 0
+        self.first_owned = self.left_ghost
+        self.last_owned = self.left_ghost + tile_width - 1
+
+    @property
+    def river_columns(self):
+        if not self.left_ghost and not self.right_ghost:
+            return None  # A single tile is an ordinary farm with the river in the middle
+        columns = []
+        if self.left_ghost:
+            columns += [0, 1]
+        if self.right_ghost:
+            columns += [self.last_owned, self.last_owned + 1]
+        return columns
+
+    @property
+    def base_station(self):
+        # The first column is river when there is a seam on the left
+        return (self.first_owned + self.left_ghost, 0)
+
+    def neighbour(self, x):
+        """Index of the tile that owns local column x, if x is a ghost column."""
+        if self.left_ghost and x < self.first_owned:
+            return self.index - 1
+        if self.right_ghost and x > self.last_owned:
+            return self.index + 1
+        return None
+
+
+def build_tile(index, tiles, tile_width, height, num_drones, num_pickers, num_clusters, extended_mode, seed, **kwargs):
+    geometry = TileGeometry(index, tiles, tile_width)
+    kwargs["crop_field"] = True  # Crops on the seam are cleared in bulk below
+    model = FarmModel(num_drones, num_pickers, num_clusters, extended_mode, seed=seed,
+                      width=geometry.width, height=height, base_station=geometry.base_station,
+                      river_columns=geometry.river_columns, x_origin=geometry.x_origin,
+                      first_id=index * TILE_ID_STRIDE, **kwargs)
+    river = model.terrain.cells == RIVER
+    model.crop_field.has_crop[river] = False
+    model.crop_field.is_grown[river] = False
+    model.tile = geometry
+    model.errands = {}  # picker lent to a neighbour -> (crop in orchard coordinates, seam cell it heads for)
+    return model
+
+
+def crossing(robot):
+    """Only robots wandering without a plan cross a seam; the others are heading somewhere in their own tile."""
+    return robot.state == ("Exploring" if isinstance(robot, BaseDroneAgent) else "Idle")
+
+
+def to_orchard(model, pos):
+    return None if pos is None else (pos[0] + model.tile.x_origin, pos[1])
+
+
+def to_local(model, pos):
+    """Orchard cell in the tile's coordinates, or None if it is not on the tile."""
+    if pos is None:
+        return None
+    x = pos[0] - model.tile.x_origin
+    return (x, pos[1]) if 0 <= x < model.width else None
+
+
+def pack_robot(model, robot, errand=None):
+    """
+    Take a robot out of its tile and return it as (class, attributes,
+    position, errand) with every cell in orchard coordinates. errand is the
+    crop a lent picker is heading for.
+    """
+    pos = robot.pos
+    model.remove_robot(robot)
+    state = {name: value for name, value in vars(robot).items() if name not in ("model", "pos")}
+    if "target_location" in state:
+        state["target_location"] = to_orchard(model, state["target_location"])
+    # The sweep path object belongs to the old tile; unpack_robot takes up the new tile's path
+    return type(robot), state, to_orchard(model, pos), errand
+
+
+def unpack_robot(model, packed):
+    cls, state, pos, errand = packed
+    robot = cls.__new__(cls)
+    robot.__dict__.update(state)
+    robot.pos = None
+    if "target_location" in state:
+        robot.target_location = to_local(model, state["target_location"])
+    model.add_robot(robot, to_local(model, pos))
+    if getattr(robot, "exploration_path", None) is not None:
+        robot.exploration_path = model.coverage_path(robot)
+        try:
+            robot.path_index = robot.exploration_path.index(robot.pos) + 1
+        except ValueError:
+            robot.path_index = 0  # Off this drone's band, fly to where the band starts
+    if errand is not None:
+        robot.target_location = to_local(model, errand)
+        robot.state = "Moving" if model.has_grown_crop(robot.target_location) else "Idle"  # Idle if it was picked meanwhile
+    return robot
+
+
+def emigrants(model):
+    """
+    Pack every robot that crossed into a ghost column, grouped by the tile
+    it entered, and return requests of abandoned errands to their tiles.
+    """
+    leaving = {}
+    returned = {}
+    for robot in model.drones + model.pickers:
+        destination = model.tile.neighbour(robot.pos[0])
+        if destination is not None and crossing(robot):
+            leaving.setdefault(destination, []).append((robot, None))
+    for picker, (crop, seam) in list(model.errands.items()):
+        if picker.target_location != seam or picker.state not in ("Moving", "Picking"):
+            del model.errands[picker]  # Called home on the way, e.g. to recharge
+            returned.setdefault(model.tile.neighbour(seam[0]), []).append(crop)
+        elif picker.pos == seam:
+            del model.errands[picker]
+            leaving.setdefault(model.tile.neighbour(seam[0]), []).append((picker, crop))
+    packed = {destination: [pack_robot(model, robot, errand) for robot, errand in robots]
+              for destination, robots in leaving.items()}
+    return packed, returned
+
+
+def lends_pickers(model):
+    """Basic pickers wander instead of heading for a target, so only the other modes lend them out."""
+    return model.extended_mode or model.systematic_mode
+
+
+def forward_requests(model, spare):
+    """
+    Take the queued discoveries the tile has no idle picker for and address
+    them to neighbours with spare pickers, nearest seam first. spare maps a
+    neighbour tile to its idle pickers after the last tick.
+    """
+    pool = model.picker_pool
+    if len(pool) or not pool.pending or not lends_pickers(model):
+        return {}
+    spare = dict(spare)
+    requests = {}
+    for _ in range(len(pool.pending)):
+        location = pool.next_pending()
+        if not model.has_grown_crop(location):
+            continue
+        sides = [model.tile.index - 1, model.tile.index + 1]
+        if location[0] >= model.width / 2:
+            sides.reverse()
+        destination = next((side for side in sides if spare.get(side, 0) > 0), None)
+        if destination is None:
+            pool.defer(location)
+            continue
+        spare[destination] -= 1
+        requests.setdefault(destination, []).append(to_orchard(model, location))
+    return requests
+
+
+def serve_requests(model, requests):
+    """
+    Queue requests for crops on this tile, and send an idle picker to the
+    seam for each request from a neighbour. Returns the requests no picker
+    was free for, grouped by the tile they came from.
+    """
+    returned = {}
+    for crop in requests:
+        local = to_local(model, crop)
+        if local is not None and model.tile.neighbour(local[0]) is None:
+            model.picker_pool.defer(local)  # Sent back by a neighbour that had no picker left
+            continue
+        owner = model.tile.index - 1 if crop[0] < model.tile.x_origin + model.tile.first_owned else model.tile.index + 1
+        seam = (0 if owner < model.tile.index else model.width - 1, crop[1])
+        picker = model.picker_pool.acquire(seam) if lends_pickers(model) else None
+        if picker is None:
+            returned.setdefault(owner, []).append(crop)
+            continue
+        picker.target_location = seam
+        picker.state = "Moving"
+        model.schedule.wake(picker)
+        model.errands[picker] = (crop, seam)
+    return returned
+
+
+def tile_worker(connection, indexes, tiles, tile_width, height, params, seeds):
+    """Process loop: own the given tiles and step them on request."""
+    models = {index: build_tile(index, tiles, tile_width, height, seed=seeds[index], **params) for index in indexes}
+    while True:
+        command, payload = connection.recv()
+        if command == "step":
+            outgoing = {}
+            requests = {}
+            for index, model in models.items():
+                robots, incoming, spare = payload.get(index, ([], [], {}))
+                for packed in robots:
+                    unpack_robot(model, packed)
+                returned = serve_requests(model, incoming)
+                model.step()
+                leaving, abandoned = emigrants(model)
+                for destination, packed in leaving.items():
+                    outgoing.setdefault(destination, []).extend(packed)
+                for mail in (returned, abandoned, forward_requests(model, spare)):
+                    for destination, crops in mail.items():
+                        requests.setdefault(destination, []).extend(crops)
+            tiles = {index: (model.kpis.counters(), len(model.picker_pool)) for index, model in models.items()}
+            connection.send((outgoing, requests, tiles))
+        elif command == "models":
+            connection.send({index: model.to_bytes() for index, model in models.items()})
+        elif command == "stop":
+            connection.close()
+            return
+
+
+class TiledFarm:
+    """
+    An orchard of tiles side by side, each with num_drones drones,
+    num_pickers pickers and its own charging station, stepped by a pool of
+    worker processes (one per tile by default, at most one per core).
+    The farm-wide KPIs are the sums of the tile counters.
+    """
+
+    def __init__(self, tiles, tile_width, height, num_drones, num_pickers, num_clusters=0, extended_mode="Basic",
+                 seed=None, processes=None, **kwargs):
+        if tiles > 1 and tile_width < MIN_TILE_WIDTH:
+            raise ValueError(f"Tiles must be at least {MIN_TILE_WIDTH} columns wide")
+        self.tiles = tiles
+        self.tile_width = tile_width
+        self.width = tiles * tile_width
+        self.height = height
+        self.steps = 0
+        self.migrations = 0
+        self.forwarded = 0  # Dispatch requests sent to another tile
+        self.kpis = KPICounters(num_drones * tiles, num_pickers * tiles, 0)
+        seeds = [int(value) for value in np.random.SeedSequence(seed).generate_state(tiles)]
+        params = dict(num_drones=num_drones, num_pickers=num_pickers, num_clusters=num_clusters,
+                      extended_mode=extended_mode, **kwargs)
+
+        processes = min(tiles, processes or os.cpu_count() or 1)
+        chunks = np.array_split(np.arange(tiles), processes)
+        self.owner = {}  # tile index -> worker
+        self.workers = []
+        for worker_index, chunk in enumerate(chunks):
+            indexes = chunk.tolist()
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=tile_worker, name=f"tile-worker-{worker_index}", daemon=True,
+                                              args=(child, indexes, tiles, tile_width, height, params, seeds))
+            process.start()
+            child.close()
+            self.workers.append((parent, process))
+            for index in indexes:
+                self.owner[index] = worker_index
+        self.arrivals = {}  # tile index -> robots crossing into it before the next tick
+        self.requests = {}  # tile index -> dispatch requests for it before the next tick
+        self.idle = [0] * tiles  # Idle pickers of every tile after the last tick
+
+    def step(self):
+        for worker_index, (connection, _) in enumerate(self.workers):
+            mail = {}
+            for index in range(self.tiles):
+                if self.owner[index] == worker_index:
+                    spare = {side: self.idle[side] for side in (index - 1, index + 1) if 0 <= side < self.tiles}
+                    mail[index] = (self.arrivals.get(index, []), self.requests.get(index, []), spare)
+            connection.send(("step", mail))
+
+        self.arrivals = {}
+        self.requests = {}
+        counters = []
+        for connection, _ in self.workers:
+            outgoing, requests, tiles = connection.recv()
+            for destination, robots in outgoing.items():
+                self.arrivals.setdefault(destination, []).extend(robots)
+                self.migrations += len(robots)
+            for destination, crops in requests.items():
+                self.requests.setdefault(destination, []).extend(crops)
+                self.forwarded += len(crops)
+            for index, (tile_counters, idle) in tiles.items():
+                counters.append(tile_counters)
+                self.idle[index] = idle
+        counters.append(self.in_transit())
+        self.steps += 1
+        self.kpis.set_totals(counters)
+        self.kpis.record(self.steps)
+
+    def in_transit(self):
+        """Counters of the robots between two tiles, so they still count towards the fleet and its battery."""
+        counters = dict.fromkeys(COUNTER_FIELDS, 0)
+        for robots in self.arrivals.values():
+            for cls, state, _, _ in robots:
+                counters["num_drones" if issubclass(cls, BaseDroneAgent) else "num_pickers"] += 1
+                counters["battery_sum"] += state["battery"]
+        return counters
+
+    def run(self, steps):
+        for _ in range(steps):
+            self.step()
+        return self.kpis.snapshot()
+
+    def tile_models(self):
+        """Copies of the tile models as they are now, in tile order. Robots in transit are in neither tile."""
+        states = {}
+        for connection, _ in self.workers:
+            connection.send(("models", None))
+        for connection, _ in self.workers:
+            states.update(connection.recv())
+        return [FarmModel.from_bytes(states[index]) for index in range(self.tiles)]
+
+    def close(self):
+        for connection, process in self.workers:
+            with contextlib.suppress(BrokenPipeError, OSError):
+                connection.send(("stop", None))
+            process.join(timeout=5)
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one large orchard split into tiles across processes.")
+    parser.add_argument("--tiles", type=int, default=4)
+    parser.add_argument("--tile-width", type=int, default=30, help="orchard columns per tile")
+    parser.add_argument("--height", type=int, default=100)
+    parser.add_argument("--drones", type=int, default=5, help="drones per tile")
+    parser.add_argument("--pickers", type=int, default=8, help="pickers per tile")
+    parser.add_argument("--mode", default="Extended", choices=["Basic", "Extended", "Systematic"])
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per tile, up to the core count)")
+    args = parser.parse_args(argv)
+
+    with TiledFarm(args.tiles, args.tile_width, args.height, args.drones, args.pickers, extended_mode=args.mode,
+                   seed=args.seed, processes=args.processes) as farm:
+        start = time.perf_counter()
+        kpis = farm.run(args.steps)
+        elapsed = time.perf_counter() - start
+    print(f"{farm.width}x{farm.height} orchard in {args.tiles} tiles: {args.steps} steps in {elapsed:.2f}s "
+          f"({args.steps / elapsed:.0f} steps/s), {farm.migrations} seam crossings, "
+          f"{farm.forwarded} dispatch requests between tiles")
+    for name, value in kpis.items():
+        print(f"  {name}: {value:.4g}")
+
+
+if __name__ == "__main__":
+    main()
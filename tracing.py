@@ -0,0 +1,210 @@
+import hashlib
+import json
+import struct
+from collections import deque, namedtuple
+from enum import IntEnum
+
+# Levels, lowest is the most verbose
+DEBUG = 10
+INFO = 20
+OFF = 100
+
+DEFAULT_CAPACITY = 10000  # Events kept in the in-memory ring buffer
+
+
+class EventType(IntEnum):
+    MOVED = 1
+    FOUND = 2
+    DISPATCHED = 3
+    PICKED = 4
+    RECHARGED = 5
+    REGROWN = 6
+
+
+EVENT_LEVELS = {
+    EventType.MOVED: DEBUG,
+    EventType.REGROWN: DEBUG,
+    EventType.FOUND: INFO,
+    EventType.DISPATCHED: INFO,
+    EventType.PICKED: INFO,
+    EventType.RECHARGED: INFO,
+}
+
+TraceEvent = namedtuple("TraceEvent", ["step", "event", "agent_id", "x", "y", "value"])
+
+# Binary record: step, event type, agent id, x, y, value (e.g. the picker a location was sent to)
+RECORD = struct.Struct("<IBiiii")
+
+
+class Tracer:
+    """
+    Structured event tracing for the farm agents.
+
+    Agents guard every call with the `debug` / `info` flags, so a disabled
+    tracer costs one attribute lookup per potential event and no formatting.
+    Events go to an in-memory ring buffer and, optionally, to a binary file
+    of fixed-size RECORD entries that read_trace() can decode.
+    """
+
+    def __init__(self, level=OFF, capacity=DEFAULT_CAPACITY, path=None):
+        self.step = 0  # Updated by the model at the start of every step
+        self.buffer = deque(maxlen=capacity)
+        self.path = path
+        self.sink = open(path, "ab") if path else None
+        self.set_level(level)
+
+    def set_level(self, level):
+        self.level = level
+        self.debug = level <= DEBUG
+        self.info = level <= INFO
+
+    @property
+    def enabled(self):
+        return self.info
+
+    def emit(self, event, agent_id, pos, value=-1):
+        if self.level > EVENT_LEVELS[event]:
+            return
+        x, y = pos if pos is not None else (-1, -1)
+        record = TraceEvent(self.step, event, agent_id, x, y, value)
+        self.buffer.append(record)
+        if self.sink is not None:
+            self.sink.write(RECORD.pack(*record))
+
+    def moved(self, agent, pos):
+        self.emit(EventType.MOVED, agent.unique_id, pos)
+
+    def found(self, agent, pos):
+        self.emit(EventType.FOUND, agent.unique_id, pos)
+
+    def dispatched(self, sender, pos, picker):
+        """sender is the drone that shared the location, or None when the model dispatched it."""
+        sender_id = sender.unique_id if sender is not None else -1
+        self.emit(EventType.DISPATCHED, sender_id, pos, picker.unique_id)
+
+    def picked(self, agent, pos):
+        self.emit(EventType.PICKED, agent.unique_id, pos)
+
+    def recharged(self, agent, pos):
+        self.emit(EventType.RECHARGED, agent.unique_id, pos)
+
+    def regrown(self, crop, pos):
+        self.emit(EventType.REGROWN, crop.unique_id, pos)
+
+    def events(self, event=None):
+        """Return the buffered events, optionally only those of one type."""
+        if event is None:
+            return list(self.buffer)
+        return [record for record in self.buffer if record.event == event]
+
+    def flush(self):
+        if self.sink is not None:
+            self.sink.flush()
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+    def __getstate__(self):
+        # Open file handles cannot be copied; a copied tracer only keeps its ring buffer
+        state = self.__dict__.copy()
+        state["sink"] = None
+        state["path"] = None
+        return state
+
+
+def read_trace(path):
+    """Yield the TraceEvents stored in a binary trace file."""
+    with open(path, "rb") as trace_file:
+        for fields in RECORD.iter_unpack(trace_file.read()):
+            step, event, agent_id, x, y, value = fields
+            yield TraceEvent(step, EventType(event), agent_id, x, y, value)
+
+
+class ReplayMismatch(Exception):
+    """Raised when a replayed run takes a different action than the recorded one."""
+
+    def __init__(self, index, expected, actual):
+        self.index = index
+        self.expected = expected
+        self.actual = actual
+        super().__init__(f"Run diverged at action {index}: expected {expected}, got {actual}")
+
+
+class ActionLog:
+    """
+    Every action of one seeded run: moves, finds, dispatches, picks,
+    recharges and regrowth, in the order they happened.
+
+    Together with the model parameters and seed, the log is enough to replay
+    the run and check that it takes exactly the same actions, or to check
+    that another engine (e.g. a faster implementation of the same rules)
+    behaves identically. Any model class that accepts `seed` and `tracer`
+    keyword arguments can be recorded.
+    """
+
+    def __init__(self, params, seed, steps, events=()):
+        self.params = dict(params)
+        self.seed = seed
+        self.steps = steps
+        self.events = list(events)
+
+    @classmethod
+    def record(cls, model_class, params, seed, steps):
+        """Run model_class(**params) for steps ticks and log all of its actions."""
+        tracer = Tracer(DEBUG, capacity=None)
+        model = model_class(**params, seed=seed, tracer=tracer)
+        for _ in range(steps):
+            model.step()
+        return cls(params, seed, steps, tracer.events())
+
+    def replay(self, model_class):
+        """Run the logged parameters and seed again, returning the new log."""
+        return ActionLog.record(model_class, self.params, self.seed, self.steps)
+
+    def verify(self, model_class):
+        """Replay the run with model_class and raise ReplayMismatch at the first differing action."""
+        divergence = first_divergence(self.events, self.replay(model_class).events)
+        if divergence is not None:
+            raise ReplayMismatch(*divergence)
+
+    def digest(self):
+        """SHA-256 of the binary trace records, for comparing runs without keeping their logs."""
+        sha = hashlib.sha256()
+        for event in self.events:
+            sha.update(RECORD.pack(*event))
+        return sha.hexdigest()
+
+    def __len__(self):
+        return len(self.events)
+
+    def save(self, path):
+        with open(path, "w") as log_file:
+            json.dump({
+                "params": self.params,
+                "seed": self.seed,
+                "steps": self.steps,
+                "events": [list(event) for event in self.events],
+            }, log_file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as log_file:
+            data = json.load(log_file)
+        events = [TraceEvent(step, EventType(event), agent_id, x, y, value)
+                  for step, event, agent_id, x, y, value in data["events"]]
+        return cls(data["params"], data["seed"], data["steps"], events)
+
+
+def first_divergence(expected, actual):
+    """Return (index, expected event, actual event) of the first difference, or None if identical."""
+    for index, (want, got) in enumerate(zip(expected, actual)):
+        if want != got:
+            return index, want, got
+    if len(expected) != len(actual):
+        index = min(len(expected), len(actual))
+        want = expected[index] if index < len(expected) else None
+        got = actual[index] if index < len(actual) else None
+        return index, want, got
+    return None
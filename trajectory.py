@@ -0,0 +1,258 @@
+"""
+Columnar trajectory files for post-mortems on long runs.
+
+A TrajectoryRecorder appends one frame per step: position, state code,
+battery and storage of every drone and picker, plus a bitmap of the ripe
+crops every crop_every steps. Each column is written to its own
+memory-mapped .npy file per chunk of chunk_steps frames, and a chunk is
+closed as soon as it is full, so memory stays flat however long the run is.
+The last chunk is cut down to the frames actually recorded when the
+recorder is closed.
+
+Trajectory opens a recording and memory-maps only the chunks a query
+touches, so seeking to any step of a million-step run reads a few pages.
+
+    python -m AutounomousAgents.trajectory info runs/trace
+    python -m AutounomousAgents.trajectory show runs/trace --step 250000
+"""
+import argparse
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CHUNK_STEPS = 65536
+DEFAULT_CROP_EVERY = 100  # A crop bitmap is width * height / 8 bytes, 125 kB on a 1000x1000 farm
+OPEN_CHUNKS = 8  # Chunks a Trajectory keeps mapped at once
+META_FILE = "meta.json"
+
+STATE_CODES = {"Exploring": 0, "Waiting": 1, "Returning": 2, "Idle": 3, "Moving": 4, "Picking": 5}
+ROBOT_COLUMNS = {"x": np.int16, "y": np.int16, "state": np.uint8, "battery": np.int16, "storage": np.uint8}
+
+
+def grown_crops(model):
+    """Boolean (width, height) grid of the clusters that are ready to pick."""
+    if model.crop_field is not None:
+        return model.crop_field.is_grown
+    grid = np.zeros((model.width, model.height), dtype=bool)
+    if model.grown_crops:
+        xs, ys = zip(*model.grown_crops)
+        grid[list(xs), list(ys)] = True
+    return grid
+
+
+class TrajectoryRecorder:
+    """
+    Records a model to a directory of chunked columns. Pass it to FarmModel
+    as recorder=..., which records the initial state and then every step,
+    and call close() at the end of the run.
+    """
+
+    def __init__(self, directory, chunk_steps=DEFAULT_CHUNK_STEPS, crop_every=DEFAULT_CROP_EVERY):
+        self.directory = directory
+        self.chunk_steps = chunk_steps
+        self.crop_every = crop_every
+        self.frames = 0
+        self.robots = None
+        self.chunk = 0
+        self.columns = None  # Column name -> memmap of the open chunk
+        self.crops = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self, model):
+        for name, size in (("x", model.width), ("y", model.height)):
+            if size - 1 > np.iinfo(ROBOT_COLUMNS[name]).max:
+                raise ValueError(f"A {model.width}x{model.height} farm does not fit the "
+                                 f"{np.dtype(ROBOT_COLUMNS[name]).name} {name} column")
+        self.robots = model.drones + model.pickers
+        self.meta = {
+            "width": model.width,
+            "height": model.height,
+            "first_step": model.schedule.steps,
+            "frames": 0,
+            "chunk_steps": self.chunk_steps,
+            "crop_every": self.crop_every,
+            "robots": [{"id": robot.unique_id, "kind": "drone" if index < len(model.drones) else "picker"}
+                       for index, robot in enumerate(self.robots)],
+            "state_codes": STATE_CODES,
+        }
+        self.record(model)
+
+    def open_chunk(self, chunk):
+        self.chunk = chunk
+        self.columns = {
+            name: np.lib.format.open_memmap(self.chunk_path(name, chunk), mode="w+", dtype=dtype,
+                                            shape=(self.chunk_steps, len(self.robots)))
+            for name, dtype in ROBOT_COLUMNS.items()
+        }
+        crop_bytes = (self.meta["width"] * self.meta["height"] + 7) // 8
+        self.crops = np.lib.format.open_memmap(self.chunk_path("crops", chunk), mode="w+", dtype=np.uint8,
+                                               shape=(-(-self.chunk_steps // self.crop_every), crop_bytes))
+
+    def close_chunk(self):
+        frames = self.frames - self.chunk * self.chunk_steps
+        if frames < self.chunk_steps:
+            # Rewrite the files of a part-filled chunk with only the recorded rows
+            for name, column in list(self.columns.items()) + [("crops", self.crops)]:
+                rows = frames if name != "crops" else -(-frames // self.crop_every)
+                path = self.chunk_path(name, self.chunk)
+                temporary = path + ".tmp.npy"
+                np.save(temporary, column[:rows])
+                os.replace(temporary, path)
+        else:
+            for column in list(self.columns.values()) + [self.crops]:
+                column.flush()
+        self.columns = self.crops = None
+        self.write_meta()
+
+    def chunk_path(self, name, chunk):
+        return os.path.join(self.directory, f"{name}-{chunk:06d}.npy")
+
+    def record(self, model):
+        """Append the current state of the model as the next frame."""
+        if self.directory is None:
+            return  # A copy of a recording model, e.g. restored from a checkpoint
+        if len(model.drones) + len(model.pickers) != len(self.robots):
+            raise ValueError("The fleet changed size during recording")
+        chunk, row = divmod(self.frames, self.chunk_steps)
+        if row == 0:
+            self.open_chunk(chunk)
+        columns = self.columns
+        for index, robot in enumerate(self.robots):
+            x, y = robot.pos
+            columns["x"][row, index] = x
+            columns["y"][row, index] = y
+            columns["state"][row, index] = STATE_CODES[robot.state]
+            columns["battery"][row, index] = robot.battery
+            columns["storage"][row, index] = getattr(robot, "storage", 0)
+        if row % self.crop_every == 0:
+            self.crops[row // self.crop_every] = np.packbits(grown_crops(model), axis=None)
+        self.frames += 1
+        if row == self.chunk_steps - 1:
+            self.close_chunk()
+
+    def write_meta(self):
+        self.meta["frames"] = self.frames
+        temporary = os.path.join(self.directory, META_FILE + ".tmp")
+        with open(temporary, "w") as meta_file:
+            json.dump(self.meta, meta_file)
+        os.replace(temporary, os.path.join(self.directory, META_FILE))
+
+    def close(self):
+        if self.directory is None:
+            return
+        if self.columns is not None:
+            self.close_chunk()
+        else:
+            self.write_meta()
+
+    def __getstate__(self):
+        # Open maps cannot be copied, and a copied model must not append to the same files
+        state = self.__dict__.copy()
+        state["columns"] = state["crops"] = None
+        state["directory"] = None
+        return state
+
+
+class Trajectory:
+    """Read side of a recording: random access to any frame without loading the files."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as meta_file:
+            self.meta = json.load(meta_file)
+        self.chunk_steps = self.meta["chunk_steps"]
+        self.crop_every = self.meta["crop_every"]
+        self.first_step = self.meta["first_step"]
+        self.robots = self.meta["robots"]
+        self.state_names = {code: name for name, code in self.meta["state_codes"].items()}
+        self.open = OrderedDict()  # (name, chunk) -> memmap, least recently used first
+
+    def __len__(self):
+        return self.meta["frames"]
+
+    @property
+    def last_step(self):
+        return self.first_step + len(self) - 1
+
+    def column_chunk(self, name, chunk):
+        key = (name, chunk)
+        if key in self.open:
+            self.open.move_to_end(key)
+        else:
+            self.open[key] = np.load(os.path.join(self.directory, f"{name}-{chunk:06d}.npy"), mmap_mode="r")
+            if len(self.open) > OPEN_CHUNKS:
+                self.open.popitem(last=False)
+        return self.open[key]
+
+    def locate(self, step):
+        frame = step - self.first_step
+        if not 0 <= frame < len(self):
+            raise IndexError(f"Step {step} is outside the recording ({self.first_step}-{self.last_step})")
+        return divmod(frame, self.chunk_steps)
+
+    def robots_at(self, step):
+        """{column: array with one entry per robot} at the given step."""
+        chunk, row = self.locate(step)
+        return {name: np.array(self.column_chunk(name, chunk)[row]) for name in ROBOT_COLUMNS}
+
+    def crops_at(self, step):
+        """Ripe-crop grid of the latest snapshot at or before the step."""
+        chunk, row = self.locate(step)
+        packed = self.column_chunk("crops", chunk)[row // self.crop_every]
+        cells = self.meta["width"] * self.meta["height"]
+        return np.unpackbits(packed, count=cells).astype(bool).reshape(self.meta["width"], self.meta["height"])
+
+    def column(self, name, start=None, stop=None):
+        """One column over a range of steps, as a (steps, robots) array."""
+        start = self.first_step if start is None else start
+        stop = self.last_step + 1 if stop is None else stop
+        parts = []
+        step = start
+        while step < stop:
+            chunk, row = self.locate(step)
+            end = min(self.chunk_steps, row + stop - step)
+            parts.append(self.column_chunk(name, chunk)[row:end])
+            step += end - row
+        return np.concatenate(parts) if parts else np.empty((0, len(self.robots)))
+
+    def render(self, step):
+        """Text map of the farm: D drone, P picker, * ripe crop, . empty."""
+        crops = self.crops_at(step)
+        robots = self.robots_at(step)
+        cells = np.where(crops, "*", ".")
+        for robot, x, y in zip(self.robots, robots["x"], robots["y"]):
+            cells[x, y] = "D" if robot["kind"] == "drone" else "P"
+        return "\n".join("".join(cells[:, y]) for y in reversed(range(self.meta["height"])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect a recorded FarmModel trajectory.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="summarize a recording")
+    info.add_argument("directory")
+    show = commands.add_parser("show", help="print the robots and a map at one step")
+    show.add_argument("directory")
+    show.add_argument("--step", type=int, required=True)
+    args = parser.parse_args(argv)
+
+    trajectory = Trajectory(args.directory)
+    if args.command == "info":
+        meta = trajectory.meta
+        print(f"{meta['width']}x{meta['height']} farm, {len(trajectory.robots)} robots, "
+              f"steps {trajectory.first_step}-{trajectory.last_step}, chunks of {meta['chunk_steps']} steps, "
+              f"crop snapshot every {meta['crop_every']} steps")
+        return
+
+    robots = trajectory.robots_at(args.step)
+    print(f"Step {args.step}")
+    for index, robot in enumerate(trajectory.robots):
+        print(f"  {robot['kind']:6} {robot['id']:>4} at ({robots['x'][index]}, {robots['y'][index]}) "
+              f"{trajectory.state_names[int(robots['state'][index])]:9} battery={robots['battery'][index]} "
+              f"storage={robots['storage'][index]}")
+    print(trajectory.render(args.step))
+
+
+if __name__ == "__main__":
+    main()
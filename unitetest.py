@@ -1,9 +1,46 @@
+import asyncio
 import unittest
 from unittest.mock import MagicMock
 from agent import BasicPickerRobotAgent, BasicDroneAgent, BasicStrawberryCluster
+from cropfield import CropField, REGROWTH_STEPS
+from tracing import Tracer, EventType, DEBUG, INFO, ActionLog, ReplayMismatch
+import random
+from kpi import KPICounters
+from spatial import BucketIndex, IndexedMultiGrid, manhattan
+from dispatch import PickerPool, LEAST_LOADED
+from messaging import MessageBus
+from navigation import Navigator
+from coverage import CoveragePlanner, ROWS, COLUMNS
+from scheduler import DormantActivation
+from profiling import StepProfiler, SectionStats
+from fastforward import SimulationRunner
+from resultcache import ResultCache
+from trajectory import TrajectoryRecorder, Trajectory
+from terrain import FarmLayout, EMPTY, TREE, RIVER, CHARGING_STATION
+import tempfile
+import os
+import pickle
+from mesa import Agent, Model
+from mesa.space import MultiGrid
+import numpy as np
+import contextlib
+import csv
+import importlib
+import io
+import sys
 
 STORAGE_CAPACITY = 5  # Define the storage capacity
 
+# model.py and the tools built on it use package-relative imports, so they are imported through the package
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+if os.path.dirname(PACKAGE_DIR) not in sys.path:
+    sys.path.append(os.path.dirname(PACKAGE_DIR))
+
+
+def package_module(name):
+    return importlib.import_module(f"{os.path.basename(PACKAGE_DIR)}.{name}")
+
+
 class TestBasicPickerRobotAgent(unittest.TestCase):
     def setUp(self):
         self.model = MagicMock()
@@ -36,6 +73,10 @@ class TestBasicPickerRobotAgent(unittest.TestCase):
         self.assertEqual(strawberry.age, 0)
         self.assertEqual(self.picker.battery, 9)
 
+    def test_state_change_notifies_model(self):
+        self.picker.state = "Moving"
+        self.model.picker_state_changed.assert_called_with(self.picker, "Idle", "Moving")
+
     def test_pick_strawberries_storage_full(self):
         self.picker.storage = STORAGE_CAPACITY - 1
         strawberry = MagicMock()
@@ -60,6 +101,11 @@ class TestBasicStrawberryCluster(unittest.TestCase):
         self.strawberry.step()
         self.assertEqual(self.strawberry.is_grown, True)
 
+    def test_is_grown_updates_model_index(self):
+        self.strawberry.pos = (1, 1)
+        self.strawberry.is_grown = False
+        self.model.update_crop_index.assert_called_with((1, 1), False)
+
 class TestBasicDroneAgent(unittest.TestCase):
     def setUp(self):
         self.model = MagicMock()
@@ -97,5 +143,921 @@ class TestBasicDroneAgent(unittest.TestCase):
     
     
 
+class TestCropField(unittest.TestCase):
+    def setUp(self):
+        self.field = CropField(5, 5, max_age=3)
+        self.field.add((2, 2))
+
+    def test_pick_marks_cell(self):
+        self.assertTrue(self.field.pick((2, 2)))
+        crop = self.field.cell((2, 2))
+        self.assertEqual(crop.is_grown, False)
+        self.assertEqual(crop.picked, True)
+        self.assertEqual(crop.age, 0)
+        self.assertFalse(self.field.pick((2, 2)))
+        self.assertIsNone(self.field.cell((1, 1)))
+
+    def test_step_regrows_after_max_age(self):
+        self.field.pick((2, 2))
+        for _ in range(3):
+            self.field.step()
+        self.assertEqual(self.field.has_grown_crop((2, 2)), True)
+        self.assertEqual(self.field.cell((2, 2)).picked, False)
+
+    def test_basic_field_never_regrows(self):
+        field = CropField(5, 5, regrows=False)
+        field.add((1, 1))
+        field.pick((1, 1))
+        for _ in range(REGROWTH_STEPS + 1):
+            field.step()
+        self.assertEqual(field.has_grown_crop((1, 1)), False)
+
+
+class TestTracer(unittest.TestCase):
+    def test_disabled_tracer_records_nothing(self):
+        tracer = Tracer()
+        self.assertFalse(tracer.debug or tracer.info)
+        tracer.picked(MagicMock(unique_id=1), (2, 3))
+        self.assertEqual(tracer.events(), [])
+
+    def test_level_filters_debug_events(self):
+        tracer = Tracer(INFO, capacity=2)
+        agent = MagicMock(unique_id=7)
+        tracer.moved(agent, (0, 1))
+        for step in range(3):
+            tracer.step = step
+            tracer.picked(agent, (2, 3))
+        events = tracer.events()
+        self.assertEqual(len(events), 2)  # Ring buffer keeps the latest events only
+        self.assertEqual(events[-1].event, EventType.PICKED)
+        self.assertEqual(events[-1].step, 2)
+
+
+class WanderingModel:
+    """Minimal model that moves one agent at random and reports it to the tracer."""
+    def __init__(self, seed=None, tracer=None, size=5):
+        self.random = random.Random(seed)
+        self.tracer = tracer
+        self.size = size
+        self.unique_id = 0
+
+    def step(self):
+        self.tracer.moved(self, (self.random.randrange(self.size), self.random.randrange(self.size)))
+        self.tracer.step += 1
+
+class TestActionLog(unittest.TestCase):
+    def test_seeded_run_replays_exactly(self):
+        log = ActionLog.record(WanderingModel, {"size": 5}, 42, 20)
+        self.assertEqual(len(log), 20)
+        log.verify(WanderingModel)
+        self.assertEqual(log.replay(WanderingModel).digest(), log.digest())
+
+    def test_divergence_is_reported(self):
+        log = ActionLog.record(WanderingModel, {"size": 5}, 42, 20)
+        log.events[3] = log.events[3]._replace(x=-1)
+        with self.assertRaises(ReplayMismatch) as raised:
+            log.verify(WanderingModel)
+        self.assertEqual(raised.exception.index, 3)
+
+
+class TestFarmModelActionLog(unittest.TestCase):
+    PARAMS = {"num_drones": 2, "num_pickers": 3, "num_clusters": 0}
+
+    def setUp(self):
+        self.FarmModel = package_module("model").FarmModel
+
+    def test_seeded_farm_replays_exactly_in_every_mode(self):
+        for mode in ["Basic", "Extended", "Systematic"]:
+            with self.subTest(mode=mode):
+                log = ActionLog.record(self.FarmModel, dict(self.PARAMS, extended_mode=mode), 11, 60)
+                self.assertTrue(any(event.event == EventType.PICKED for event in log.events))
+                log.verify(self.FarmModel)
+
+    def test_interleaved_models_keep_independent_logs(self):
+        params = dict(self.PARAMS, extended_mode="Extended")
+        tracers = [Tracer(DEBUG, capacity=None) for _ in range(2)]
+        models = [self.FarmModel(**params, seed=seed, tracer=tracer) for seed, tracer in zip([1, 2], tracers)]
+        for _ in range(40):
+            for model in models:
+                model.step()
+        for seed, tracer in zip([1, 2], tracers):
+            alone = ActionLog.record(self.FarmModel, params, seed, 40)
+            self.assertEqual(ActionLog(params, seed, 40, tracer.events()).digest(), alone.digest())
+
+class TestMessageLoss(unittest.TestCase):
+    def test_picking_continues_when_discoveries_are_lost(self):
+        FarmModel = package_module("model").FarmModel
+        for mode in ["Extended", "Systematic"]:
+            with self.subTest(mode=mode):
+                model = FarmModel(3, 4, 5, mode, seed=1, message_loss=0.3)
+                for _ in range(600):
+                    model.step()
+                picked = model.kpis.total_picked
+                for _ in range(600):
+                    model.step()
+                self.assertGreater(model.bus.dropped, 0)
+                self.assertGreater(model.kpis.total_picked, picked)
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        FarmModel = package_module("model").FarmModel
+        self.model = FarmModel(2, 3, 0, "Extended", seed=5)
+        for _ in range(30):
+            self.model.step()
+
+    def assertSameFuture(self, model, copy, steps=40):
+        for _ in range(steps):
+            model.step()
+            copy.step()
+        self.assertEqual(copy.kpis.series(), model.kpis.series())
+        self.assertEqual([robot.pos for robot in copy.drones + copy.pickers],
+                         [robot.pos for robot in model.drones + model.pickers])
+
+    def test_checkpoint_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "farm.ckpt")
+            self.model.save_checkpoint(path)
+            restored = type(self.model).load_checkpoint(path)
+        self.assertEqual(len(restored.navigation.fields), 0)  # Distance fields are rebuilt, not stored
+        self.assertSameFuture(self.model, restored)
+
+    def test_fork_continues_like_the_original(self):
+        self.assertSameFuture(self.model, self.model.fork())
+
+    def test_checkpoint_format_is_versioned(self):
+        model_module = package_module("model")
+        data = self.model.to_bytes()
+        self.assertTrue(data.startswith(b"FARMCKPT%d" % model_module.CHECKPOINT_VERSION))
+        older = b"FARMCKPT2" + data[len(b"FARMCKPT%d" % model_module.CHECKPOINT_VERSION):]
+        with self.assertRaisesRegex(ValueError, "version 2"):
+            model_module.FarmModel.from_bytes(older)
+        with self.assertRaises(ValueError):
+            model_module.FarmModel.from_bytes(b"not a checkpoint")
+
+    def test_checkpoint_without_opt_in_attributes_still_steps(self):
+        copy = self.model.fork()
+        for name in package_module("model").CHECKPOINT_DEFAULTS:
+            del copy.__dict__[name]
+        restored = type(self.model).from_bytes(copy.to_bytes())
+        self.assertIsNone(restored.recorder)
+        self.assertSameFuture(self.model, restored)
+
+
+class TestBenchmarkCompare(unittest.TestCase):
+    def setUp(self):
+        self.benchmark = package_module("benchmark")
+        case = {"mode": "Basic", "size": 20, "num_drones": 2, "num_pickers": 3}
+        self.baseline = {"results": [dict(case, steps_per_sec=1000.0, p99_ms=2.0, peak_mem_mb=10.0, construct_s=0.01)]}
+        self.case = case
+
+    def result(self, **metrics):
+        row = dict(self.baseline["results"][0], **metrics)
+        return {"results": [row, dict(row, size=50)]}  # A case missing from the baseline is skipped
+
+    def test_slowdown_beyond_threshold_is_reported(self):
+        regressions = self.benchmark.compare(self.result(steps_per_sec=700.0, p99_ms=3.0), self.baseline, threshold=0.2)
+        self.assertEqual(sorted(metric for _, metric, _, _, _ in regressions), ["p99_ms", "steps_per_sec"])
+        case, metric, old, new, change = next(r for r in regressions if r[1] == "steps_per_sec")
+        self.assertEqual((case, old, new), (self.benchmark.case_key(self.case), 1000.0, 700.0))
+        self.assertAlmostEqual(change, -0.3)
+
+    def test_changes_within_tolerance_are_not_reported(self):
+        faster = self.result(steps_per_sec=1500.0, p99_ms=1.0, peak_mem_mb=11.0, construct_s=0.011)
+        self.assertEqual(self.benchmark.compare(faster, self.baseline, threshold=0.2), [])
+
+
+class TestFarmCanvasGrid(unittest.TestCase):
+    def setUp(self):
+        self.portraycell = package_module("portraycell")
+        FarmModel = package_module("model").FarmModel
+        self.model = FarmModel(2, 3, 0, "Extended", crop_field=True, seed=4)
+
+    def canvas(self):
+        return self.portraycell.FarmCanvasGrid(self.portraycell.agent_portrayal, 20, 20)
+
+    def cells(self, canvas, frame):
+        """{pos: portrayals} of a frame, with palette indexes resolved."""
+        palette = {index: key for key, index in canvas.palette_keys.items()}
+        return {(x, y): [palette[index] for index in indexes] for x, y, indexes in frame["cells"]}
+
+    def test_second_render_sends_only_changed_cells(self):
+        canvas = self.canvas()
+        first = canvas.render(self.model)
+        self.assertTrue(first["full"])
+        before = self.cells(canvas, first)
+        for _ in range(5):
+            self.model.step()
+        delta = canvas.render(self.model)
+        self.assertFalse(delta["full"])
+
+        fresh = self.canvas()
+        after = self.cells(fresh, fresh.render(self.model))
+        changed = {pos for pos in set(before) | set(after) if before.get(pos, []) != after.get(pos, [])}
+        sent = self.cells(canvas, delta)
+        self.assertTrue(changed)
+        self.assertLessEqual(changed, set(sent))
+        self.assertLess(len(sent), len(before) / 4)
+        for pos, portrayals in sent.items():
+            self.assertEqual(portrayals, after.get(pos, []))
+        self.assertEqual(canvas.render(self.model)["cells"], [])  # Nothing changed since the last frame
+
+
+class TestKPICounters(unittest.TestCase):
+    def test_counters_and_series(self):
+        kpis = KPICounters(num_drones=1, num_pickers=2, battery_capacity=10)
+        kpis.drone_energy_used()
+        kpis.drone_energy_used()
+        kpis.found()
+        kpis.picker_energy_used()
+        kpis.picked()
+        kpis.record(0)
+        kpis.recharged(8, 10)
+        kpis.record(1)
+        self.assertEqual(kpis.total_energy, 3)
+        self.assertEqual(kpis.avg_picked_per_agent, 0.5)
+        self.assertAlmostEqual(kpis.exploration_efficiency, 1 / 3)
+        self.assertEqual(kpis.series()["avg_battery"], [9.0, 29 / 3])
+
+    def test_batched_counts(self):
+        kpis = KPICounters(num_drones=2, num_pickers=2, battery_capacity=10)
+        kpis.drone_energy_used(2)
+        kpis.picker_energy_used(3)
+        kpis.picked(2)
+        kpis.found(2)
+        kpis.recharged(15, 20, count=2)
+        self.assertEqual(kpis.total_picked, 2)
+        self.assertEqual(kpis.recharges, 2)
+        self.assertEqual(kpis.avg_battery, 10.0)
+
+    def test_totals_of_several_counters(self):
+        left = KPICounters(num_drones=1, num_pickers=1, battery_capacity=10)
+        right = KPICounters(num_drones=1, num_pickers=3, battery_capacity=10)
+        left.picked(2)
+        right.drone_energy_used(4)
+        total = KPICounters(0, 0, 0)
+        total.set_totals([left.counters(), right.counters()])
+        self.assertEqual(total.total_picked, 2)
+        self.assertEqual(total.avg_picked_per_agent, 0.5)
+        self.assertAlmostEqual(total.avg_battery, 56 / 6)
+
+
+class TestBucketIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = BucketIndex(40, 40, bucket_size=4)
+        self.agents = []
+        for i, pos in enumerate([(0, 0), (10, 10), (39, 39), (12, 9), (30, 2)]):
+            agent = MagicMock(unique_id=i, state="Idle")
+            self.index.add(agent, pos)
+            self.agents.append(agent)
+
+    def test_nearest_matches_full_scan(self):
+        for query in [(0, 0), (11, 11), (35, 5), (20, 39)]:
+            expected = sorted(self.agents, key=lambda a: (manhattan(query, self.index.positions[a]), a.unique_id))
+            self.assertEqual(self.index.nearest(query, k=3), expected[:3])
+
+    def test_move_and_predicate(self):
+        self.index.move(self.agents[2], (1, 1))
+        self.assertEqual(self.index.nearest((2, 2)), [self.agents[2]])
+        self.agents[2].state = "Moving"
+        idle = self.index.nearest((2, 2), predicate=lambda a: a.state == "Idle")
+        self.assertEqual(idle, [self.agents[0]])
+
+
+class Token:
+    def __init__(self, unique_id):
+        self.unique_id = unique_id
+        self.pos = None
+
+
+class TestIndexedMultiGrid(unittest.TestCase):
+    def test_behaves_like_a_plain_multigrid(self):
+        index = BucketIndex(9, 7)
+        indexed = IndexedMultiGrid(9, 7, torus=False, index=index)
+        plain = MultiGrid(9, 7, torus=False)
+        draws = random.Random(2)
+        tokens = {grid: [Token(i) for i in range(6)] for grid in (indexed, plain)}
+        for grid, placed in tokens.items():
+            for token in placed:
+                grid.place_agent(token, (token.unique_id, token.unique_id % 7))
+        for token in tokens[indexed][::2]:
+            index.add(token, token.pos)
+
+        def cells(grid):
+            return [[token.unique_id for token in grid.get_cell_list_contents([(x, y)])] for x in range(9) for y in range(7)]
+
+        for _ in range(50):
+            i = draws.randrange(6)
+            pos = draws.choice(indexed.get_neighborhood(tokens[indexed][i].pos, moore=True))
+            for grid in (indexed, plain):
+                grid.move_agent(tokens[grid][i], pos)
+            self.assertEqual(cells(indexed), cells(plain))
+            self.assertEqual(indexed.empties, plain.empties)
+            self.assertEqual([t.unique_id for t in indexed.get_neighbors(pos, moore=True, radius=2)],
+                             [t.unique_id for t in plain.get_neighbors(pos, moore=True, radius=2)])
+        self.assertEqual((indexed.width, indexed.height, indexed.num_cells), (plain.width, plain.height, plain.num_cells))
+        for token in tokens[indexed][::2]:
+            self.assertEqual(index.positions[token], token.pos)
+
+
+class TestPickerPool(unittest.TestCase):
+    def test_fifo_and_deferred_locations(self):
+        pool = PickerPool()
+        first, second = MagicMock(unique_id=1), MagicMock(unique_id=2)
+        self.assertIsNone(pool.acquire((1, 1)))
+        pool.defer((1, 1))
+        pool.defer((1, 1))
+        self.assertEqual(len(pool.pending), 1)
+        pool.join(first)
+        pool.join(second)
+        self.assertIs(pool.acquire((1, 1)), first)
+        pool.leave(second)
+        self.assertEqual(len(pool), 0)
+
+    def test_least_loaded_policy(self):
+        pool = PickerPool(LEAST_LOADED)
+        full, empty = MagicMock(unique_id=1, storage=4), MagicMock(unique_id=2, storage=0)
+        pool.join(full)
+        pool.join(empty)
+        self.assertIs(pool.acquire((0, 0)), empty)
+
+
+class TestMessageBus(unittest.TestCase):
+    def test_latency_and_addressing(self):
+        bus = MessageBus(latency=2)
+        drone, picker, dispatcher = MagicMock(), MagicMock(), MagicMock()
+        bus.register(drone)
+        bus.register(picker)
+        bus.subscribe(dispatcher, "crop_found")
+        bus.publish(drone, "crop_found", (3, 4))
+        bus.broadcast(drone, "hello", None)
+        self.assertEqual(bus.deliver(1), 0)
+        self.assertEqual(bus.deliver(2), 2)
+        dispatcher.receive_messages.assert_called_once()
+        self.assertEqual(dispatcher.receive_messages.call_args[0][0][0].payload, (3, 4))
+        drone.receive_messages.assert_not_called()
+        self.assertEqual(bus.metrics()["queue_depth"], 0)
+
+    def test_unregistered_agent_loses_its_messages(self):
+        dropped = []
+        bus = MessageBus(latency=1, on_drop=dropped.append)
+        picker = MagicMock()
+        bus.register(picker)
+        bus.send(None, picker, "assign", (2, 3))
+        bus.unregister(picker)
+        self.assertEqual(bus.deliver(1), 0)
+        self.assertEqual([message.payload for message in dropped], [(2, 3)])
+        picker.receive_messages.assert_not_called()
+
+    def test_lost_messages_are_reported(self):
+        rng = MagicMock()
+        rng.random.return_value = 0.0
+        on_drop = MagicMock()
+        bus = MessageBus(loss=0.5, rng=rng, on_drop=on_drop)
+        picker = MagicMock()
+        bus.send(None, picker, "assign", (1, 1))
+        bus.deliver(0)
+        picker.receive_messages.assert_not_called()
+        self.assertEqual(bus.dropped, 1)
+        on_drop.assert_called_once()
+
+
+class TestNavigator(unittest.TestCase):
+    def setUp(self):
+        cost = np.ones((6, 3))
+        cost[3, :2] = np.inf  # Wall with a gap at the top
+        self.navigator = Navigator(cost)
+        self.navigator.add_goal("home", [(0, 0)])
+
+    def test_path_goes_around_wall(self):
+        pos, moves = (5, 0), 0
+        while pos != (0, 0):
+            pos = self.navigator.next_step(pos, "home")
+            self.assertNotEqual(pos[0] == 3 and pos[1] < 2, True)
+            moves += 1
+        self.assertEqual(moves, self.navigator.moves((5, 0), "home"))
+        self.assertTrue(self.navigator.can_reach((5, 0), "home", moves + 1))
+        self.assertFalse(self.navigator.can_reach((5, 0), "home", moves))
+
+    def test_cost_change_invalidates_fields(self):
+        self.navigator.field((5, 2))
+        self.navigator.set_cost(np.ones((6, 3)))
+        self.assertEqual(self.navigator.moves((5, 0), "home"), 5)
+
+    def test_target_fields_cover_a_window_within_the_byte_budget(self):
+        navigator = Navigator(np.ones((50, 50)), cache_bytes=2000, margin=2)
+        field = navigator.field((10, 10), pos=(12, 12))
+        self.assertEqual(field.distance.shape, (7, 7))
+        self.assertEqual(navigator.moves((12, 12), (10, 10)), 2)
+        for x in range(20, 40, 4):
+            navigator.next_step((x, 30), (x + 2, 32))
+        self.assertLessEqual(navigator.cached_bytes, 2000)
+        self.assertEqual(navigator.cached_bytes, sum(field.nbytes for field in navigator.fields.values()))
+
+    def test_window_widens_around_walls(self):
+        cost = np.ones((30, 30))
+        cost[5, :26] = np.inf  # Wall with a gap at the top, far outside the first window
+        navigator = Navigator(cost, margin=2)
+        expected = Navigator(cost).field((7, 0)).moves[3, 0]
+        self.assertGreater(expected, 40)
+        self.assertEqual(navigator.moves((3, 0), (7, 0)), expected)
+
+
+class TestCoveragePlanner(unittest.TestCase):
+    def test_row_sweep_matches_boustrophedon(self):
+        path = CoveragePlanner(3, 2).path(ROWS)
+        self.assertEqual(list(path), [(0, 0), (1, 0), (2, 0), (2, 1), (1, 1), (0, 1)])
+
+    def test_strips_are_disjoint_and_shared(self):
+        planner = CoveragePlanner(5, 4)
+        strips = [set(planner.path(COLUMNS, strip, 2)) for strip in range(2)]
+        self.assertEqual(len(strips[0] | strips[1]), 20)
+        self.assertFalse(strips[0] & strips[1])
+        self.assertIs(planner.path(COLUMNS, 1, 2), planner.path(COLUMNS, 1, 2))
+
+    def test_index_inverts_the_sweep(self):
+        path = CoveragePlanner(5, 4).path(COLUMNS, 1, 2)
+        self.assertEqual([path.index(cell) for cell in path], list(range(len(path))))
+        with self.assertRaises(ValueError):
+            path.index((0, 0))
+
+class CountingAgent(Agent):
+    def __init__(self, unique_id, model):
+        super().__init__(unique_id, model)
+        self.steps = 0
+        self.elapsed = 0
+
+    def step(self):
+        self.steps += 1
+        self.elapsed = self.model.schedule.elapsed(self)
+
+class TestDormantActivation(unittest.TestCase):
+    def setUp(self):
+        self.model = Model()
+        self.schedule = self.model.schedule = DormantActivation(self.model)
+        self.agents = [CountingAgent(i, self.model) for i in range(3)]
+        for agent in self.agents:
+            self.schedule.add(agent)
+
+    def test_sleeping_agents_are_not_stepped(self):
+        self.schedule.sleep(self.agents[0])
+        self.schedule.step()
+        self.assertEqual([agent.steps for agent in self.agents], [0, 1, 1])
+        self.schedule.wake(self.agents[0])
+        self.schedule.step()
+        self.assertEqual([agent.steps for agent in self.agents], [1, 2, 2])
+
+    def test_timer_wakes_agent_and_reports_elapsed_ticks(self):
+        self.schedule.sleep(self.agents[0], 3)
+        for _ in range(3):
+            self.schedule.step()
+        self.assertEqual(self.agents[0].steps, 0)
+        self.assertEqual(self.schedule.awake_count, 2)
+        self.schedule.step()
+        self.assertEqual(self.agents[0].steps, 1)
+        self.assertEqual(self.agents[0].elapsed, 3)
+        self.schedule.step()
+        self.assertEqual(self.agents[0].elapsed, 1)
+
+class Walker:
+    def __init__(self):
+        self.moves = 0
+
+    def step(self):
+        self.move(2)
+
+    def move(self, distance):
+        self.moves += distance
+
+class TestStepProfiler(unittest.TestCase):
+    def test_instrumented_methods_are_counted_and_restored(self):
+        walker = Walker()
+        profiler = StepProfiler()
+        profiler.instrument(walker, ["step", "move", "missing"])
+        for _ in range(3):
+            walker.step()
+        self.assertEqual(walker.moves, 6)
+        self.assertEqual(profiler.sections["Walker.step"].calls, 3)
+        self.assertEqual(profiler.sections["Walker.move"].calls, 3)
+        self.assertNotIn("Walker.missing", profiler.sections)
+        profiler.detach()
+        self.assertNotIn("step", vars(walker))
+        walker.step()
+        self.assertEqual(profiler.sections["Walker.step"].calls, 3)
+
+    def test_instrumented_objects_can_be_pickled(self):
+        walker = Walker()
+        StepProfiler().instrument(walker, ["step"])
+        clone = pickle.loads(pickle.dumps(walker))
+        clone.step()
+        self.assertEqual((walker.moves, clone.moves), (0, 2))
+        self.assertEqual(clone.step.stats.calls, 1)
+
+    def test_histogram_percentiles(self):
+        stats = SectionStats()
+        for elapsed in [100] * 98 + [5000, 70000]:
+            stats.add(elapsed)
+        self.assertEqual(stats.percentile(50), 128)
+        self.assertEqual(stats.percentile(100), 131072)
+
+class CountingModel:
+    def __init__(self):
+        self.schedule = MagicMock(steps=0)
+        self.running = True
+
+    def step(self):
+        self.schedule.steps += 1
+
+class TestSimulationRunner(unittest.TestCase):
+    def setUp(self):
+        self.runner = SimulationRunner(CountingModel(), steps_per_frame=5)
+        self.addCleanup(self.runner.stop)
+
+    def test_frames_advance_by_steps_per_frame(self):
+        self.runner.advance()
+        self.assertTrue(self.runner.wait_until_idle(timeout=5))
+        self.assertEqual(self.runner.steps, 5)
+        with self.runner.frame() as model:
+            self.assertEqual(model.schedule.steps, 5)
+
+    def test_skip_holds_at_step_until_resumed(self):
+        self.runner.skip_to(1000)
+        self.assertTrue(self.runner.wait_until_idle(timeout=5))
+        self.runner.advance()
+        self.assertTrue(self.runner.wait_until_idle(timeout=5))
+        self.assertEqual(self.runner.steps, 1000)
+        self.runner.resume()
+        self.runner.advance()
+        self.assertTrue(self.runner.wait_until_idle(timeout=5))
+        self.assertEqual(self.runner.steps, 1005)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_round_trip_and_version_in_key(self):
+        cache = ResultCache(self.directory.name, version="a")
+        key = cache.key({"num_drones": 2}, seed=1, steps=3)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, {"step": [1, 2, 3], "total_picked": [0, 1, 1]})
+        self.assertEqual(cache.get(key)["total_picked"].tolist(), [0, 1, 1])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertNotEqual(ResultCache(self.directory.name, version="b").key({"num_drones": 2}, 1, 3), key)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResultCache(self.directory.name, version="a")
+        keys = [cache.key({}, seed, 10) for seed in range(3)]
+        for age, key in enumerate(keys):
+            cache.put(key, {"step": np.arange(10)})
+            os.utime(cache.path(key), (age, age))
+        cache.get(keys[0])  # Now the most recently used
+        cache.max_bytes = cache.disk_usage() - 1
+        cache.evict()
+        self.assertEqual([key in cache for key in keys], [True, False, True])
+
+
+class TestTrajectory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.drone = MagicMock(unique_id=0, state="Exploring", storage=0)
+        self.picker = MagicMock(unique_id=1, pos=(0, 0), state="Picking", battery=50)
+        self.model = MagicMock(width=4, height=3, drones=[self.drone], pickers=[self.picker])
+        self.model.schedule.steps = 0
+        self.model.crop_field.is_grown = np.zeros((4, 3), dtype=bool)
+        self.move_to(0)
+
+    def move_to(self, step):
+        self.drone.pos, self.drone.battery = (step % 4, 1), 100 - step
+        self.picker.storage = step % 5
+        self.model.crop_field.is_grown[step % 4, 2] = True
+
+    def record(self, chunk_steps, steps, crop_every=1):
+        recorder = TrajectoryRecorder(self.directory.name, chunk_steps=chunk_steps, crop_every=crop_every)
+        recorder.start(self.model)
+        for step in range(1, steps + 1):
+            self.move_to(step)
+            recorder.record(self.model)
+        recorder.close()
+        return Trajectory(self.directory.name)
+
+    def test_seek_across_chunks(self):
+        trajectory = self.record(chunk_steps=4, steps=9)
+        self.assertEqual(len(trajectory), 10)  # The initial state and nine steps
+        robots = trajectory.robots_at(6)
+        self.assertEqual((robots["x"][0], robots["battery"][0], robots["storage"][1]), (2, 94, 1))
+        self.assertEqual(trajectory.state_names[int(robots["state"][1])], "Picking")
+        self.assertEqual(trajectory.column("battery", 2, 9)[:, 0].tolist(), [98, 97, 96, 95, 94, 93, 92])
+        self.assertEqual(trajectory.crops_at(1)[:, 2].tolist(), [True, True, False, False])
+        with self.assertRaises(IndexError):
+            trajectory.robots_at(10)
+
+    def test_crop_snapshots_are_sparse(self):
+        trajectory = self.record(chunk_steps=8, steps=4, crop_every=3)
+        # Steps 3 and 4 both show the snapshot taken at step 3
+        self.assertEqual(trajectory.crops_at(4)[:, 2].tolist(), [True, True, True, True])
+        self.assertEqual(trajectory.crops_at(4).tolist(), trajectory.crops_at(3).tolist())
+        self.assertEqual(trajectory.crops_at(2)[:, 2].tolist(), [True, False, False, False])
+
+    def test_last_chunk_holds_only_recorded_frames(self):
+        trajectory = self.record(chunk_steps=64, steps=9, crop_every=4)
+        self.assertEqual(np.load(os.path.join(self.directory.name, "x-000000.npy")).shape, (10, 2))
+        self.assertEqual(np.load(os.path.join(self.directory.name, "crops-000000.npy")).shape, (3, 2))
+        self.assertEqual(trajectory.column("battery")[:, 0].tolist(), list(range(100, 90, -1)))
+        self.assertEqual(trajectory.crops_at(9).tolist(), trajectory.crops_at(8).tolist())
+
+    def test_rejects_grids_wider_than_the_position_columns(self):
+        self.model.width = 40000
+        with self.assertRaises(ValueError):
+            TrajectoryRecorder(self.directory.name).start(self.model)
+
+
+class TestTerrain(unittest.TestCase):
+    MAP = """
+        .....
+        ..{0}..
+        ..{0}..
+        ..{0}..
+        C.{0}..
+    """
+
+    def setUp(self):
+        # FarmModel only takes layouts built by the package's own terrain module
+        self.FarmModel = package_module("model").FarmModel
+        self.FarmLayout = package_module("terrain").FarmLayout
+
+    def farm(self, wall):
+        return self.FarmModel(1, 1, 0, "Extended", seed=1, layout=self.FarmLayout.from_text(self.MAP.format(wall)))
+
+    def drive_home(self, model, start):
+        picker = model.pickers[0]
+        model.grid.move_agent(picker, start)
+        picker.state = "Returning"
+        model.schedule.wake(picker)
+        route = [start]
+        while picker.state == "Returning" and len(route) < 20:
+            model.step()
+            route.append(picker.pos)
+        self.assertEqual(route[-1], model.base_station)
+        return route
+
+    def test_pickers_wade_through_the_river_only_when_it_is_shorter(self):
+        model = self.farm("~")
+        self.assertEqual(model.terrain.move_costs()[2].tolist(), [8.0] * 4 + [1.0])
+        route = self.drive_home(model, (4, 0))
+        self.assertFalse(any(model.terrain.is_river(pos) for pos in route))
+        self.assertIn((2, 4), route)  # Around the top of the river
+
+    def test_pickers_squeeze_between_trees(self):
+        model = self.farm("T")
+        route = self.drive_home(model, (4, 0))
+        self.assertEqual(len(route), 5)  # Straight through one tree cell beats the detour
+        self.assertTrue(any(model.terrain.is_tree(pos) for pos in route))
+
+    def test_drones_fly_straight_over_the_river(self):
+        model = self.farm("~")
+        drone = model.drones[0]
+        model.grid.move_agent(drone, (4, 0))
+        drone.move_towards((0, 0))
+        drone.move_towards((0, 0))
+        self.assertEqual(drone.pos, (2, 0))
+
+    def test_charging_station_comes_from_the_layout(self):
+        layout = self.FarmLayout.from_text("""
+            ...C
+            T...
+        """)
+        model = self.FarmModel(1, 2, 0, "Extended", seed=1, layout=layout)
+        self.assertEqual(model.base_station, (3, 1))
+        self.assertEqual(model.terrain.positions(CHARGING_STATION), [(3, 1)])
+        self.assertEqual({robot.pos for robot in model.drones + model.pickers}, {(3, 1)})
+        generated = self.FarmModel(1, 1, 0, "Extended", seed=1, width=8, height=6, base_station=(1, 0))
+        self.assertEqual(generated.terrain.positions(CHARGING_STATION), [(1, 0)])
+        self.assertEqual(generated.drone_station, (2, 0))
+
+    def test_terrain_portrayal(self):
+        portraycell = package_module("portraycell")
+        model = self.FarmModel(0, 0, 0, "Extended", seed=1, crop_field=True, layout=self.FarmLayout.from_text("""
+            S~..
+            CT..
+        """))
+        self.assertIs(portraycell.terrain_portrayal(model, (0, 0)), portraycell.STATION_PORTRAYAL)
+        self.assertIs(portraycell.terrain_portrayal(model, (1, 1)), portraycell.RIVER_PORTRAYAL)
+        self.assertIsNone(portraycell.terrain_portrayal(model, (3, 0)))
+        self.assertEqual(portraycell.terrain_portrayal(model, (0, 1))["Color"], "green")
+        model.crop_field.pick((0, 1))
+        self.assertEqual(portraycell.terrain_portrayal(model, (0, 1))["Color"], "lightgreen")
+        self.assertEqual(portraycell.terrain_portrayal(model, (1, 0))["Color"], "green")
+
+
+class TestFarmLayout(unittest.TestCase):
+    def test_text_map_round_trips_through_npy(self):
+        layout = FarmLayout.from_text("""
+            ..S~~
+            ..T~~
+            C.S~~
+        """)
+        self.assertEqual((layout.width, layout.height), (5, 3))
+        self.assertEqual(layout.charging_station, (0, 0))
+        self.assertEqual(layout.cells[:, 0].tolist(), [CHARGING_STATION, EMPTY, TREE, RIVER, RIVER])
+        self.assertEqual(layout.crops[2].tolist(), [True, False, True])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "farm.npy")
+            layout.save(path)
+            loaded = FarmLayout.load(path)
+        self.assertTrue((loaded.cells == layout.cells).all() and (loaded.crops == layout.crops).all())
+        with self.assertRaises(ValueError):
+            FarmLayout.from_text("..X\n...")
+
+    def test_generated_crops_follow_the_draw_order(self):
+        layout = FarmLayout.generate(9, 6, random.Random(3), river_columns=[])
+        draws = random.Random(3)
+        expected = [(x, y) for x in range(2, 9, 3) for y in range(4, 1, -1) if draws.random() < 0.5]
+        self.assertEqual(sorted(expected), [tuple(pos) for pos in np.argwhere(layout.crops).tolist()])
+        self.assertEqual(np.argwhere(layout.cells == TREE).tolist(), [[x, y] for x in (2, 5, 8) for y in (2, 3, 4)])
+
+
+class TestBatchRun(unittest.TestCase):
+    def setUp(self):
+        self.batch_run = package_module("batch_run")
+
+    def test_expand_grid(self):
+        runs = self.batch_run.expand_grid({"num_drones": [1, 2], "extended_mode": ["Basic"], "unused": [9]}, seeds=[0, 1])
+        self.assertEqual(runs, [
+            {"num_drones": 1, "extended_mode": "Basic", "seed": 0},
+            {"num_drones": 1, "extended_mode": "Basic", "seed": 1},
+            {"num_drones": 2, "extended_mode": "Basic", "seed": 0},
+            {"num_drones": 2, "extended_mode": "Basic", "seed": 1},
+        ])
+
+    def test_sweep_writes_one_csv_row_per_run(self):
+        grid = {"num_drones": [1, 2], "num_pickers": [2], "num_clusters": [0], "extended_mode": ["Basic"]}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sweep.csv")
+            rows = list(self.batch_run.run_sweep(grid, seeds=[3], max_steps=20, out_path=path, processes=1))
+            with open(path, newline="") as sweep:
+                written = list(csv.DictReader(sweep))
+        self.assertEqual(len(written), 2)
+        self.assertEqual(list(written[0]), self.batch_run.KPI_FIELDS)
+        self.assertEqual(sorted(row["num_drones"] for row in written), ["1", "2"])
+        for row in written:
+            expected = next(r for r in rows if str(r["num_drones"]) == row["num_drones"])
+            self.assertEqual((row["seed"], row["steps"]), ("3", "20"))
+            self.assertEqual(float(row["total_picked"]), expected["total_picked"])
+
+    def test_vectorized_engine_rejects_other_modes(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            self.batch_run.main(["--engine", "vectorized", "--modes", "Extended"])
+
+
+class TestEnsemble(unittest.TestCase):
+    def setUp(self):
+        self.ensemble = package_module("ensemble")
+
+    def test_basic_aggregates_have_one_column_per_replica(self):
+        result = self.ensemble.run_ensemble(4, 50, 2, 3, 0, "Basic", seed=5)
+        self.assertEqual(result.replicas, 4)
+        self.assertEqual(result.steps.tolist(), list(range(1, 51)))
+        for field in self.ensemble.KPI_SERIES:
+            self.assertEqual(result.trajectories[field].shape, (50, 4))
+        self.assertTrue((np.diff(result.trajectories["total_picked"], axis=0) >= 0).all())
+        summary = result.summary()
+        self.assertEqual(set(summary), set(self.ensemble.KPI_SERIES))
+        for field, stats in summary.items():
+            final = result.final()[field]
+            self.assertAlmostEqual(stats["mean"], final.mean())
+            self.assertAlmostEqual(stats["std"], final.std(ddof=1))
+            self.assertLessEqual(stats["ci_low"], stats["mean"])
+            self.assertAlmostEqual(stats["mean"] - stats["ci_low"], stats["ci_high"] - stats["mean"])
+        band = result.series_summary("total_energy")
+        self.assertEqual(band["mean"].shape, (50,))
+
+    def test_interval_is_the_normal_approximation(self):
+        result = self.ensemble.EnsembleResult({}, 0, np.arange(1, 2), {})
+        mean, std, low, high = result.interval([1, 2, 3, 4], confidence=0.95)
+        self.assertEqual(mean, 2.5)
+        self.assertAlmostEqual(std, np.sqrt(5 / 3))
+        self.assertAlmostEqual(high - mean, 1.959964 * np.sqrt(5 / 3) / 2, places=5)
+        self.assertAlmostEqual(mean - low, high - mean)
+        mean, std, low, high = result.interval([7])
+        self.assertEqual((mean, std, low, high), (7, 0, 7, 7))
+
+    def test_lockstep_replicas_match_single_runs(self):
+        result = self.ensemble.run_ensemble(3, 50, 2, 3, 5, "Extended", seed=9)
+        final = result.final()
+        for replica, seed in enumerate(self.ensemble.replica_seeds(9, 3)):
+            model = package_module("model").FarmModel(2, 3, 5, "Extended", seed=seed)
+            for _ in range(50):
+                model.step()
+            for field, value in model.kpis.snapshot().items():
+                self.assertEqual(final[field][replica], value, field)
+
+
+class TestTiledFarm(unittest.TestCase):
+    def test_fleet_and_kpis_add_up_across_seams(self):
+        tiles = package_module("tiles")
+        with tiles.TiledFarm(3, 8, 12, 2, 3, extended_mode="Systematic", seed=4, processes=1) as farm:
+            for _ in range(150):
+                farm.step()
+                self.assertEqual((farm.kpis.num_drones, farm.kpis.num_pickers), (6, 9))
+            models = farm.tile_models()
+            in_transit = [packed for robots in farm.arrivals.values() for packed in robots]
+        self.assertGreater(farm.migrations, 0)
+        robots = [robot for model in models for robot in model.drones + model.pickers]
+        self.assertEqual(len(robots) + len(in_transit), 15)
+        ids = [robot.unique_id for robot in robots] + [state["unique_id"] for _, state, _, _ in in_transit]
+        self.assertEqual(len(set(ids)), 15)
+        for field in ("total_picked", "drone_energy", "picker_energy", "discoveries", "recharges"):
+            self.assertEqual(getattr(farm.kpis, field), sum(getattr(model.kpis, field) for model in models), field)
+
+    def test_sweep_carries_on_in_the_next_tile(self):
+        tiles = package_module("tiles")
+        left, right = (tiles.build_tile(index, 2, 8, 12, 2, 3, 0, "Systematic", seed=index) for index in range(2))
+        drone = left.drones[0]
+        drone.initialize_exploration_path()
+        seam = (left.tile.last_owned + 1, 5)
+        left.grid.move_agent(drone, seam)
+        packed = tiles.pack_robot(left, drone)
+        arrived = tiles.unpack_robot(right, packed)
+        self.assertEqual(arrived.pos, (right.tile.first_owned, 5))
+        self.assertIs(arrived.exploration_path, right.coverage_path(arrived))
+        self.assertEqual(arrived.exploration_path[arrived.path_index - 1], arrived.pos)
+        self.assertEqual(arrived.unique_id, drone.unique_id)
+        self.assertEqual([robot.unique_id for robot in right.pickers], [1_000_002, 1_000_003, 1_000_004])
+
+
+class TestJobService(unittest.TestCase):
+    CONFIG = {"mode": "Extended", "drones": 2, "pickers": 3, "clusters": 5, "seed": 3}
+
+    def setUp(self):
+        self.jobservice = package_module("jobservice")
+
+    def run_service(self, scenario, **kwargs):
+        async def run():
+            service = self.jobservice.JobService(workers=1, progress_every=5, **kwargs)
+            await service.start()
+            try:
+                return await scenario(service)
+            finally:
+                await service.stop()
+        return asyncio.run(asyncio.wait_for(run(), timeout=60))
+
+    async def finished(self, events, kinds=("done", "cancelled", "failed")):
+        while not events or events[-1]["event"] not in kinds:
+            await asyncio.sleep(0.01)
+        return events[-1]
+
+    def test_submitted_job_runs_to_done(self):
+        async def scenario(service):
+            events = []
+            service.submit(dict(self.CONFIG, steps=20), events.append)
+            await self.finished(events)
+            return events
+        events = self.run_service(scenario)
+        self.assertEqual([event["event"] for event in events], ["queued", "started"] + ["progress"] * 3 + ["done"])
+        model = package_module("model").FarmModel(2, 3, 5, "Extended", seed=3)
+        for _ in range(20):
+            model.step()
+        self.assertEqual(events[-1]["kpis"], model.kpis.snapshot())
+
+    def test_rejects_bad_config_and_full_queue(self):
+        async def scenario(service):
+            with self.assertRaises(ValueError):
+                service.submit({"mode": "Turbo"}, print)
+            with self.assertRaises(ValueError):
+                service.submit({"steps": 0}, print)
+            service.submit(dict(self.CONFIG, steps=10), lambda event: None)
+            with self.assertRaises(asyncio.QueueFull):
+                service.submit(dict(self.CONFIG, steps=10), lambda event: None)
+            return service.status()
+        self.assertEqual(self.run_service(scenario, queue_size=1)["queued"], 1)
+
+    def test_cancel_stops_a_running_job_within_a_few_steps(self):
+        async def scenario(service):
+            events = []
+            job = service.submit(dict(self.CONFIG, steps=100000), events.append)
+            await self.finished(events, ("progress",))
+            self.assertTrue(service.cancel(job.id))
+            return await self.finished(events)
+        event = self.run_service(scenario)
+        self.assertEqual(event["event"], "cancelled")
+        self.assertLess(event["step"], 100000)
+
+    def test_dead_worker_fails_its_job_and_is_replaced(self):
+        async def scenario(service):
+            events = []
+            service.submit(dict(self.CONFIG, steps=100000), events.append)
+            await self.finished(events, ("progress",))
+            service.processes[0].kill()
+            failed = await self.finished(events)
+            service.submit(dict(self.CONFIG, steps=10), events.append)
+            return failed, await self.finished(events)
+        failed, done = self.run_service(scenario)
+        self.assertEqual(failed["event"], "failed")
+        self.assertEqual(done["event"], "done")
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
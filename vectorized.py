@@ -0,0 +1,228 @@
+"""
+Struct-of-arrays engine for Basic mode.
+
+Basic drones and pickers are random walkers, so instead of one Mesa agent
+each their positions, batteries, storage and states live in NumPy arrays
+and every tick moves the whole fleet with a handful of array operations.
+The farm itself (layout, terrain, home distance field, crop field, KPIs
+and tracer) is built by FarmModel from the same seed, so both engines
+start from the same farm and report the same KPIs.
+"""
+import numpy as np
+
+from .kpi import KPICounters
+from .agent import BATTERY_CAPACITY, STORAGE_CAPACITY
+from .model import FarmModel
+from .navigation import OFFSETS
+from .tracing import EventType
+
+# State codes
+EXPLORING = 0  # Drones
+WAITING = 1  # Drones
+IDLE = 0  # Pickers
+RETURNING = 2  # Both
+
+OFFSET_ARRAY = np.array(OFFSETS)
+
+# Per-replica counts returned by BasicFleet.step
+TICK_COUNTS = ["picked", "found", "drone_energy", "picker_energy", "recharges", "battery_before", "battery_after"]
+
+
+def stack(arrays):
+    """Stack per-farm arrays on a new leading axis; a single farm is a view, so writes reach its arrays."""
+    if len(arrays) == 1:
+        return arrays[0][None]
+    return np.stack(arrays)
+
+
+class BasicFleet:
+    """
+    The drones and pickers of one or more Basic-mode farms.
+
+    Grid arrays have a leading replica axis, (replica, x, y). Agent arrays
+    are flat and replica-major, and drone_rep / picker_rep hold the replica
+    of each agent, so every replica is stepped by the same array operations.
+
+    Per tick the drones act first, then the pickers, each group
+    simultaneously. Several pickers reaching the same ripe cluster in one
+    tick are resolved by picking one of them at random, which is what
+    random activation order decides on the Mesa path. Runs match the Mesa
+    agents in distribution, not draw for draw.
+    """
+
+    def __init__(self, farms, num_drones, num_pickers, rng):
+        self.replicas = len(farms)
+        self.width = farms[0].width
+        self.height = farms[0].height
+        self.rng = rng
+        self.tracer = None  # Only a single farm is traced
+
+        self.grown = stack([farm.crop_field.is_grown for farm in farms])
+        self.picked = stack([farm.crop_field.picked for farm in farms])
+        self.age = stack([farm.crop_field.age for farm in farms])
+        homes = [farm.navigation.field("home") for farm in farms]
+        self.home_moves = stack([home.moves for home in homes])
+        self.home_step = stack([
+            np.where((home.next_offset >= 0)[..., None], OFFSET_ARRAY[home.next_offset], 0) for home in homes
+        ])
+
+        self.drone_station = np.array([farm.drone_station for farm in farms])
+        start = np.array([farm.base_station for farm in farms])
+        self.drone_ids = np.tile(np.arange(num_drones), self.replicas)
+        self.drone_rep = np.repeat(np.arange(self.replicas), num_drones)
+        self.drone_pos = start[self.drone_rep]
+        self.drone_battery = np.full(len(self.drone_rep), BATTERY_CAPACITY)
+        self.drone_state = np.full(len(self.drone_rep), EXPLORING)
+        self.drone_target = self.drone_pos.copy()
+
+        self.picker_ids = np.tile(np.arange(num_drones, num_drones + num_pickers), self.replicas)
+        self.picker_rep = np.repeat(np.arange(self.replicas), num_pickers)
+        self.picker_pos = start[self.picker_rep]
+        self.picker_battery = np.full(len(self.picker_rep), BATTERY_CAPACITY)
+        self.picker_storage = np.zeros(len(self.picker_rep), dtype=int)
+        self.picker_state = np.full(len(self.picker_rep), IDLE)
+
+    def random_moves(self, pos):
+        """Move every agent to a uniformly chosen in-bounds Moore neighbour."""
+        candidates = pos[:, None, :] + OFFSET_ARRAY[None, :, :]
+        valid = ((candidates[..., 0] >= 0) & (candidates[..., 0] < self.width)
+                 & (candidates[..., 1] >= 0) & (candidates[..., 1] < self.height))
+        choice = (self.rng.random(len(pos)) * valid.sum(axis=1)).astype(int)
+        index = np.argmax(valid.cumsum(axis=1) > choice[:, None], axis=1)
+        return candidates[np.arange(len(pos)), index]
+
+    def count(self, counts, name, reps, weights=None):
+        counts[name] += np.bincount(reps, weights, minlength=self.replicas).astype(int)
+
+    def trace(self, event, ids, positions):
+        for agent_id, (x, y) in zip(ids.tolist(), positions.tolist()):
+            self.tracer.emit(event, agent_id, (x, y))
+
+    def step_drones(self, counts):
+        rep = self.drone_rep
+        self.drone_state[self.drone_battery <= 0] = RETURNING
+        waiting = self.drone_state == WAITING
+        exploring = self.drone_state == EXPLORING
+        returning = self.drone_state == RETURNING
+
+        # Waiting drones go back to exploring once their cluster is gone
+        tx, ty = self.drone_target[waiting].T
+        self.drone_state[np.flatnonzero(waiting)[~self.grown[rep[waiting], tx, ty]]] = EXPLORING
+
+        explorers = np.flatnonzero(exploring)
+        if len(explorers):
+            new_pos = self.random_moves(self.drone_pos[explorers])
+            self.drone_pos[explorers] = new_pos
+            found = self.grown[rep[explorers], new_pos[:, 0], new_pos[:, 1]]
+            finders = explorers[found]
+            self.drone_target[finders] = self.drone_pos[finders]
+            self.drone_state[finders] = WAITING
+            self.count(counts, "found", rep[finders])
+            spent = explorers[~found]
+            self.drone_battery[spent] -= 1
+            self.count(counts, "drone_energy", rep[spent])
+            if self.tracer is not None and self.tracer.debug:
+                self.trace(EventType.MOVED, self.drone_ids[explorers], new_pos)
+            if self.tracer is not None and self.tracer.info:
+                self.trace(EventType.FOUND, self.drone_ids[finders], self.drone_pos[finders])
+
+        returners = np.flatnonzero(returning)
+        if len(returners):
+            station = self.drone_station[rep[returners]]
+            self.drone_pos[returners] += np.sign(station - self.drone_pos[returners])
+            if self.tracer is not None and self.tracer.debug:
+                self.trace(EventType.MOVED, self.drone_ids[returners], self.drone_pos[returners])
+            arrived = returners[(self.drone_pos[returners] == station).all(axis=1)]
+            self.recharge(counts, self.drone_battery, arrived, rep, self.drone_ids, self.drone_pos)
+            self.drone_state[arrived] = EXPLORING
+
+    def step_pickers(self, counts):
+        rep = self.picker_rep
+        x, y = self.picker_pos.T
+        moves = self.home_moves[rep, x, y]
+        must_return = (moves < 0) | (moves >= self.picker_battery) | (self.picker_storage >= STORAGE_CAPACITY)
+        self.picker_state[must_return] = RETURNING
+
+        idle = np.flatnonzero(self.picker_state == IDLE)
+        if len(idle):
+            self.picker_pos[idle] = self.random_moves(self.picker_pos[idle])
+            self.picker_battery[idle] -= 1
+            self.count(counts, "picker_energy", rep[idle])
+            if self.tracer is not None and self.tracer.debug:
+                self.trace(EventType.MOVED, self.picker_ids[idle], self.picker_pos[idle])
+
+        returners = np.flatnonzero(self.picker_state == RETURNING)
+        if len(returners):
+            x, y = self.picker_pos[returners].T
+            self.picker_pos[returners] += self.home_step[rep[returners], x, y]
+            if self.tracer is not None and self.tracer.debug:
+                self.trace(EventType.MOVED, self.picker_ids[returners], self.picker_pos[returners])
+            x, y = self.picker_pos[returners].T
+            arrived = returners[self.home_moves[rep[returners], x, y] == 0]
+            self.recharge(counts, self.picker_battery, arrived, rep, self.picker_ids, self.picker_pos)
+            self.picker_storage[arrived] = 0
+            self.picker_state[arrived] = IDLE
+
+        # Every picker standing on a ripe cluster tries to pick it; one random picker wins each cluster
+        x, y = self.picker_pos.T
+        candidates = np.flatnonzero(self.grown[rep, x, y])
+        if len(candidates):
+            candidates = self.rng.permutation(candidates)
+            cells = (rep[candidates] * self.width + x[candidates]) * self.height + y[candidates]
+            _, first = np.unique(cells, return_index=True)
+            winners = candidates[first]
+            wr, wx, wy = rep[winners], x[winners], y[winners]
+            self.grown[wr, wx, wy] = False
+            self.picked[wr, wx, wy] = True
+            self.age[wr, wx, wy] = 0
+            self.picker_storage[winners] += 1
+            self.count(counts, "picked", wr)
+            self.picker_state[winners] = np.where(self.picker_storage[winners] >= STORAGE_CAPACITY, RETURNING, IDLE)
+            self.picker_battery[winners] -= 1
+            self.count(counts, "picker_energy", wr)
+            if self.tracer is not None and self.tracer.info:
+                self.trace(EventType.PICKED, self.picker_ids[winners], self.picker_pos[winners])
+
+    def recharge(self, counts, battery, arrived, rep, ids, positions):
+        if not len(arrived):
+            return
+        self.count(counts, "recharges", rep[arrived])
+        self.count(counts, "battery_before", rep[arrived], battery[arrived])
+        counts["battery_after"] += BATTERY_CAPACITY * np.bincount(rep[arrived], minlength=self.replicas)
+        battery[arrived] = BATTERY_CAPACITY
+        if self.tracer is not None and self.tracer.info:
+            self.trace(EventType.RECHARGED, ids[arrived], positions[arrived])
+
+    def step(self):
+        """Advance every replica one tick and return what happened, one count per replica."""
+        counts = {name: np.zeros(self.replicas, dtype=int) for name in TICK_COUNTS}
+        self.step_drones(counts)
+        self.step_pickers(counts)
+        return counts
+
+
+class VectorizedBasicModel(FarmModel):
+    """Basic-mode FarmModel that steps all drones and pickers at once with a BasicFleet."""
+
+    def __init__(self, num_drones, num_pickers, num_clusters, extended_mode="Basic", **kwargs):
+        if extended_mode != "Basic":
+            raise ValueError("The vectorized engine only implements Basic mode")
+        if kwargs.get("recorder") is not None:
+            raise ValueError("The vectorized engine has no agent objects to record")
+        kwargs["crop_field"] = True  # Crops live in arrays too
+        super().__init__(0, 0, num_clusters, extended_mode, **kwargs)
+        self.kpis = KPICounters(num_drones, num_pickers, BATTERY_CAPACITY)
+        rng = np.random.default_rng(self.random.getrandbits(64))
+        self.fleet = BasicFleet([self], num_drones, num_pickers, rng)
+        self.fleet.tracer = self.tracer
+
+    def step(self):
+        self.tracer.step = self.schedule.steps
+        counts = {name: int(values[0]) for name, values in self.fleet.step().items()}
+        self.kpis.found(counts["found"])
+        self.kpis.picked(counts["picked"])
+        self.kpis.drone_energy_used(counts["drone_energy"])
+        self.kpis.picker_energy_used(counts["picker_energy"])
+        self.kpis.recharged(counts["battery_before"], counts["battery_after"], counts["recharges"])
+        self.schedule.step()  # No agents are scheduled; this only advances the step counter
+        self.kpis.record(self.schedule.steps)